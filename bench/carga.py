@@ -0,0 +1,323 @@
+"""Teste de carga de todas as rotas de ``app.py`` com concorrência fixa.
+
+Por padrão usa o test client do Flask em processo, sobre o banco de
+``DATABASE_URL`` (gere os dados antes com ``bench.gerar_dados``). Com
+``--url`` as requisições vão para um servidor local já no ar, que deve usar
+o mesmo banco.
+
+Para cada rota são medidos p50/p95/p99, vazão e consultas SQL por
+requisição; as consultas vêm do cabeçalho ``Server-Timing`` (ver
+``helpers.metricas``). As rotas de escrita rodam em ciclos que criam,
+alteram e removem os próprios registros; só o histórico gerado pelo
+``POST /finalizacoes`` permanece no banco.
+
+O resultado é gravado em JSON, por padrão em
+``bench/resultados/<commit>.json``; ``--comparar`` mostra a diferença para
+uma execução anterior.
+
+    python -m bench.carga [--concorrencia 8] [--requisicoes 400] [--ciclos 100]
+    python -m bench.carga --comparar bench/resultados/1d86b08.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app import app
+from helpers.database import db
+from models.Sala import Sala
+from models.Responsavel import Responsavel
+from models.Reserva import Reserva
+from models.Finalizar import Finalizar
+from models.Historico import Historico
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+CONSULTAS = re.compile(r'db;[^,]*desc="(\d+) consultas"')
+
+
+class ClienteLocal:
+    """Um test client do Flask por thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        cliente = getattr(self._local, "cliente", None)
+        if cliente is None:
+            cliente = self._local.cliente = app.test_client()
+        resposta = cliente.open(caminho, method=metodo, json=corpo)
+        return resposta.status_code, resposta.headers.get("Server-Timing", ""), resposta.get_json(silent=True)
+
+
+class ClienteHttp:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        dados = json.dumps(corpo).encode() if corpo is not None else None
+        pedido = urllib.request.Request(
+            self.url + caminho, data=dados, method=metodo, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(pedido) as resposta:
+                status, cabecalhos, conteudo = resposta.status, resposta.headers, resposta.read()
+        except urllib.error.HTTPError as erro:
+            status, cabecalhos, conteudo = erro.code, erro.headers, erro.read()
+        try:
+            conteudo = json.loads(conteudo)
+        except ValueError:
+            conteudo = None
+        return status, cabecalhos.get("Server-Timing", ""), conteudo
+
+
+class Registro:
+    def __init__(self):
+        self.tempos = defaultdict(list)
+        self.consultas = defaultdict(list)
+        self.status = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def medir(self, cliente, rota, metodo, caminho, corpo=None):
+        inicio = time.perf_counter()
+        status, server_timing, conteudo = cliente.requisitar(metodo, caminho, corpo)
+        duracao = time.perf_counter() - inicio
+        consultas = CONSULTAS.search(server_timing)
+        with self._lock:
+            self.tempos[rota].append(duracao)
+            self.status[rota][status] += 1
+            if consultas:
+                self.consultas[rota].append(int(consultas.group(1)))
+        return status, conteudo
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+def _resumo(registro, duracoes):
+    rotas = {}
+    for rota, tempos in registro.tempos.items():
+        ordenados = sorted(tempos)
+        consultas = registro.consultas.get(rota)
+        rotas[rota] = {
+            "requisicoes": len(tempos),
+            "p50_ms": _percentil(ordenados, 0.50) * 1000,
+            "p95_ms": _percentil(ordenados, 0.95) * 1000,
+            "p99_ms": _percentil(ordenados, 0.99) * 1000,
+            "req_por_s": len(tempos) / duracoes[rota] if duracoes.get(rota) else None,
+            "consultas_por_req": sum(consultas) / len(consultas) if consultas else None,
+            "status": {str(codigo): total for codigo, total in sorted(registro.status[rota].items())},
+        }
+    return rotas
+
+
+def _amostra():
+    """Maiores ids e o período coberto pelo histórico, para sortear
+    caminhos que existem."""
+    with app.app_context():
+        maximo = lambda coluna: db.session.execute(db.select(db.func.max(coluna))).scalar() or 1
+        limites = db.session.execute(
+            db.select(db.func.min(Historico.data_hora_inicio), db.func.max(Historico.data_hora_inicio))
+        ).first()
+        return {
+            "sala": maximo(Sala.sala_id),
+            "responsavel": maximo(Responsavel.responsavel_id),
+            "reserva": maximo(Reserva.reserva_id),
+            "finalizacao": maximo(Finalizar.finalizacao_id),
+            "historico": maximo(Historico.historico_id),
+            "historico_de": limites[0] or datetime.now(),
+            "banco": db.engine.dialect.name,
+        }
+
+
+def _leituras(amostra, aleatorio):
+    """Rotas de leitura: ``(rota, caminho sorteado a cada chamada)``."""
+    def id_(entidade):
+        return aleatorio.randint(1, amostra[entidade])
+
+    def dia():
+        de = (amostra["historico_de"] + timedelta(days=aleatorio.randrange(30))).date()
+        return f"de={de.isoformat()}&ate={(de + timedelta(days=1)).isoformat()}"
+
+    def expediente():
+        de = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=aleatorio.randrange(1, 8))
+        return f"de={de.isoformat()}&ate={(de + timedelta(hours=10)).isoformat()}"
+
+    return [
+        ("GET /", lambda: "/"),
+        ("GET /salas", lambda: "/salas?limit=50"),
+        ("GET /salas/<id>", lambda: f"/salas/{id_('sala')}"),
+        ("GET /salas/<id>/disponibilidade", lambda: f"/salas/{id_('sala')}/disponibilidade"),
+        ("GET /salas/livres", lambda: f"/salas/livres?{expediente()}&duracao=2h"),
+        ("GET /reservas", lambda: "/reservas?limit=50"),
+        ("GET /reservas/<id>", lambda: f"/reservas/{id_('reserva')}"),
+        ("GET /responsaveis", lambda: "/responsaveis?limit=50"),
+        ("GET /responsaveis/<id>", lambda: f"/responsaveis/{id_('responsavel')}"),
+        ("GET /finalizacoes", lambda: "/finalizacoes?limit=50"),
+        ("GET /finalizacoes/<id>", lambda: f"/finalizacoes/{id_('finalizacao')}"),
+        ("GET /historicos", lambda: "/historicos?limit=50"),
+        ("GET /historicos/<id>", lambda: f"/historicos/{id_('historico')}"),
+        ("GET /historicos/export", lambda: f"/historicos/export?{dia()}"),
+        ("GET /cache", lambda: "/cache"),
+        ("GET /metrics", lambda: "/metrics"),
+    ]
+
+
+def _ciclo(cliente, registro, amostra, aleatorio, contador, base, execucao):
+    """Cria, lê, altera e remove uma sala, um responsável, uma reserva
+    (com finalização) e um histórico. ``execucao`` deixa SIAP e CPF únicos
+    mesmo que uma execução anterior tenha sido interrompida."""
+    n = next(contador)
+    status, sala = registro.medir(cliente, "POST /salas", "POST", "/salas",
+                                  {"sala_nome": f"Carga {n}", "chave_nome": f"CRG{n}"})
+    sala_id = sala["sala_id"] if status == 201 else None
+    status, responsavel = registro.medir(cliente, "POST /responsaveis", "POST", "/responsaveis", {
+        "responsavel_nome": f"Carga {n}", "responsavel_siap": f"C{execucao}-{n}",
+        "responsavel_cpf": f"C{execucao}-{n}", "responsavel_data_nascimento": "1990-01-01"
+    })
+    responsavel_id = responsavel["responsavel_id"] if status == 201 else None
+
+    # Um horário exclusivo por ciclo, muito depois dos dados gerados.
+    inicio = base + timedelta(hours=n)
+    reserva = {
+        "sala_id": sala_id or aleatorio.randint(1, amostra["sala"]),
+        "responsavel_id": responsavel_id or aleatorio.randint(1, amostra["responsavel"]),
+        "data_hora_inicio": inicio.isoformat(), "data_hora_fim": (inicio + timedelta(minutes=30)).isoformat(),
+    }
+    status, criada = registro.medir(cliente, "POST /reservas", "POST", "/reservas", reserva)
+    if status == 201:
+        reserva_id = criada["reserva_id"]
+        reserva["data_hora_fim"] = (inicio + timedelta(minutes=45)).isoformat()
+        registro.medir(cliente, "PUT /reservas/<id>", "PUT", f"/reservas/{reserva_id}", reserva)
+
+        status, finalizacao = registro.medir(cliente, "POST /finalizacoes", "POST", "/finalizacoes", {
+            "reserva_id": reserva_id, "data_hora_finalizacao": reserva["data_hora_fim"]
+        })
+        if status == 201:
+            caminho = f"/finalizacoes/{finalizacao['finalizacao_id']}"
+            registro.medir(cliente, "PUT /finalizacoes/<id>", "PUT", caminho,
+                           {"reserva_id": reserva_id, "data_hora_finalizacao": reserva["data_hora_fim"]})
+            registro.medir(cliente, "DELETE /finalizacoes/<id>", "DELETE", caminho)
+        registro.medir(cliente, "DELETE /reservas/<id>", "DELETE", f"/reservas/{reserva_id}")
+
+    lote = [dict(reserva, data_hora_inicio=(inicio + timedelta(minutes=m)).isoformat(),
+                 data_hora_fim=(inicio + timedelta(minutes=m + 5)).isoformat()) for m in range(0, 30, 10)]
+    status, criadas = registro.medir(cliente, "POST /reservas/lote", "POST", "/reservas/lote", lote)
+    if status == 201:
+        for criada in criadas["resultados"]:
+            registro.medir(cliente, "DELETE /reservas/<id>", "DELETE", f"/reservas/{criada['reserva_id']}")
+
+    historico = dict(reserva, reserva_id=1)
+    status, criado = registro.medir(cliente, "POST /historicos", "POST", "/historicos", historico)
+    if status == 201:
+        caminho = f"/historicos/{criado['historico_id']}"
+        registro.medir(cliente, "PUT /historicos/<id>", "PUT", caminho, historico)
+        registro.medir(cliente, "DELETE /historicos/<id>", "DELETE", caminho)
+
+    if responsavel_id:
+        caminho = f"/responsaveis/{responsavel_id}"
+        registro.medir(cliente, "PUT /responsaveis/<id>", "PUT", caminho, {"responsavel_nome": f"Carga {n} alterado"})
+        registro.medir(cliente, "DELETE /responsaveis/<id>", "DELETE", caminho)
+    if sala_id:
+        caminho = f"/salas/{sala_id}"
+        registro.medir(cliente, "PUT /salas/<id>", "PUT", caminho, {"sala_nome": f"Carga {n} alterada"})
+        registro.medir(cliente, "DELETE /salas/<id>", "DELETE", caminho)
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def _comparar(atual, caminho):
+    with open(caminho) as arquivo:
+        anterior = json.load(arquivo)
+    print(f"\ncomparação com {anterior['commit']} ({caminho})")
+    print(f"{'rota':<34} {'p95 antes':>10} {'p95 agora':>10} {'variação':>9}")
+    for rota, medidas in atual["rotas"].items():
+        antes = anterior["rotas"].get(rota)
+        if not antes:
+            continue
+        variacao = (medidas["p95_ms"] / antes["p95_ms"] - 1) * 100 if antes["p95_ms"] else 0.0
+        print(f"{rota:<34} {antes['p95_ms']:>10.2f} {medidas['p95_ms']:>10.2f} {variacao:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor local (ex: http://127.0.0.1:5000); sem ele usa o test client")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--requisicoes", type=int, default=400, help="requisições por rota de leitura")
+    parser.add_argument("--ciclos", type=int, default=100, help="ciclos de escrita (0 desliga)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", help="arquivo de saída (padrão bench/resultados/<commit>.json)")
+    parser.add_argument("--comparar", help="resultado JSON anterior para comparar")
+    args = parser.parse_args()
+
+    cliente = ClienteHttp(args.url) if args.url else ClienteLocal()
+    aleatorio = random.Random(args.semente)
+    amostra = _amostra()
+    registro = Registro()
+    duracoes = {}
+
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        for rota, caminho in _leituras(amostra, aleatorio):
+            caminhos = [caminho() for _ in range(args.requisicoes)]
+            inicio = time.perf_counter()
+            list(executor.map(lambda c: registro.medir(cliente, rota, "GET", c), caminhos))
+            duracoes[rota] = time.perf_counter() - inicio
+
+        if args.ciclos:
+            contador = itertools.count()
+            execucao = format(time.time_ns() // 1000, "x")
+            base = datetime(2100, 1, 1) + timedelta(days=aleatorio.randrange(36500))
+            inicio = time.perf_counter()
+            list(executor.map(
+                lambda _: _ciclo(cliente, registro, amostra, aleatorio, contador, base, execucao), range(args.ciclos)
+            ))
+            decorrido = time.perf_counter() - inicio
+            for rota in registro.tempos:
+                duracoes.setdefault(rota, decorrido)
+
+    resultado = {
+        "commit": _commit(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "banco": args.url or amostra["banco"],
+        "parametros": {"concorrencia": args.concorrencia, "requisicoes": args.requisicoes,
+                       "ciclos": args.ciclos, "semente": args.semente},
+        "rotas": _resumo(registro, duracoes),
+    }
+
+    print(f"{'rota':<34} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'consultas':>9}")
+    for rota, medidas in resultado["rotas"].items():
+        consultas = medidas["consultas_por_req"]
+        print(f"{rota:<34} {medidas['requisicoes']:>6} {medidas['p50_ms']:>8.2f} {medidas['p95_ms']:>8.2f} "
+              f"{medidas['p99_ms']:>8.2f} {medidas['req_por_s'] or 0:>8.1f} "
+              f"{'-' if consultas is None else f'{consultas:.1f}':>9}")
+
+    destino = args.json or os.path.join(DIRETORIO_RESULTADOS, f"{resultado['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    with open(destino, "w") as arquivo:
+        json.dump(resultado, arquivo, indent=2)
+    print(f"\nresultado gravado em {destino}")
+
+    if args.comparar:
+        _comparar(resultado, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
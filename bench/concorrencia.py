@@ -0,0 +1,188 @@
+"""Teste de estresse das reservas concorrentes (trava por sala, ver
+``helpers.travas``).
+
+Para cada quantidade de salas em ``--salas``, dispara ``--requisicoes``
+``POST /reservas`` em paralelo divididas entre as salas. Os pedidos vêm
+em grupos de ``CONCORRENTES`` que disputam o mesmo horário (todos se
+sobrepõem dois a dois), então cada grupo deve ter exatamente um 201. No
+fim procura no banco pares de reservas sobrepostas nas salas do teste.
+
+Com o total de requisições fixo, mais salas significa menos disputa pela
+mesma trava: a vazão deve crescer com o número de salas. Isso só é
+exigido no Postgres (ou com ``--exigir-escala``); o SQLite serializa todas
+as escritas no próprio banco e o test client divide um único GIL.
+
+A garantia de nenhuma reserva dupla fica em
+``tests/test_concorrencia.py``; aqui o foco é a vazão com carga maior e
+contra um servidor de verdade (``--url``).
+
+Termina com código 1 se houver reserva dupla, se algum grupo não tiver
+exatamente um vencedor ou se a vazão não escalar.
+
+    python -m bench.concorrencia [--salas 1,2,4,8] [--requisicoes 800] [--concorrencia 16]
+    python -m bench.concorrencia --url http://127.0.0.1:5000
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import aliased
+
+from app import app
+from bench.carga import ClienteLocal, ClienteHttp
+from helpers.database import db
+from models.Sala import Sala
+from models.Responsavel import Responsavel
+from models.Reserva import Reserva
+from models.UsoSala import UsoSala
+
+CONCORRENTES = 4
+DURACAO = timedelta(hours=1)
+# Deslocamentos dentro do grupo: o maior fica abaixo de DURACAO, então
+# todos os pedidos do grupo se cruzam; grupos seguidos ficam a
+# PASSO de distância e nunca se cruzam.
+DESLOCAMENTO = timedelta(minutes=15)
+PASSO = timedelta(hours=2)
+
+
+def _preparar(quantidade, execucao):
+    with app.app_context():
+        salas = [Sala(sala_nome=f"Concorrência {execucao} {n}", chave_nome=f"CC{n}") for n in range(quantidade)]
+        responsavel = Responsavel(
+            responsavel_nome=f"Concorrência {execucao}", responsavel_siap=f"CC{execucao}-{quantidade}",
+            responsavel_cpf=f"CC{execucao}-{quantidade}", responsavel_data_nascimento=datetime(1990, 1, 1).date()
+        )
+        db.session.add_all([*salas, responsavel])
+        db.session.commit()
+        return [sala.sala_id for sala in salas], responsavel.responsavel_id
+
+
+def _pedidos(sala_ids, responsavel_id, requisicoes, base, aleatorio):
+    """``(grupo, corpo)`` embaralhados; um grupo é uma sala e um horário."""
+    grupos = max(requisicoes // (CONCORRENTES * len(sala_ids)), 1)
+    pedidos = []
+    for sala_id in sala_ids:
+        for g in range(grupos):
+            inicio = base + g * PASSO
+            for c in range(CONCORRENTES):
+                comeco = inicio + c * DESLOCAMENTO
+                pedidos.append(((sala_id, g), {
+                    "sala_id": sala_id, "responsavel_id": responsavel_id,
+                    "data_hora_inicio": comeco.isoformat(), "data_hora_fim": (comeco + DURACAO).isoformat(),
+                }))
+    aleatorio.shuffle(pedidos)
+    return pedidos
+
+
+def _sobrepostas(sala_ids):
+    with app.app_context():
+        outra = aliased(Reserva)
+        return db.session.execute(
+            db.select(db.func.count())
+            .select_from(Reserva)
+            .join(outra, db.and_(
+                outra.sala_id == Reserva.sala_id,
+                outra.reserva_id > Reserva.reserva_id,
+                outra.data_hora_inicio < Reserva.data_hora_fim,
+                outra.data_hora_fim > Reserva.data_hora_inicio,
+            ))
+            .where(Reserva.sala_id.in_(sala_ids))
+        ).scalar()
+
+
+def _limpar(sala_ids, responsavel_id):
+    with app.app_context():
+        db.session.execute(db.delete(UsoSala).where(UsoSala.sala_id.in_(sala_ids)))
+        db.session.execute(db.delete(Reserva).where(Reserva.sala_id.in_(sala_ids)))
+        db.session.execute(db.delete(Sala).where(Sala.sala_id.in_(sala_ids)))
+        db.session.execute(db.delete(Responsavel).where(Responsavel.responsavel_id == responsavel_id))
+        db.session.commit()
+
+
+def _rodada(cliente, quantidade, args, aleatorio, execucao):
+    sala_ids, responsavel_id = _preparar(quantidade, execucao)
+    base = datetime(2100, 1, 1) + timedelta(days=aleatorio.randrange(36500))
+    pedidos = _pedidos(sala_ids, responsavel_id, args.requisicoes, base, aleatorio)
+
+    def enviar(pedido):
+        grupo, corpo = pedido
+        status, _, _ = cliente.requisitar("POST", "/reservas", corpo)
+        return grupo, status
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        respostas = list(executor.map(enviar, pedidos))
+    decorrido = time.perf_counter() - inicio
+
+    status = Counter(codigo for _, codigo in respostas)
+    vencedores = Counter(grupo for grupo, codigo in respostas if codigo == 201)
+    grupos = {grupo for grupo, _ in respostas}
+    sem_um_vencedor = sum(1 for grupo in grupos if vencedores[grupo] != 1)
+    duplas = _sobrepostas(sala_ids)
+    if not args.manter:
+        _limpar(sala_ids, responsavel_id)
+    return {
+        "salas": quantidade,
+        "requisicoes": len(pedidos),
+        "req_por_s": len(pedidos) / decorrido,
+        "status": dict(sorted(status.items())),
+        "grupos_sem_um_vencedor": sem_um_vencedor,
+        "reservas_sobrepostas": duplas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor local (ex: http://127.0.0.1:5000); sem ele usa o test client")
+    parser.add_argument("--salas", default="1,2,4,8", help="quantidades de salas, separadas por vírgula")
+    parser.add_argument("--requisicoes", type=int, default=800, help="POST /reservas por rodada")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--escala-minima", type=float, default=1.5,
+                        help="vazão mínima da maior rodada em relação à de uma sala")
+    parser.add_argument("--exigir-escala", action="store_true", help="exige a escala mesmo fora do Postgres")
+    parser.add_argument("--manter", action="store_true", help="não apaga as salas e reservas criadas")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    cliente = ClienteHttp(args.url) if args.url else ClienteLocal()
+    aleatorio = random.Random(args.semente)
+    execucao = format(time.time_ns() // 1000, "x")
+    with app.app_context():
+        postgres = db.engine.dialect.name == "postgresql"
+
+    rodadas = []
+    for quantidade in sorted(int(valor) for valor in args.salas.split(",")):
+        rodada = _rodada(cliente, quantidade, args, aleatorio, execucao)
+        rodadas.append(rodada)
+        print(
+            f"{rodada['salas']:>4} sala(s)  {rodada['requisicoes']:>6} req  {rodada['req_por_s']:>8.1f} req/s  "
+            f"status {rodada['status']}  sobrepostas {rodada['reservas_sobrepostas']}  "
+            f"grupos sem um vencedor {rodada['grupos_sem_um_vencedor']}"
+        )
+
+    falhas = []
+    if any(rodada["reservas_sobrepostas"] for rodada in rodadas):
+        falhas.append("reservas sobrepostas na mesma sala")
+    if any(rodada["grupos_sem_um_vencedor"] for rodada in rodadas):
+        falhas.append("horário disputado sem exatamente um vencedor")
+
+    escala = rodadas[-1]["req_por_s"] / rodadas[0]["req_por_s"] if len(rodadas) > 1 else None
+    if escala is not None:
+        print(f"vazão com {rodadas[-1]['salas']} sala(s) / com {rodadas[0]['salas']}: {escala:.2f}x")
+        if postgres or args.exigir_escala:
+            if escala < args.escala_minima:
+                falhas.append(f"vazão não escalou ({escala:.2f}x < {args.escala_minima}x)")
+        else:
+            print("escala não exigida: fora do Postgres as escritas são serializadas pelo próprio banco")
+
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
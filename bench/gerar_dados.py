@@ -0,0 +1,185 @@
+"""Gera um conjunto de dados sintético nas cinco tabelas a partir de ``models/*``.
+
+Usa o banco de ``DATABASE_URL`` (Postgres local ou um arquivo SQLite). As
+tabelas precisam estar vazias, ou use ``--limpar``. Com a mesma ``--semente``
+o resultado é sempre o mesmo, para que medições de commits diferentes
+rodem sobre os mesmos dados.
+
+Cada sala recebe uma agenda sem sobreposição (uma reserva a cada
+``PASSO_HORAS``), então a restrição de exclusão de reservas é respeitada. As
+reservas que já terminaram ganham finalização e histórico, como faria o
+``POST /finalizacoes``.
+
+    DATABASE_URL=sqlite:///bench.db python -m bench.gerar_dados --criar-tabelas \\
+        --salas 200 --responsaveis 5000 --reservas 200000
+
+    python -m bench.gerar_dados --limpar   # escala padrão: 2k / 50k / 5M
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from app import app
+from helpers.database import db, importar_modelos
+from helpers.condicional import incrementar_versao
+from models.Sala import Sala
+from models.Responsavel import Responsavel
+from models.Reserva import Reserva
+from models.Finalizar import Finalizar
+from models.Historico import Historico
+
+PASSO_HORAS = 3
+TAMANHO_LOTE = 10000
+# Ordem de remoção respeitando as chaves estrangeiras.
+TABELAS = (Finalizar, Historico, Reserva, Responsavel, Sala)
+
+
+def _lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _inserir(modelo, linhas, tamanho):
+    total = 0
+    for lote in _lotes(linhas, tamanho):
+        db.session.execute(db.insert(modelo), lote)
+        db.session.commit()
+        total += len(lote)
+    return total
+
+
+def _salas(quantidade, aleatorio):
+    blocos = "ABCDEFGH"
+    for i in range(1, quantidade + 1):
+        bloco = aleatorio.choice(blocos)
+        yield {"sala_nome": f"Bloco {bloco} - Sala {i:04d}", "chave_nome": f"{bloco}{i:04d}"}
+
+
+def _responsaveis(quantidade, aleatorio):
+    nomes = ("Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João")
+    sobrenomes = ("Silva", "Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Almeida")
+    for i in range(1, quantidade + 1):
+        yield {
+            "responsavel_nome": f"{aleatorio.choice(nomes)} {aleatorio.choice(sobrenomes)} {i}",
+            "responsavel_siap": f"{i:07d}",
+            "responsavel_cpf": f"{i:011d}",
+            "responsavel_data_nascimento": date(1950, 1, 1) + timedelta(days=aleatorio.randrange(365 * 50)),
+        }
+
+
+def _reservas(quantidade, sala_ids, responsavel_ids, passado, aleatorio):
+    """Distribui ``quantidade`` reservas entre as salas, em rodadas: a
+    rodada ``j`` dá a cada sala uma reserva começando ``j * PASSO_HORAS``
+    depois da base, com até 1 h de atraso e 30 min a 2 h de duração."""
+    por_sala = -(-quantidade // len(sala_ids))
+    base = datetime.now().replace(minute=0, second=0, microsecond=0)
+    base -= timedelta(hours=int(por_sala * passado) * PASSO_HORAS)
+
+    gerados = 0
+    for rodada in range(por_sala):
+        inicio_rodada = base + timedelta(hours=rodada * PASSO_HORAS)
+        for sala_id in sala_ids:
+            if gerados == quantidade:
+                return
+            inicio = inicio_rodada + timedelta(minutes=aleatorio.randrange(0, 60, 15))
+            yield {
+                "sala_id": sala_id,
+                "responsavel_id": aleatorio.choice(responsavel_ids),
+                "data_hora_inicio": inicio,
+                "data_hora_fim": inicio + timedelta(minutes=aleatorio.randrange(30, 121, 15)),
+            }
+            gerados += 1
+
+
+def _finalizar_passadas(agora):
+    """Finalização e histórico de todas as reservas já encerradas, em duas
+    instruções ``INSERT ... SELECT`` no próprio banco."""
+    encerradas = db.select(Reserva).where(Reserva.data_hora_fim < agora).subquery()
+    db.session.execute(
+        db.insert(Finalizar).from_select(
+            ["reserva_id", "data_hora_finalizacao"],
+            db.select(encerradas.c.reserva_id, encerradas.c.data_hora_fim)
+        )
+    )
+    resultado = db.session.execute(
+        db.insert(Historico).from_select(
+            ["reserva_id", "sala_id", "responsavel_id", "data_hora_inicio", "data_hora_fim"],
+            db.select(
+                encerradas.c.reserva_id, encerradas.c.sala_id, encerradas.c.responsavel_id,
+                encerradas.c.data_hora_inicio, encerradas.c.data_hora_fim
+            )
+        )
+    )
+    db.session.commit()
+    return resultado.rowcount
+
+
+def _limpar():
+    if db.engine.dialect.name == "postgresql":
+        nomes = ", ".join(modelo.__tablename__ for modelo in TABELAS)
+        db.session.execute(db.text(f"TRUNCATE {nomes} RESTART IDENTITY CASCADE"))
+    else:
+        for modelo in TABELAS:
+            db.session.execute(db.delete(modelo))
+    db.session.commit()
+
+
+def _ids(coluna):
+    return db.session.execute(db.select(coluna).order_by(coluna)).scalars().all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--salas", type=int, default=2000)
+    parser.add_argument("--responsaveis", type=int, default=50000)
+    parser.add_argument("--reservas", type=int, default=5000000)
+    parser.add_argument("--passado", type=float, default=0.8,
+                        help="fração das reservas que já terminou e vira histórico (padrão 0.8)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--limpar", action="store_true", help="apaga os dados existentes antes de gerar")
+    parser.add_argument("--criar-tabelas", action="store_true",
+                        help="db.create_all() antes de gerar (SQLite; no Postgres use as migrações)")
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semente)
+    with app.app_context():
+        if args.criar_tabelas:
+            importar_modelos()
+            db.create_all()
+        if args.limpar:
+            _limpar()
+        elif db.session.execute(db.select(db.func.count()).select_from(Sala)).scalar():
+            parser.error("o banco já tem salas; use --limpar para gerar do zero")
+
+        inicio = time.perf_counter()
+        agora = datetime.now()
+        etapas = []
+
+        etapas.append(("salas", _inserir(Sala, _salas(args.salas, aleatorio), args.lote)))
+        etapas.append(("responsaveis", _inserir(Responsavel, _responsaveis(args.responsaveis, aleatorio), args.lote)))
+        reservas = _reservas(args.reservas, _ids(Sala.sala_id), _ids(Responsavel.responsavel_id), args.passado, aleatorio)
+        etapas.append(("reservas", _inserir(Reserva, reservas, args.lote)))
+        etapas.append(("finalizacoes/historicos", _finalizar_passadas(agora)))
+
+        incrementar_versao("sala")
+        incrementar_versao("responsavel")
+        db.session.commit()
+        if db.engine.dialect.name == "postgresql":
+            with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+                conexao.execute(db.text("ANALYZE"))
+
+    for nome, total in etapas:
+        print(f"{nome:<24} {total:>10}")
+    print(f"{'tempo total':<24} {time.perf_counter() - inicio:>9.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Latência de requisição com o logging desligado, síncrono e em fila.
+
+Cada requisição registra duas linhas INFO, como os recursos da API. O modo
+``sincrono`` reproduz a configuração antiga (``StreamHandler`` +
+``RotatingFileHandler`` de 10 KB escritos na thread da requisição); o modo
+``fila`` usa ``helpers.logging.configurar_logging``. A saída vai para um
+diretório temporário e o stream para ``/dev/null``.
+
+    python -m bench.logs [--requisicoes 5000] [--json saida.json]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+from flask import Flask
+
+from helpers.logging import logger, configurar_logging, parar_logging, formatter
+
+
+def _app():
+    app = Flask(__name__)
+
+    @app.get("/")
+    def index():
+        logger.info("GET ALL - Listagem de Salas")
+        logger.info("Salas retornadas com sucesso")
+        return {"versao": "1.0.0"}
+
+    return app
+
+
+def _handlers(diretorio, max_bytes):
+    stream = logging.StreamHandler(open(os.devnull, "w"))
+    arquivo = RotatingFileHandler(os.path.join(diretorio, "app.log"), maxBytes=max_bytes, backupCount=3)
+    for handler in (stream, arquivo):
+        handler.setFormatter(formatter)
+    return [stream, arquivo]
+
+
+def _medir(cliente, requisicoes):
+    for _ in range(200):
+        cliente.get("/")
+    tempos = []
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        cliente.get("/")
+        tempos.append((time.perf_counter() - inicio) * 1e6)
+    tempos.sort()
+    return {
+        "media_us": statistics.fmean(tempos),
+        "p50_us": tempos[len(tempos) // 2],
+        "p99_us": tempos[int(len(tempos) * 0.99)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requisicoes", type=int, default=5000)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    cliente = _app().test_client()
+    parar_logging()
+    logger.setLevel(logging.INFO)
+    resultados = {}
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        logger.disabled = True
+        resultados["desligado"] = _medir(cliente, args.requisicoes)
+        logger.disabled = False
+
+        sincronos = _handlers(diretorio, 10000)
+        for handler in sincronos:
+            logger.addHandler(handler)
+        resultados["sincrono"] = _medir(cliente, args.requisicoes)
+        for handler in sincronos:
+            logger.removeHandler(handler)
+            handler.close()
+
+        configurar_logging(_handlers(diretorio, 10 * 1024 * 1024))
+        resultados["fila"] = _medir(cliente, args.requisicoes)
+        parar_logging()
+
+    print(f"{'modo':<10} {'média µs':>10} {'p50 µs':>10} {'p99 µs':>10}")
+    for modo, medidas in resultados.items():
+        print(f"{modo:<10} {medidas['media_us']:>10.1f} {medidas['p50_us']:>10.1f} {medidas['p99_us']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Micro-benchmark da decodificação e serialização feitas a cada requisição.
+
+Compara o caminho antigo (``datetime.fromisoformat`` manual, ``Schema()``
+novo por requisição e ``marshal`` com datas RFC-822) com os codecs
+compilados de ``models/*``. Não precisa de banco.
+
+    python -m bench.serializacao [--repeticoes 20000] [--json saida.json]
+"""
+import argparse
+import json
+import timeit
+from datetime import date, datetime
+from flask_restful import marshal, fields as flaskFields
+
+from models.Sala import Sala, SalaSchema, sala_fields, sala_codec
+from models.Reserva import Reserva, ReservaSchema, reserva_fields, reserva_codec
+from models.Responsavel import Responsavel, responsavel_fields, responsavel_codec
+from models.Finalizar import Finalizar, FinalizarSchema, finalizacao_fields, finalizacao_codec
+from models.Historico import Historico, HistoricoSchema, historico_fields, historico_codec
+
+
+def _rfc822(campos):
+    """Os ``*_fields`` como eram antes: ``DateTime`` no formato padrão."""
+    return {
+        nome: flaskFields.DateTime if isinstance(campo, flaskFields.DateTime) else campo
+        for nome, campo in campos.items()
+    }
+
+
+INICIO = datetime(2025, 8, 17, 14, 0)
+FIM = datetime(2025, 8, 17, 16, 0)
+
+CASOS = {
+    "sala": dict(
+        schema=SalaSchema, campos=_rfc822(sala_fields), codec=sala_codec, datas=(),
+        payload={"sala_nome": "Laboratório 3", "chave_nome": "LAB3"},
+        obj=Sala(sala_id=1, sala_nome="Laboratório 3", chave_nome="LAB3")
+    ),
+    "reserva": dict(
+        schema=ReservaSchema, campos=_rfc822(reserva_fields), codec=reserva_codec,
+        datas=("data_hora_inicio", "data_hora_fim"),
+        payload={"sala_id": 1, "responsavel_id": 1,
+                 "data_hora_inicio": INICIO.isoformat(), "data_hora_fim": FIM.isoformat()},
+        obj=Reserva(reserva_id=1, sala_id=1, responsavel_id=1, data_hora_inicio=INICIO, data_hora_fim=FIM)
+    ),
+    "finalizacao": dict(
+        schema=FinalizarSchema, campos=_rfc822(finalizacao_fields), codec=finalizacao_codec,
+        datas=("data_hora_finalizacao",),
+        payload={"reserva_id": 1, "data_hora_finalizacao": FIM.isoformat()},
+        obj=Finalizar(finalizacao_id=1, reserva_id=1, data_hora_finalizacao=FIM)
+    ),
+    "historico": dict(
+        schema=HistoricoSchema, campos=_rfc822(historico_fields), codec=historico_codec, datas=(),
+        payload={"reserva_id": 1, "sala_id": 1, "responsavel_id": 1,
+                 "data_hora_inicio": INICIO.isoformat(), "data_hora_fim": FIM.isoformat()},
+        obj=Historico(historico_id=1, reserva_id=1, sala_id=1, responsavel_id=1,
+                      data_hora_inicio=INICIO, data_hora_fim=FIM)
+    ),
+    # A validação de Responsavel consulta o banco (CPF/SIAP únicos), então
+    # aqui só a serialização é medida.
+    "responsavel": dict(
+        schema=None, campos=responsavel_fields, codec=responsavel_codec, datas=(), payload=None,
+        obj=Responsavel(responsavel_id=1, responsavel_nome="Maria da Silva", responsavel_siap="123456",
+                        responsavel_cpf="00011122233", responsavel_data_nascimento=date(1990, 1, 1))
+    ),
+}
+
+TAMANHO_PAGINA = 50
+
+
+def _caminho_antigo(caso):
+    def escrita():
+        schema = caso["schema"]()
+        for campo in caso["datas"]:
+            datetime.fromisoformat(caso["payload"][campo])
+        schema.load(caso["payload"])
+        return marshal(caso["obj"], caso["campos"])
+
+    def por_id():
+        return marshal(caso["obj"], caso["campos"])
+
+    def listagem():
+        return marshal([caso["obj"]] * TAMANHO_PAGINA, caso["campos"])
+
+    return (escrita if caso["schema"] else por_id), listagem
+
+
+def _caminho_codec(caso):
+    codec = caso["codec"]
+
+    def escrita():
+        codec.load(caso["payload"])
+        return codec.dump(caso["obj"])
+
+    def por_id():
+        return codec.dump(caso["obj"])
+
+    def listagem():
+        return codec.dump_lista([caso["obj"]] * TAMANHO_PAGINA)
+
+    return (escrita if caso["schema"] else por_id), listagem
+
+
+def _medir(funcao, repeticoes):
+    melhor = min(timeit.repeat(funcao, number=repeticoes, repeat=5))
+    return melhor / repeticoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=20000)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    resultados = {}
+    print(f"{'modelo':<12} {'operação':<22} {'antigo µs':>10} {'codec µs':>10} {'ganho':>7}")
+    for nome, caso in CASOS.items():
+        antigo_escrita, antigo_leitura = _caminho_antigo(caso)
+        codec_escrita, codec_leitura = _caminho_codec(caso)
+        operacao_escrita = "post (load + dump)" if caso["schema"] else "get por id (dump)"
+        for operacao, antigo, novo, repeticoes in (
+            (operacao_escrita, antigo_escrita, codec_escrita, args.repeticoes),
+            (f"listagem ({TAMANHO_PAGINA} itens)", antigo_leitura, codec_leitura, max(args.repeticoes // 20, 1)),
+        ):
+            t_antigo = _medir(antigo, repeticoes)
+            t_novo = _medir(novo, repeticoes)
+            resultados[f"{nome}:{operacao}"] = {"antigo_us": t_antigo, "codec_us": t_novo}
+            print(f"{nome:<12} {operacao:<22} {t_antigo:>10.1f} {t_novo:>10.1f} {t_antigo / t_novo:>6.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
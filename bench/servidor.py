@@ -0,0 +1,155 @@
+"""Vazão do servidor de desenvolvimento contra o pré-fork (``helpers.servidor``).
+
+Sobe cada servidor num processo próprio, numa porta livre e sobre o banco
+de ``DATABASE_URL`` (gere os dados antes com ``bench.gerar_dados``), e
+dispara as mesmas ``--requisicoes`` das rotas de leitura de ``bench.carga``,
+embaralhadas, com ``--concorrencia`` fixa. O servidor de desenvolvimento
+roda como em ``app.py`` (``debug=True``), só que sem o reloader.
+
+Termina com código 1 se algum servidor responder 5xx (os ids são
+sorteados, então um 404 eventual é esperado) ou se o pré-fork ficar abaixo
+de ``--ganho-minimo`` vezes a vazão do de desenvolvimento (padrão 0, só
+informa: numa máquina com uma CPU não há ganho a esperar).
+
+    python -m bench.servidor [--workers 4] [--threads 8] [--concorrencia 32] [--requisicoes 3000]
+"""
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.carga import ClienteHttp, _amostra, _leituras
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESPERA_MAXIMA = 30
+
+DESENVOLVIMENTO = "from app import app; import sys; app.run(port=int(sys.argv[1]), debug=True, use_reloader=False)"
+
+
+def _porta_livre():
+    with socket.socket() as soquete:
+        soquete.bind(("127.0.0.1", 0))
+        return soquete.getsockname()[1]
+
+
+def _esperar(url, processo):
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"servidor saiu com código {processo.returncode}")
+        try:
+            with urllib.request.urlopen(url + "/pronto") as resposta:
+                if resposta.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"servidor não ficou pronto em {ESPERA_MAXIMA}s")
+
+
+def _subir(comando):
+    porta = _porta_livre()
+    ambiente = dict(os.environ)
+    ambiente.setdefault("LOG_HANDLERS", "")
+    processo = subprocess.Popen(
+        [sys.executable, *comando(porta)], cwd=RAIZ, env=ambiente,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        _esperar(url, processo)
+    except BaseException:
+        processo.kill()
+        processo.wait()
+        raise
+    return processo, url
+
+
+def _medir(url, caminhos, concorrencia):
+    cliente = ClienteHttp(url)
+
+    def enviar(caminho):
+        inicio = time.perf_counter()
+        status, _, _ = cliente.requisitar("GET", caminho)
+        return status, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        respostas = list(executor.map(enviar, caminhos))
+    decorrido = time.perf_counter() - inicio
+
+    tempos = sorted(tempo * 1000 for _, tempo in respostas)
+    return {
+        "req_por_s": len(caminhos) / decorrido,
+        "p50_ms": statistics.median(tempos),
+        "p95_ms": tempos[int(len(tempos) * 0.95) - 1],
+        "status": dict(sorted(Counter(status for status, _ in respostas).items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--threads", type=int, default=8, help="threads por worker do pré-fork")
+    parser.add_argument("--preload", action="store_true", help="pré-fork com o app montado no mestre")
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--ganho-minimo", type=float, default=0,
+                        help="vazão mínima do pré-fork em relação ao servidor de desenvolvimento")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semente)
+    leituras = _leituras(_amostra(), aleatorio)
+    caminhos = [caminho() for _, caminho in leituras for _ in range(max(args.requisicoes // len(leituras), 1))]
+    aleatorio.shuffle(caminhos)
+
+    prefork = ["-m", "helpers.servidor", "--workers", str(args.workers), "--threads", str(args.threads)]
+    if args.preload:
+        prefork.append("--preload")
+    servidores = (
+        ("desenvolvimento", lambda porta: ["-c", DESENVOLVIMENTO, str(porta)]),
+        (f"pré-fork {args.workers}x{args.threads}", lambda porta: [*prefork, "--porta", str(porta)]),
+    )
+
+    resultados = {}
+    for nome, comando in servidores:
+        processo, url = _subir(comando)
+        try:
+            _medir(url, caminhos[:args.concorrencia * 2], args.concorrencia)
+            resultados[nome] = _medir(url, caminhos, args.concorrencia)
+        finally:
+            processo.terminate()
+            processo.wait()
+        resultado = resultados[nome]
+        print(
+            f"{nome:<22} {len(caminhos):>6} req  {resultado['req_por_s']:>8.1f} req/s  "
+            f"p50 {resultado['p50_ms']:>7.1f} ms  p95 {resultado['p95_ms']:>7.1f} ms  status {resultado['status']}"
+        )
+
+    desenvolvimento, prefork = resultados.values()
+    ganho = prefork["req_por_s"] / desenvolvimento["req_por_s"]
+    print(f"pré-fork / desenvolvimento: {ganho:.2f}x")
+
+    falhas = []
+    for nome, resultado in resultados.items():
+        erros = {status: total for status, total in resultado["status"].items() if status >= 500}
+        if erros:
+            falhas.append(f"{nome} respondeu {erros}")
+    if ganho < args.ganho_minimo:
+        falhas.append(f"ganho {ganho:.2f}x abaixo de {args.ganho_minimo}x")
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
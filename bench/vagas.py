@@ -0,0 +1,118 @@
+"""Busca de salas livres (``GET /salas/livres``) contra uma consulta por sala.
+
+Sorteia ``--requisicoes`` janelas de expediente (08:00 às 18:00 de um dos
+próximos ``--dias`` dias) e, para cada uma, chama a rota com o test client sobre o
+banco de ``DATABASE_URL`` (gere antes com ``bench.gerar_dados``, com
+milhares de salas para o número fazer sentido) e refaz a busca do jeito
+antigo: uma consulta de reservas por sala e a checagem de cada início da
+grade. Mostra a mediana e o p95 dos dois caminhos.
+
+Termina com código 1 se o total de salas com vaga ou as primeiras salas
+do ranking divergirem, ou se a rota responder algo diferente de 200.
+
+    python -m bench.vagas [--requisicoes 20] [--duracao 2h] [--passo 15m]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app import app
+from bench.carga import ClienteLocal
+from helpers.database import db
+from helpers.recorrencia import regras_vigentes, ocorrencias_na_janela
+from helpers.vagas import duracao
+from models.Reserva import Reserva
+from models.Sala import Sala
+
+
+def _por_sala(de, ate, tempo, passo):
+    """``{sala_id: [inicios]}`` com uma consulta por sala."""
+    inicios = []
+    inicio = de
+    while inicio + tempo <= ate:
+        inicios.append(inicio)
+        inicio += passo
+    # Duração arredondada em passos, como na rota.
+    tempo = passo * -(-tempo // passo)
+
+    ocorrencias = {}
+    for comeco, fim, regra in ocorrencias_na_janela(regras_vigentes(de.date(), ate.date()), de, ate):
+        ocorrencias.setdefault(regra.sala_id, []).append((comeco, fim))
+
+    livres = {}
+    for sala_id in db.session.execute(db.select(Sala.sala_id)).scalars():
+        ocupados = db.session.execute(
+            db.select(Reserva.data_hora_inicio, Reserva.data_hora_fim)
+            .where(Reserva.sala_id == sala_id, Reserva.data_hora_inicio < ate, Reserva.data_hora_fim > de)
+        ).all() + ocorrencias.get(sala_id, [])
+        # A rota conta a fatia inteira como ocupada: alinha cada período à grade.
+        alinhados = [(de + (comeco - de) // passo * passo, de - (de - fim) // passo * passo) for comeco, fim in ocupados]
+        sala = [inicio for inicio in inicios if inicio + tempo <= ate
+                and all(not (comeco < inicio + tempo and fim > inicio) for comeco, fim in alinhados)]
+        if sala:
+            livres[sala_id] = sala
+    return livres
+
+
+def _ranking(livres, limite):
+    return sorted(livres, key=lambda sala_id: (livres[sala_id][0], -len(livres[sala_id]), sala_id))[:limite]
+
+
+def _resumo(nome, duracoes):
+    ordenadas = sorted(duracoes)
+    p95 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+    print(f"{nome:<16} mediana {statistics.median(ordenadas) * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requisicoes", type=int, default=20)
+    parser.add_argument("--duracao", default="2h")
+    parser.add_argument("--passo", default="15m")
+    parser.add_argument("--limite", type=int, default=20)
+    parser.add_argument("--dias", type=int, default=3, help="sorteia janelas entre amanhã e daqui a N dias")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semente)
+    cliente = ClienteLocal()
+    tempo, passo = duracao(args.duracao), duracao(args.passo)
+    hoje = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+
+    rota, antigo, falhas = [], [], []
+    for _ in range(args.requisicoes):
+        de = hoje + timedelta(days=aleatorio.randrange(1, args.dias + 1))
+        ate = de + timedelta(hours=10)
+        caminho = (f"/salas/livres?de={de.isoformat()}&ate={ate.isoformat()}"
+                   f"&duracao={args.duracao}&passo={args.passo}&limite={args.limite}")
+
+        inicio = time.perf_counter()
+        status, _, conteudo = cliente.requisitar("GET", caminho)
+        rota.append(time.perf_counter() - inicio)
+        if status != 200:
+            falhas.append(f"{caminho}: status {status}")
+            continue
+
+        with app.app_context():
+            inicio = time.perf_counter()
+            livres = _por_sala(de, ate, tempo, passo)
+            antigo.append(time.perf_counter() - inicio)
+
+        obtido = [sala["sala_id"] for sala in conteudo["salas"]]
+        if conteudo["total"] != len(livres) or obtido != _ranking(livres, args.limite):
+            falhas.append(f"{caminho}: rota {conteudo['total']} salas {obtido[:5]}, "
+                          f"por sala {len(livres)} salas {_ranking(livres, args.limite)[:5]}")
+
+    _resumo("GET /salas/livres", rota)
+    if antigo:
+        _resumo("uma por sala", antigo)
+    for falha in falhas:
+        print(f"FALHA: {falha}")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
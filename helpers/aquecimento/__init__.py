@@ -0,0 +1,73 @@
+import threading
+import time
+from helpers.database import db
+from helpers.logging import logger, log_exception
+from helpers.rotas import carregar_todas
+from helpers.cache import entidades
+from helpers.quadro import quadro
+from models.Sala import Sala, sala_codec
+from models.VersaoTabela import VersaoTabela
+
+
+def _abrir_conexoes(engine, quantidade):
+    """Abre ``quantidade`` conexões ao mesmo tempo e devolve ao pool, para
+    a primeira rajada de requisições não pagar o handshake."""
+    conexoes = []
+    try:
+        for _ in range(quantidade):
+            conexao = engine.connect()
+            conexao.exec_driver_sql("SELECT 1")
+            conexoes.append(conexao)
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+    return len(conexoes)
+
+
+def _carregar_salas():
+    """Põe todas as salas no cache de entidades, na versão atual da tabela,
+    com uma consulta só."""
+    versao = db.session.execute(
+        db.select(VersaoTabela.versao).where(VersaoTabela.tabela == "sala")
+    ).scalar() or 0
+    salas = {sala.sala_id: sala_codec.dump(sala) for sala in db.session.execute(db.select(Sala)).scalars()}
+    for sala_id in salas:
+        entidades.obter("sala", sala_id, salas.get, versao)
+    return len(salas)
+
+
+def aquecer(app):
+    """Importa os recursos, abre conexões do pool e carrega os caches.
+    Cada etapa que falhar é registrada no log e não impede as outras."""
+    inicio = time.perf_counter()
+    etapas = {}
+    with app.app_context():
+        for nome, etapa in (
+            ("recursos", lambda: carregar_todas() or len(app.view_functions)),
+            ("conexoes", lambda: sum(
+                _abrir_conexoes(engine, min(getattr(engine.pool, "size", lambda: 1)(), app.config["AQUECER_CONEXOES"]))
+                for engine in db.engines.values()
+            )),
+            ("salas", _carregar_salas),
+            ("quadro", lambda: len(quadro.carregar().salas)),
+        ):
+            try:
+                etapas[nome] = etapa()
+            except Exception:
+                log_exception(f"Erro no aquecimento ({nome})")
+                db.session.rollback()
+        db.session.remove()
+    logger.info(f"Aquecimento concluído em {time.perf_counter() - inicio:.2f}s: {etapas}")
+    return etapas
+
+
+def iniciar(app):
+    """Aquece em segundo plano e só então marca o app como pronto (ver
+    ``create_app``)."""
+    def executar():
+        try:
+            aquecer(app)
+        finally:
+            app.extensions["keycontrol"]["pronto"].set()
+
+    threading.Thread(target=executar, name="aquecimento", daemon=True).start()
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from helpers.database import db
+from models.Sala import Sala, sala_codec
+from models.Responsavel import Responsavel, responsavel_codec
+
+MAX_ITENS_PADRAO = 4096
+TTL_PADRAO = 60
+
+
+class CacheBackend:
+    """Armazenamento usado pelo ``EntityCache``.
+
+    Os valores são dicionários simples (já serializados), então um backend
+    compartilhado entre processos só precisa implementar estes métodos.
+    """
+
+    def get(self, chave):
+        raise NotImplementedError
+
+    def set(self, chave, valor):
+        raise NotImplementedError
+
+    def delete(self, chave):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoriaBackend(CacheBackend):
+    """LRU limitado a ``max_itens`` com expiração de ``ttl`` segundos."""
+
+    def __init__(self, max_itens=MAX_ITENS_PADRAO, ttl=TTL_PADRAO):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+
+class EntityCache:
+    """Cache read-through por ``(entidade, id)`` com contadores de acerto.
+
+    Cada entrada guarda a versão da tabela em que foi lida (ver
+    ``helpers.condicional``). Quem conhece a versão atual a informa e uma
+    entrada de outra versão conta como falta; quem só precisa saber se a
+    entidade existe aceita qualquer versão.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoriaBackend()
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def _contar(self, entidade, tipo):
+        with self._lock:
+            contadores = self._contadores.setdefault(entidade, {"hits": 0, "misses": 0})
+            contadores[tipo] += 1
+
+    def obter(self, entidade, id, carregar, versao=None):
+        chave = f"{entidade}:{id}"
+        entrada = self.backend.get(chave)
+        if entrada is not None and (versao is None or entrada["versao"] == versao):
+            self._contar(entidade, "hits")
+            return entrada["dados"]
+
+        self._contar(entidade, "misses")
+        dados = carregar(id)
+        if dados is not None:
+            self.backend.set(chave, {"versao": versao, "dados": dados})
+        return dados
+
+    def invalidar(self, entidade, id):
+        self.backend.delete(f"{entidade}:{id}")
+
+    def limpar(self):
+        self.backend.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {entidade: dict(contadores) for entidade, contadores in self._contadores.items()}
+
+
+entidades = EntityCache()
+
+
+def _carregar_sala(sala_id):
+    sala = db.session.get(Sala, sala_id)
+    return sala_codec.dump(sala) if sala else None
+
+
+def _carregar_responsavel(responsavel_id):
+    responsavel = db.session.get(Responsavel, responsavel_id)
+    return responsavel_codec.dump(responsavel) if responsavel else None
+
+
+def sala_por_id(sala_id, versao=None):
+    return entidades.obter("sala", sala_id, _carregar_sala, versao)
+
+
+def responsavel_por_id(responsavel_id, versao=None):
+    return entidades.obter("responsavel", responsavel_id, _carregar_responsavel, versao)
@@ -0,0 +1,81 @@
+from time import perf_counter
+from flask_restful import fields as flaskFields
+from helpers.metricas import registrar_fase
+
+
+def _iso(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+class DateFormat(flaskFields.Raw):
+    def format(self, value):
+        return _iso(value)
+
+
+def _compilar(campos):
+    """Gera uma função ``serializar(obj) -> dict`` a partir de um dict de
+    ``flask_restful.fields``.
+
+    Inteiros e strings viram leitura direta do atributo e datas viram
+    ``isoformat``, sem a passagem reflexiva de ``marshal`` a cada objeto.
+    Tipos não reconhecidos caem no ``output`` do próprio campo.
+    """
+    ambiente = {"_iso": _iso}
+    expressoes = []
+    for indice, (nome, campo) in enumerate(campos.items()):
+        tipo = campo if isinstance(campo, type) else type(campo)
+        if issubclass(tipo, (flaskFields.Integer, flaskFields.String)):
+            expressoes.append(f"{nome!r}: obj.{nome}")
+        elif issubclass(tipo, (flaskFields.DateTime, DateFormat)):
+            expressoes.append(f"{nome!r}: _iso(obj.{nome})")
+        else:
+            ambiente[f"_campo{indice}"] = campo() if isinstance(campo, type) else campo
+            expressoes.append(f"{nome!r}: _campo{indice}.output({nome!r}, obj)")
+
+    codigo = "def serializar(obj):\n    return {" + ", ".join(expressoes) + "}\n"
+    exec(compile(codigo, "<codec>", "exec"), ambiente)
+    return ambiente["serializar"]
+
+
+class Codec:
+    """Entrada e saída de um modelo em uma passada.
+
+    ``load`` valida e converte o payload com instâncias de schema criadas
+    uma vez só; ``dump`` serializa com a função compilada dos ``*_fields``,
+    sempre com datas em ISO 8601.
+    """
+
+    def __init__(self, schema_cls, campos):
+        self.campos = campos
+        self._schema = schema_cls()
+        self._schema_lista = schema_cls(many=True)
+        self._serializar = _compilar(campos)
+
+    def load(self, dados, partial=False):
+        inicio = perf_counter()
+        try:
+            return self._schema.load(dados, partial=partial)
+        finally:
+            registrar_fase("validacao", perf_counter() - inicio)
+
+    def load_lista(self, dados):
+        inicio = perf_counter()
+        try:
+            return self._schema_lista.load(dados)
+        finally:
+            registrar_fase("validacao", perf_counter() - inicio)
+
+    def dump(self, obj):
+        inicio = perf_counter()
+        try:
+            return self._serializar(obj)
+        finally:
+            registrar_fase("serializacao", perf_counter() - inicio)
+
+    def dump_lista(self, objs):
+        inicio = perf_counter()
+        serializar = self._serializar
+        try:
+            return [serializar(obj) for obj in objs]
+        finally:
+            registrar_fase("serializacao", perf_counter() - inicio)
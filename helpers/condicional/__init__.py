@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+from flask import request, Response
+from werkzeug.http import http_date, quote_etag
+from helpers.database import db
+from models.VersaoTabela import VersaoTabela
+
+_INICIO = datetime(1970, 1, 1)
+
+
+def _agora():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def incrementar_versao(tabela: str):
+    """Marca ``tabela`` como alterada. Chamar antes do ``commit`` da escrita,
+    para a nova versão só valer se a transação for confirmada."""
+    agora = _agora()
+    resultado = db.session.execute(
+        db.update(VersaoTabela)
+        .where(VersaoTabela.tabela == tabela)
+        .values(versao=VersaoTabela.versao + 1, atualizado_em=agora)
+    )
+    if resultado.rowcount == 0:
+        db.session.add(VersaoTabela(tabela=tabela, versao=1, atualizado_em=agora))
+
+
+def cabecalhos_condicionais(tabela: str, chave=None):
+    """Calcula ``ETag``/``Last-Modified`` a partir da versão de ``tabela``.
+
+    Retorna os cabeçalhos, ``True`` se o cliente já tem a versão atual
+    (``If-None-Match`` ou, na falta dele, ``If-Modified-Since``), caso em
+    que o recurso pode responder 304 sem consultar a tabela, e a versão.
+
+    ``If-None-Match: *`` casa com qualquer representação que exista. A
+    tabela sempre existe, mas um item (``chave``) ainda não foi lido aqui,
+    então para ele o ``*`` é ignorado e o recurso responde 200 ou 404.
+    """
+    linha = db.session.execute(
+        db.select(VersaoTabela.versao, VersaoTabela.atualizado_em)
+        .where(VersaoTabela.tabela == tabela)
+    ).first()
+    versao, atualizado_em = linha if linha else (0, _INICIO)
+
+    etag = f"{tabela}-{versao}" if chave is None else f"{tabela}-{versao}-{chave}"
+    atualizado_em = atualizado_em.replace(microsecond=0, tzinfo=timezone.utc)
+    headers = {
+        "ETag": quote_etag(etag),
+        "Last-Modified": http_date(atualizado_em),
+        "Cache-Control": "no-cache"
+    }
+
+    if request.if_none_match:
+        if chave is None:
+            nao_modificado = request.if_none_match.contains(etag)
+        else:
+            nao_modificado = request.if_none_match.is_strong(etag)
+    elif request.if_modified_since:
+        nao_modificado = atualizado_em <= request.if_modified_since
+    else:
+        nao_modificado = False
+    return headers, nao_modificado, versao
+
+
+def resposta_304(headers):
+    return Response(status=304, headers=headers)
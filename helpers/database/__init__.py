@@ -1,12 +1,63 @@
+import importlib
+import os
+from flask import current_app, g, request, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy.orm import DeclarativeBase
-from helpers.application import app
-from flask_migrate import Migrate
+
+REPLICA = "replica"
+METODOS_LEITURA = ("GET", "HEAD")
+COOKIE_PRIMARIO = "kc_ler_primario"
+MODELOS = ("Sala", "Responsavel", "Reserva", "ReservaRecorrente", "Finalizar", "Historico", "UsoSala", "VersaoTabela")
+# Tempo em que, depois de uma escrita, o mesmo cliente continua lendo do
+# primário enquanto a réplica alcança.
+ATRASO_REPLICA = int(os.environ.get("DB_REPLICA_ATRASO", 5))
 
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
-db.init_app(app)
-migrate = Migrate(app, db)
+
+def forcar_primario():
+    """Faz as leituras restantes da requisição atual irem para o primário."""
+    g._ler_primario = True
+
+
+def _ler_da_replica():
+    if not has_request_context() or request.method not in METODOS_LEITURA:
+        return False
+    return not (g.get("_ler_primario") or request.cookies.get(COOKIE_PRIMARIO))
+
+
+class SessaoRoteada(Session):
+    """Envia as leituras de ``GET``/``HEAD`` para a réplica, quando houver
+    uma configurada, e todo o resto (inclusive o flush) para o primário."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _ler_da_replica():
+            replica = self._db.engines.get(REPLICA)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(model_class=Base, session_options={"class_": SessaoRoteada})
+
+
+def importar_modelos():
+    """Importa todos os modelos, para o metadata ficar completo (migrações,
+    ``create_all``) mesmo sem nenhum recurso carregado."""
+    for nome in MODELOS:
+        importlib.import_module(f"models.{nome}")
+
+
+def init_app(app):
+    db.init_app(app)
+    app.after_request(marcar_leitura_no_primario)
+
+
+def marcar_leitura_no_primario(response):
+    if (REPLICA in current_app.config.get("SQLALCHEMY_BINDS", {})
+            and request.method not in METODOS_LEITURA and response.status_code < 400):
+        response.set_cookie(COOKIE_PRIMARIO, "1", max_age=ATRASO_REPLICA, httponly=True, samesite="Lax")
+    return response
@@ -0,0 +1,31 @@
+"""Datas e horas como o banco guarda: sem fuso, na hora local do servidor.
+
+As colunas são ``timestamp without time zone`` e tudo que decide "agora"
+(reservas ativas, quadro de chaves, horizonte do índice de disponibilidade)
+usa ``datetime.now()``. Um valor com fuso (``Z``, ``+00:00``) é convertido
+para a hora local e perde o fuso na entrada; se chegasse assim aos índices
+em memória, a primeira comparação com um valor sem fuso lançaria
+``TypeError``.
+"""
+from datetime import datetime
+from marshmallow import fields
+
+
+def sem_fuso(valor):
+    """``valor`` na hora local, sem ``tzinfo``; sem fuso fica como está."""
+    if valor is None or valor.tzinfo is None:
+        return valor
+    return valor.astimezone().replace(tzinfo=None)
+
+
+def data_hora(texto):
+    """``datetime.fromisoformat`` já sem fuso. Lança ``ValueError`` se
+    ``texto`` não for ISO 8601."""
+    return sem_fuso(datetime.fromisoformat(texto))
+
+
+class DataHora(fields.DateTime):
+    """``fields.DateTime`` que entrega o valor sem fuso (ver ``sem_fuso``)."""
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        return sem_fuso(super()._deserialize(value, attr, data, **kwargs))
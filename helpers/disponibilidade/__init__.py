@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from helpers.database import db
+from models.Reserva import Reserva
+
+TTL_PADRAO = 30
+
+
+class Intervalos:
+    """Intervalos ``[inicio, fim)`` de uma sala em um array ordenado por início.
+
+    Guarda também a maior duração vista: qualquer intervalo que cruze
+    ``[inicio, fim)`` começa em ``[inicio - maior_duracao, fim)``, então a
+    busca é feita com dois ``bisect`` mesmo se houver sobreposições.
+    """
+
+    def __init__(self, itens=()):
+        self._itens = sorted(itens)
+        self._maior_duracao = max((f - i for i, f, _ in self._itens), default=timedelta(0))
+
+    def __len__(self):
+        return len(self._itens)
+
+    def adicionar(self, inicio, fim, chave):
+        bisect.insort(self._itens, (inicio, fim, chave))
+        self._maior_duracao = max(self._maior_duracao, fim - inicio)
+
+    def remover(self, chave):
+        self._itens = [item for item in self._itens if item[2] != chave]
+
+    def sobrepostos(self, inicio, fim):
+        esquerda = bisect.bisect_left(self._itens, (inicio - self._maior_duracao,))
+        direita = bisect.bisect_left(self._itens, (fim,))
+        return [item for item in self._itens[esquerda:direita] if item[1] > inicio]
+
+
+class _Sala:
+    __slots__ = ("intervalos", "horizonte", "carregado_em")
+
+    def __init__(self, intervalos, horizonte):
+        self.intervalos = intervalos
+        self.horizonte = horizonte
+        self.carregado_em = time.monotonic()
+
+
+class IndiceDisponibilidade:
+    """Índice em memória das reservas futuras, um ``Intervalos`` por sala.
+
+    Cada sala é carregada do banco no primeiro acesso (só reservas que
+    terminam depois do momento da carga) e recarregada após ``ttl``
+    segundos, o que limita a defasagem em relação a alterações feitas por
+    outros processos. Janelas que começam antes do horizonte carregado não
+    podem ser respondidas pelo índice e retornam ``None``.
+    """
+
+    def __init__(self, ttl=TTL_PADRAO):
+        self.ttl = ttl
+        self._salas = {}
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def _entrada(self, sala_id):
+        with self._lock:
+            entrada = self._salas.get(sala_id)
+            if entrada and time.monotonic() - entrada.carregado_em < self.ttl:
+                return entrada
+            versao = self._versoes.get(sala_id, 0)
+
+        horizonte = datetime.now()
+        linhas = db.session.execute(
+            db.select(Reserva.data_hora_inicio, Reserva.data_hora_fim, Reserva.reserva_id)
+            .where(Reserva.sala_id == sala_id, Reserva.data_hora_fim > horizonte)
+        ).all()
+        entrada = _Sala(Intervalos(tuple(linha) for linha in linhas), horizonte)
+
+        with self._lock:
+            # Se a sala foi alterada durante a carga, o resultado pode estar
+            # defasado: usa só nesta chamada e deixa a próxima recarregar.
+            if self._versoes.get(sala_id, 0) == versao:
+                self._salas[sala_id] = entrada
+        return entrada
+
+    def ocupados(self, sala_id, inicio, fim):
+        """Reservas da sala que cruzam ``[inicio, fim)``, ou ``None`` se a
+        janela começa antes do que o índice guarda."""
+        entrada = self._entrada(sala_id)
+        if inicio < entrada.horizonte:
+            return None
+        with self._lock:
+            return entrada.intervalos.sobrepostos(inicio, fim)
+
+    def inicio_padrao(self, sala_id):
+        """"Agora" para janelas sem início informado: tomado depois da carga
+        da sala e arredondado para cima no segundo, então nunca fica antes
+        do horizonte e ``ocupados`` responde sem ir ao banco."""
+        entrada = self._entrada(sala_id)
+        agora = max(datetime.now(), entrada.horizonte)
+        if agora.microsecond:
+            agora = agora.replace(microsecond=0) + timedelta(seconds=1)
+        return agora
+
+    def conflita(self, sala_id, inicio, fim) -> bool:
+        return bool(self.ocupados(sala_id, inicio, fim))
+
+    def adicionar(self, reserva):
+        self.adicionar_intervalo(
+            reserva.sala_id, reserva.data_hora_inicio, reserva.data_hora_fim, reserva.reserva_id
+        )
+
+    def adicionar_intervalo(self, sala_id, inicio, fim, reserva_id):
+        with self._lock:
+            self._versoes[sala_id] = self._versoes.get(sala_id, 0) + 1
+            entrada = self._salas.get(sala_id)
+            if entrada and fim > entrada.horizonte:
+                entrada.intervalos.adicionar(inicio, fim, reserva_id)
+
+    def remover(self, sala_id, reserva_id):
+        with self._lock:
+            self._versoes[sala_id] = self._versoes.get(sala_id, 0) + 1
+            entrada = self._salas.get(sala_id)
+            if entrada:
+                entrada.intervalos.remover(reserva_id)
+
+    def invalidar(self, sala_id=None):
+        with self._lock:
+            if sala_id is None:
+                self._salas.clear()
+                return
+            self._versoes[sala_id] = self._versoes.get(sala_id, 0) + 1
+            self._salas.pop(sala_id, None)
+
+
+def livres(ocupados, inicio, fim):
+    """Lacunas de ``[inicio, fim)`` não cobertas por ``ocupados``. As chaves
+    não entram na ordenação: podem ser de tipos diferentes (reservas e
+    ocorrências de recorrência)."""
+    lacunas = []
+    cursor = inicio
+    for ocupado_inicio, ocupado_fim, _ in sorted(ocupados, key=lambda ocupado: ocupado[:2]):
+        if ocupado_inicio > cursor:
+            lacunas.append((cursor, min(ocupado_inicio, fim)))
+        cursor = max(cursor, ocupado_fim)
+        if cursor >= fim:
+            break
+    if cursor < fim:
+        lacunas.append((cursor, fim))
+    return lacunas
+
+
+disponibilidade = IndiceDisponibilidade()
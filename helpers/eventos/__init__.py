@@ -0,0 +1,127 @@
+import json
+import queue
+import threading
+import uuid
+from collections import deque
+
+REPLAY_MAXIMO = 1000
+FILA_MAXIMA = 256
+INTERVALO_PING = 15
+RECONEXAO_MS = 3000
+
+
+class Assinante:
+    __slots__ = ("fila", "transbordou")
+
+    def __init__(self):
+        self.fila = queue.Queue(maxsize=FILA_MAXIMA)
+        self.transbordou = False
+
+
+class BarramentoEventos:
+    """Fan-out em processo das alterações confirmadas no banco.
+
+    Cada evento recebe um id ``<instância>-<sequência>`` e fica nos últimos
+    ``REPLAY_MAXIMO`` para quem reconecta com ``Last-Event-ID``. Cada
+    assinante tem uma fila de ``FILA_MAXIMA`` eventos; quem não consome a
+    tempo é desligado com um evento ``sincronizar`` em vez de segurar
+    memória ou atrasar quem publica. O mesmo evento é enviado quando o id
+    informado é de outra instância ou já saiu do buffer: o cliente deve
+    recarregar o que exibe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Começa uma instância nova, sem eventos nem assinantes. Cada
+        worker chama depois do fork (``helpers.servidor.apos_fork``): com
+        ``preload`` todos herdariam a instância do mestre e um id de um
+        worker seria aceito como replay por outro."""
+        with self._lock:
+            self.instancia = uuid.uuid4().hex
+            self._sequencia = 0
+            self._buffer = deque(maxlen=REPLAY_MAXIMO)
+            self._assinantes = set()
+
+    def publicar(self, tipo, **dados):
+        """Chamar depois do ``commit``; ``dados`` deve ser só o que
+        identifica a alteração (ids), o cliente busca o resto."""
+        with self._lock:
+            self._sequencia += 1
+            evento = (self._sequencia, tipo, json.dumps(dados, default=str))
+            self._buffer.append(evento)
+            for assinante in self._assinantes:
+                if assinante.transbordou:
+                    continue
+                try:
+                    assinante.fila.put_nowait(evento)
+                except queue.Full:
+                    assinante.transbordou = True
+
+    def _perdidos(self, ultimo_id):
+        """Eventos após ``ultimo_id``, ou ``None`` se não dá para saber."""
+        instancia, _, sequencia = (ultimo_id or "").partition("-")
+        if instancia != self.instancia or not sequencia.isdigit():
+            return None
+        sequencia = int(sequencia)
+        if self._buffer and sequencia < self._buffer[0][0] - 1:
+            return None
+        return [evento for evento in self._buffer if evento[0] > sequencia]
+
+    def assinar(self, ultimo_id=None):
+        """Registra um assinante e devolve ``(assinante, replay)``. O
+        replay é ``None`` quando o cliente precisa se sincronizar."""
+        assinante = Assinante()
+        with self._lock:
+            replay = self._perdidos(ultimo_id) if ultimo_id else []
+            self._assinantes.add(assinante)
+        return assinante, replay
+
+    def cancelar(self, assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def assinantes(self):
+        with self._lock:
+            return len(self._assinantes)
+
+    def _formatar(self, evento):
+        sequencia, tipo, dados = evento
+        return f"id: {self.instancia}-{sequencia}\nevent: {tipo}\ndata: {dados}\n\n"
+
+    def _sincronizar(self):
+        with self._lock:
+            ultimo = f"{self.instancia}-{self._sequencia}"
+        return f"id: {ultimo}\nevent: sincronizar\ndata: {{}}\n\n"
+
+    def stream(self, ultimo_id=None):
+        """Gerador no formato ``text/event-stream``; manda um comentário a
+        cada ``INTERVALO_PING`` segundos para manter a conexão aberta."""
+        assinante, replay = self.assinar(ultimo_id)
+        try:
+            yield f"retry: {RECONEXAO_MS}\n\n"
+            if replay is None:
+                yield self._sincronizar()
+            else:
+                for evento in replay:
+                    yield self._formatar(evento)
+            while True:
+                try:
+                    evento = assinante.fila.get(timeout=INTERVALO_PING)
+                except queue.Empty:
+                    if assinante.transbordou:
+                        yield self._sincronizar()
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield self._formatar(evento)
+                if assinante.transbordou and assinante.fila.empty():
+                    yield self._sincronizar()
+                    return
+        finally:
+            self.cancelar(assinante)
+
+
+eventos = BarramentoEventos()
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+from helpers.database import db
+
+TAMANHO_LOTE = 5000
+FORMATOS_IMPORTACAO = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class ArquivoInvalido(ValueError):
+    pass
+
+
+def formato_do_envio(request):
+    """``?formato=`` ou, na falta dele, o tipo do arquivo enviado."""
+    formato = request.args.get("formato")
+    if formato:
+        if formato not in FORMATOS_IMPORTACAO:
+            raise ArquivoInvalido(f"Formato inválido, use um de: {', '.join(FORMATOS_IMPORTACAO)}.")
+        return formato
+    arquivo = request.files.get("arquivo")
+    mimetype = arquivo.mimetype if arquivo else request.mimetype
+    nome = (arquivo.filename or "") if arquivo else ""
+    if mimetype in ("application/x-ndjson", "application/jsonl") or nome.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def corpo_do_envio(request):
+    """O arquivo como texto em stream: o campo ``arquivo`` de um multipart
+    ou o próprio corpo da requisição."""
+    arquivo = request.files.get("arquivo")
+    bruto = arquivo.stream if arquivo else request.stream
+    return io.TextIOWrapper(bruto, encoding="utf-8-sig", newline="")
+
+
+def ler_csv(texto, colunas):
+    """``(linha, registro)`` para cada linha de dados; ``linha`` é a linha
+    física no arquivo (o cabeçalho é a 1)."""
+    leitor = csv.DictReader(texto)
+    faltando = set(colunas) - set(leitor.fieldnames or ())
+    if faltando:
+        raise ArquivoInvalido(f"Colunas ausentes no cabeçalho: {', '.join(sorted(faltando))}.")
+    for registro in leitor:
+        if any(registro.values()):
+            yield leitor.line_num, {coluna: registro[coluna] or None for coluna in colunas}
+
+
+def ler_ndjson(texto, colunas):
+    """``(linha, registro)``; linhas que não são um objeto JSON viram
+    ``(linha, None)``."""
+    for linha, conteudo in enumerate(texto, start=1):
+        if not conteudo.strip():
+            continue
+        try:
+            registro = json.loads(conteudo)
+        except ValueError:
+            registro = None
+        if not isinstance(registro, dict):
+            yield linha, None
+            continue
+        yield linha, {coluna: registro.get(coluna) for coluna in colunas}
+
+
+def tabela_temporaria(nome, *colunas):
+    """Tabela de staging visível só para a conexão atual. No Postgres ela
+    some no ``commit``; nos outros bancos chame ``descartar`` no fim."""
+    metadata = db.MetaData()
+    tabela = db.Table(nome, metadata, *colunas, prefixes=["TEMPORARY"], postgresql_on_commit="DROP")
+    conexao = db.session.connection()
+    if conexao.dialect.name != "postgresql":
+        tabela.drop(conexao, checkfirst=True)
+    tabela.create(conexao)
+    return tabela
+
+
+def descartar(tabela):
+    conexao = db.session.connection()
+    if conexao.dialect.name != "postgresql":
+        tabela.drop(conexao, checkfirst=True)
+
+
+def copiar(tabela, colunas, linhas):
+    """Carrega em ``tabela`` as tuplas de ``linhas``, na ordem de
+    ``colunas``, em lotes. No Postgres usa ``COPY ... FROM STDIN`` na mesma
+    transação da sessão; nos outros bancos, ``executemany``."""
+    conexao = db.session.connection()
+    total = 0
+
+    if conexao.dialect.name == "postgresql":
+        cursor = conexao.connection.driver_connection.cursor()
+        comando = f"COPY {tabela.name} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)"
+        for lote in _lotes(linhas):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(lote)
+            buffer.seek(0)
+            cursor.copy_expert(comando, buffer)
+            total += len(lote)
+        return total
+
+    for lote in _lotes(linhas):
+        conexao.execute(tabela.insert(), [dict(zip(colunas, linha)) for linha in lote])
+        total += len(lote)
+    return total
+
+
+def _lotes(linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == TAMANHO_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
@@ -1,21 +1,87 @@
+import atexit
+import os
+import queue
 import traceback
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 
 logger = logging.getLogger(__name__)
 
-logger.setLevel(logging.INFO)
-
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
-streamHandler = logging.StreamHandler()
-streamHandler.setFormatter(formatter)
-logger.addHandler(streamHandler)
+_listener = None
+
+
+def criar_handlers(nomes=None):
+    """Handlers de saída a partir do ambiente.
+
+    ``LOG_HANDLERS``  lista separada por vírgula: ``stream``, ``file`` (padrão ambos);
+                      ``nomes`` tem precedência sobre ela
+    ``LOG_ARQUIVO``   caminho do arquivo (padrão ``app.log``)
+    ``LOG_ROTACAO``   ``tamanho`` (padrão) ou ``tempo``
+    ``LOG_MAX_BYTES`` tamanho máximo por arquivo na rotação por tamanho (padrão 10 MB)
+    ``LOG_QUANDO``    intervalo da rotação por tempo (padrão ``midnight``)
+    ``LOG_BACKUPS``   quantos arquivos antigos manter (padrão 5)
+    """
+    if nomes is None:
+        nomes = os.environ.get("LOG_HANDLERS", "stream,file")
+    nomes = {nome.strip() for nome in nomes.split(",") if nome.strip()}
+    handlers = []
+
+    if "stream" in nomes:
+        handlers.append(logging.StreamHandler())
+
+    if "file" in nomes:
+        arquivo = os.environ.get("LOG_ARQUIVO", "app.log")
+        backups = int(os.environ.get("LOG_BACKUPS", 5))
+        if os.environ.get("LOG_ROTACAO", "tamanho") == "tempo":
+            fileHandler = TimedRotatingFileHandler(
+                arquivo, when=os.environ.get("LOG_QUANDO", "midnight"), backupCount=backups, encoding="utf-8"
+            )
+        else:
+            fileHandler = RotatingFileHandler(
+                arquivo, maxBytes=int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+                backupCount=backups, encoding="utf-8"
+            )
+        handlers.append(fileHandler)
+
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def configurar_logging(handlers=None):
+    """Liga o ``logger`` a uma fila: a thread da requisição só enfileira o
+    registro e um ``QueueListener`` em segundo plano faz a escrita (e a
+    rotação) nos handlers reais."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    fila = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(fila))
+
+    _listener = QueueListener(fila, *(criar_handlers() if handlers is None else handlers), respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def parar_logging():
+    """Esvazia a fila e desliga o pipeline (chamado também no ``atexit``)."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    for handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(handler)
+    _listener = None
+
 
-fileHandler = RotatingFileHandler('app.log', maxBytes=10000, backupCount=3)
-fileHandler.setFormatter(formatter)
-logger.addHandler(fileHandler)
+atexit.register(parar_logging)
 
 def log_exception(mensagem: str):
     formatted_tb = traceback.format_exc().replace('\n', '\n\t')
-    logger.error(f"{mensagem}:\n\t{formatted_tb}")
\ No newline at end of file
+    logger.error(f"{mensagem}:\n\t{formatted_tb}")
@@ -0,0 +1,187 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from helpers.database import db
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores, extra=""):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} counter"]
+        with self._lock:
+            for valores, total in sorted(self._valores.items()):
+                linhas.append(f"{self.nome}{_rotulos(self.rotulos, valores)} {total}")
+        return linhas
+
+
+class Histograma:
+    def __init__(self, nome, descricao, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = rotulos
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            for valores, (contagens, soma, total) in sorted(self._series.items()):
+                acumulado = 0
+                for limite, contagem in zip(self.buckets + ("+Inf",), contagens):
+                    acumulado += contagem
+                    le = f'le="{limite}"'
+                    linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, valores, le)} {acumulado}")
+                linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {soma}")
+                linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, valores)} {total}")
+        return linhas
+
+
+requisicoes = Contador(
+    "keycontrol_http_requisicoes_total", "Requisições atendidas.", ("rota", "metodo", "status")
+)
+duracao_requisicao = Histograma(
+    "keycontrol_http_requisicao_segundos", "Tempo total da requisição.", ("rota", "metodo")
+)
+consultas_requisicao = Histograma(
+    "keycontrol_db_consultas_por_requisicao", "Consultas SQL por requisição.", ("rota", "metodo"),
+    buckets=BUCKETS_CONSULTAS
+)
+tempo_db_requisicao = Histograma(
+    "keycontrol_db_segundos_por_requisicao", "Tempo gasto no banco por requisição.", ("rota", "metodo")
+)
+duracao_fase = Histograma(
+    "keycontrol_fase_segundos", "Tempo por fase (validacao, serializacao) por requisição.", ("rota", "metodo", "fase")
+)
+duracao_consulta = Histograma(
+    "keycontrol_db_consulta_segundos", "Duração de cada consulta SQL."
+)
+orcamento_excedido = Contador(
+    "keycontrol_orcamento_consultas_excedido_total", "Requisições acima do orçamento de consultas (ver helpers.orcamento).",
+    ("rota", "metodo")
+)
+
+METRICAS = [
+    requisicoes, duracao_requisicao, consultas_requisicao, tempo_db_requisicao, duracao_fase, duracao_consulta,
+    orcamento_excedido,
+]
+
+
+def _medidas():
+    if not has_request_context():
+        return None
+    return g.get("_metricas")
+
+
+def registrar_fase(fase, segundos):
+    """Soma ``segundos`` à fase ``fase`` da requisição atual, se houver."""
+    medidas = _medidas()
+    if medidas is not None:
+        medidas["fases"][fase] = medidas["fases"].get(fase, 0.0) + segundos
+
+
+def _antes_cursor(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metricas_inicio", []).append(time.perf_counter())
+
+
+def _depois_cursor(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["_metricas_inicio"].pop()
+    duracao = time.perf_counter() - inicio
+    duracao_consulta.observar(duracao)
+    medidas = _medidas()
+    if medidas is not None:
+        medidas["db_consultas"] += 1
+        medidas["db_segundos"] += duracao
+
+
+def _erro_cursor(contexto):
+    # after_cursor_execute não dispara quando a consulta falha.
+    if contexto.connection is not None and contexto.connection.info.get("_metricas_inicio"):
+        contexto.connection.info["_metricas_inicio"].pop()
+
+
+def _rota():
+    return request.url_rule.rule if request.url_rule else "desconhecida"
+
+
+def _iniciar_requisicao():
+    g._metricas = {"inicio": time.perf_counter(), "db_consultas": 0, "db_segundos": 0.0, "fases": {}}
+
+
+def _finalizar_requisicao(response):
+    medidas = g.pop("_metricas", None)
+    if medidas is None:
+        return response
+
+    total = time.perf_counter() - medidas["inicio"]
+    rota, metodo = _rota(), request.method
+    requisicoes.inc(rota, metodo, str(response.status_code))
+    duracao_requisicao.observar(total, rota, metodo)
+    consultas_requisicao.observar(medidas["db_consultas"], rota, metodo)
+    tempo_db_requisicao.observar(medidas["db_segundos"], rota, metodo)
+
+    tempos = [
+        f"total;dur={total * 1000:.2f}",
+        f'db;dur={medidas["db_segundos"] * 1000:.2f};desc="{medidas["db_consultas"]} consultas"',
+    ]
+    for fase, segundos in medidas["fases"].items():
+        duracao_fase.observar(segundos, rota, metodo, fase)
+        tempos.append(f"{fase};dur={segundos * 1000:.2f}")
+    response.headers["Server-Timing"] = ", ".join(tempos)
+    return response
+
+
+def init_app(app):
+    """Registra os hooks de requisição e os listeners de cursor nos engines."""
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _antes_cursor)
+            event.listen(engine, "after_cursor_execute", _depois_cursor)
+            event.listen(engine, "handle_error", _erro_cursor)
+
+
+def exportar(extras=()):
+    """Todas as métricas no formato de texto do Prometheus."""
+    linhas = []
+    for metrica in METRICAS:
+        linhas.extend(metrica.exportar())
+    linhas.extend(extras)
+    return "\n".join(linhas) + "\n"
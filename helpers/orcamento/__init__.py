@@ -0,0 +1,201 @@
+"""Orçamento de consultas SQL por requisição, contra regressões N+1.
+
+Cada método de recurso declara quantas consultas pode fazer::
+
+    class ReservasResource(Resource):
+        @orcamento_consultas(3)
+        def get(self):
+            ...
+
+Rotas de lote declaram uma função, avaliada a cada requisição
+(``orcamento_consultas(lambda: 14 + itens_do_corpo())``).
+
+As consultas são registradas pelos eventos de cursor dos engines. Quem
+passar do orçamento gera um aviso no log, com as consultas agrupadas pelo
+SQL normalizado, e incrementa ``keycontrol_orcamento_consultas_excedido_total``;
+no modo ``falhar`` também lança ``OrcamentoExcedido``, que o Flask
+propaga com ``TESTING`` (a requisição de teste quebra em vez de
+responder).
+
+``ORCAMENTO_CONSULTAS``  ``desligado``, ``avisar`` ou ``falhar`` (padrão
+                         ``falhar`` com ``TESTING``, senão ``desligado``)
+
+Respostas em stream passam o corpo por ``conferir_ao_fim``: as consultas
+feitas enquanto o corpo é gerado contam no mesmo orçamento.
+
+Fora de uma requisição, ``limitar_consultas`` faz a mesma verificação num
+bloco de código.
+"""
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+from helpers.database import db
+from helpers.logging import logger
+from helpers import metricas
+
+MODOS = ("desligado", "avisar", "falhar")
+# Quantos grupos de SQL o relatório mostra.
+GRUPOS_RELATORIO = 10
+
+_ESPACOS = re.compile(r"\s+")
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?")
+_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+_local = threading.local()
+
+
+class OrcamentoExcedido(AssertionError):
+    def __init__(self, registro, descricao="bloco"):
+        self.registro = registro
+        super().__init__(f"{descricao} excedeu o orçamento de consultas: {registro.relatorio()}")
+
+
+def normalizar(sql):
+    """SQL sem valores: literais e parâmetros viram ``?`` e listas de
+    parâmetros (``IN (?, ?, ?)``) viram ``(...)``, para a mesma consulta
+    repetida com valores diferentes cair no mesmo grupo."""
+    sql = _TEXTO.sub("?", sql)
+    sql = _PARAMETRO.sub("?", sql)
+    sql = _NUMERO.sub("?", sql)
+    sql = _LISTA.sub("(...)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+class Registro:
+    def __init__(self, maximo=None):
+        self.maximo = maximo
+        self.consultas = []
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    def excedeu(self):
+        return self.maximo is not None and self.total > self.maximo
+
+    def agrupadas(self):
+        """``[(sql normalizado, vezes)]``, do mais repetido ao menos."""
+        return Counter(normalizar(sql) for sql in self.consultas).most_common()
+
+    def relatorio(self):
+        grupos = self.agrupadas()
+        linhas = [f"{self.total} consultas (máximo {self.maximo})"]
+        linhas.extend(f"  {vezes}x {sql}" for sql, vezes in grupos[:GRUPOS_RELATORIO])
+        if len(grupos) > GRUPOS_RELATORIO:
+            linhas.append(f"  ... mais {len(grupos) - GRUPOS_RELATORIO} consultas distintas")
+        return "\n".join(linhas)
+
+
+def _ativos():
+    ativos = getattr(_local, "ativos", None)
+    if ativos is None:
+        ativos = _local.ativos = []
+    return ativos
+
+
+def _registrar(conn, cursor, statement, parameters, context, executemany):
+    for registro in _ativos():
+        registro.consultas.append(statement)
+
+
+@contextmanager
+def limitar_consultas(maximo=None, descricao="bloco"):
+    """Registra as consultas do bloco (na thread atual) e lança
+    ``OrcamentoExcedido`` na saída se passarem de ``maximo``. Com
+    ``maximo=None`` só registra."""
+    registro = Registro(maximo)
+    ativos = _ativos()
+    ativos.append(registro)
+    try:
+        yield registro
+    finally:
+        ativos.remove(registro)
+    if registro.excedeu():
+        raise OrcamentoExcedido(registro, descricao)
+
+
+def orcamento_consultas(maximo):
+    """Declara o máximo de consultas da requisição que chega a este método.
+
+    ``maximo`` também pode ser uma função sem argumentos, chamada no início
+    de cada requisição, para rotas cujo trabalho cresce com o corpo (lotes).
+    """
+    def decorador(metodo):
+        @wraps(metodo)
+        def envolvido(*args, **kwargs):
+            registro = g.get("_orcamento") if has_request_context() else None
+            if registro is not None:
+                registro.maximo = maximo() if callable(maximo) else maximo
+            return metodo(*args, **kwargs)
+
+        envolvido.orcamento_consultas = maximo
+        return envolvido
+    return decorador
+
+
+def itens_do_corpo():
+    """Quantos itens tem o corpo JSON da requisição, se for uma lista."""
+    dados = request.get_json(silent=True)
+    return len(dados) if isinstance(dados, list) else 0
+
+
+def _iniciar_requisicao():
+    g._orcamento = Registro()
+    _ativos().append(g._orcamento)
+
+
+def _conferir(registro):
+    if registro is None or not registro.excedeu():
+        return
+
+    rota = request.url_rule.rule if request.url_rule else "desconhecida"
+    metricas.orcamento_excedido.inc(rota, request.method)
+    erro = OrcamentoExcedido(registro, f"{request.method} {rota}")
+    logger.warning(str(erro))
+    if current_app.config["ORCAMENTO_CONSULTAS"] == "falhar":
+        raise erro
+
+
+def _conferir_requisicao(response):
+    _conferir(g.get("_orcamento"))
+    return response
+
+
+def conferir_ao_fim(corpo):
+    """Confere o orçamento de novo quando ``corpo`` termina.
+
+    Para respostas em stream (``stream_with_context``): as consultas do
+    gerador rodam depois do ``after_request`` e só entram na conta aqui,
+    ainda no contexto da requisição, antes do ``teardown``.
+    """
+    yield from corpo
+    _conferir(g.get("_orcamento"))
+
+
+def _encerrar_requisicao(exc):
+    registro = g.pop("_orcamento", None)
+    if registro is not None and registro in _ativos():
+        _ativos().remove(registro)
+
+
+def init_app(app):
+    """Liga o registro de consultas nos engines e, fora do modo
+    ``desligado``, a conferência a cada requisição."""
+    modo = app.config.get("ORCAMENTO_CONSULTAS") or ("falhar" if app.testing else "desligado")
+    if modo not in MODOS:
+        raise ValueError(f"ORCAMENTO_CONSULTAS deve ser um de {MODOS}, não {modo!r}")
+    app.config["ORCAMENTO_CONSULTAS"] = modo
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "after_cursor_execute", _registrar)
+    if modo != "desligado":
+        app.before_request(_iniciar_requisicao)
+        app.after_request(_conferir_requisicao)
+        app.teardown_request(_encerrar_requisicao)
@@ -0,0 +1,66 @@
+import base64
+import binascii
+import json
+from flask import request
+from helpers.database import db
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 1000
+
+
+class PaginacaoInvalida(ValueError):
+    pass
+
+
+def encode_cursor(valor) -> str:
+    bruto = json.dumps({"k": valor}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        bruto = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        valor = json.loads(bruto)["k"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise PaginacaoInvalida("Cursor inválido.")
+    # ``bool`` é subclasse de ``int``: sem a exclusão ``true`` viraria id 1.
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise PaginacaoInvalida("Cursor inválido.")
+    return valor
+
+
+def modo_cursor() -> bool:
+    return "after" in request.args or "limit" in request.args
+
+
+def _limite() -> int:
+    try:
+        limite = int(request.args.get("limit", LIMITE_PADRAO))
+    except ValueError:
+        raise PaginacaoInvalida("O parâmetro limit deve ser um número inteiro.")
+    if limite < 1:
+        raise PaginacaoInvalida("O parâmetro limit deve ser maior que 0.")
+    return min(limite, LIMITE_MAXIMO)
+
+
+def pagina_por_cursor(query, coluna):
+    """Pagina ``query`` por keyset sobre ``coluna`` (``?after=<cursor>&limit=``).
+
+    Em vez de ``OFFSET`` a consulta busca direto a partir da última chave
+    vista, então qualquer página custa o mesmo que a primeira. Retorna os
+    itens da página e o cursor da próxima (``None`` na última página).
+    """
+    limite = _limite()
+    after = request.args.get("after")
+    if after:
+        query = query.where(coluna > decode_cursor(after))
+
+    itens = db.session.execute(
+        query.order_by(coluna).limit(limite + 1)
+    ).scalars().all()
+
+    proximo = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo = encode_cursor(getattr(itens[-1], coluna.key))
+    return itens, proximo
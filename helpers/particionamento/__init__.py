@@ -0,0 +1,87 @@
+import re
+import click
+from datetime import date
+from flask.cli import AppGroup
+from helpers.database import db
+
+MESES_A_FRENTE = 3
+PARTICAO_MENSAL = re.compile(r"^historico_(\d{4})_(\d{2})$")
+
+
+class ParticionamentoIndisponivel(click.ClickException):
+    pass
+
+
+def _exigir_postgres():
+    if db.engine.dialect.name != "postgresql":
+        raise ParticionamentoIndisponivel("O particionamento de historico só existe no PostgreSQL.")
+
+
+def criar_particoes(meses=MESES_A_FRENTE):
+    """Garante as partições mensais de historico do mês atual até
+    ``meses`` à frente (ver migração 181cadb6436d). Idempotente."""
+    _exigir_postgres()
+    criadas = db.session.execute(
+        db.text(
+            "SELECT historico_criar_particoes(current_date, "
+            "(current_date + make_interval(months => :meses))::date)"
+        ),
+        {"meses": meses}
+    ).scalar()
+    db.session.commit()
+    return criadas
+
+
+def particoes():
+    """``[(nome, limites)]`` das partições de historico, em ordem."""
+    _exigir_postgres()
+    return db.session.execute(db.text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'historico'::regclass ORDER BY c.relname"
+    )).all()
+
+
+def desanexar(antes: date, remover=False):
+    """Desanexa as partições mensais anteriores ao mês de ``antes``; com
+    ``remover`` elas também são apagadas. Em vez de um DELETE enorme, cada
+    mês sai com uma operação só de catálogo."""
+    _exigir_postgres()
+    limite = (antes.year, antes.month)
+    nomes = []
+    for nome, _ in particoes():
+        mes = PARTICAO_MENSAL.match(nome)
+        if mes and (int(mes.group(1)), int(mes.group(2))) < limite:
+            db.session.execute(db.text(f'ALTER TABLE historico DETACH PARTITION "{nome}"'))
+            if remover:
+                db.session.execute(db.text(f'DROP TABLE "{nome}"'))
+            nomes.append(nome)
+    db.session.commit()
+    return nomes
+
+
+historico_cli = AppGroup("historico", help="Manutenção das partições de historico.")
+
+
+@historico_cli.command("criar-particoes")
+@click.option("--meses", default=MESES_A_FRENTE, show_default=True, help="Meses à frente a garantir.")
+def criar_particoes_comando(meses):
+    """Cria as partições dos próximos meses (rodar pelo cron)."""
+    click.echo(f"{criar_particoes(meses)} partição(ões) criada(s).")
+
+
+@historico_cli.command("particoes")
+def particoes_comando():
+    """Lista as partições e seus limites."""
+    for nome, limites in particoes():
+        click.echo(f"{nome:<20} {limites}")
+
+
+@historico_cli.command("desanexar")
+@click.option("--antes", required=True, type=click.DateTime(formats=["%Y-%m"]), help="Primeiro mês mantido (AAAA-MM).")
+@click.option("--remover", is_flag=True, help="Apaga as partições em vez de só desanexar.")
+def desanexar_comando(antes, remover):
+    """Tira do historico os meses anteriores a --antes."""
+    nomes = desanexar(antes.date(), remover)
+    acao = "removida(s)" if remover else "desanexada(s)"
+    click.echo(f"{len(nomes)} partição(ões) {acao}: {', '.join(nomes) or '-'}")
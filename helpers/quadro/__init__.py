@@ -0,0 +1,215 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, time as hora, timedelta
+from helpers.database import db
+from models.Sala import Sala
+from models.Reserva import Reserva
+from models.Responsavel import Responsavel
+from models.Finalizar import Finalizar
+
+TTL_PADRAO = 60
+JANELA_ATRASO = timedelta(days=7)
+SITUACOES = ("disponivel", "emprestada", "atrasada")
+
+
+def fim_do_dia(agora):
+    """Meia-noite seguinte a ``agora``: até lá vale a janela carregada."""
+    return datetime.combine(agora.date() + timedelta(days=1), hora())
+
+
+class _Estado:
+    __slots__ = ("salas", "pendentes", "reservas", "responsaveis", "valido_ate", "carregado_em")
+
+    def __init__(self, salas, pendentes, reservas, responsaveis, valido_ate):
+        self.salas = salas
+        self.pendentes = pendentes
+        self.reservas = reservas
+        self.responsaveis = responsaveis
+        self.valido_ate = valido_ate
+        self.carregado_em = time.monotonic()
+
+
+class QuadroChaves:
+    """Quem está com cada chave agora, mantido em memória.
+
+    Guarda, por sala, as reservas ainda não finalizadas que começam até o
+    fim do dia, em ordem de início (as que ainda não começaram viram
+    empréstimo com o passar do tempo, sem nenhuma escrita), e a primeira
+    depois disso, que é só a próxima reserva. A chave está com a última
+    reserva que já começou e, se essa reserva já terminou, está atrasada.
+    Reservas que terminaram há mais de ``JANELA_ATRASO`` sem finalização
+    contam como ausência e ficam de fora.
+
+    O estado vem de duas consultas e é refeito após ``ttl`` segundos ou na
+    virada do dia, o que limita a defasagem em relação a escritas de outros
+    processos; as escritas deste processo o atualizam na hora. Reservas de
+    dias seguintes nunca são lidas em bloco: cada recarga custa o dia de
+    hoje, não a agenda inteira.
+    """
+
+    def __init__(self, ttl=TTL_PADRAO):
+        self.ttl = ttl
+        self._estado_atual = None
+        self._versao = 0
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        """Refaz o quadro a partir do banco: todas as salas com as reservas
+        pendentes de hoje e seus responsáveis, em um SELECT com dois LEFT
+        JOIN, e a primeira reserva pendente de cada sala depois de hoje."""
+        with self._lock:
+            versao = self._versao
+
+        agora = datetime.now()
+        valido_ate = fim_do_dia(agora)
+        nao_finalizada = ~db.exists().where(Finalizar.reserva_id == Reserva.reserva_id)
+        pendente = db.and_(
+            Reserva.sala_id == Sala.sala_id,
+            Reserva.data_hora_fim > agora - JANELA_ATRASO,
+            Reserva.data_hora_inicio < valido_ate,
+            nao_finalizada
+        )
+        linhas = db.session.execute(
+            db.select(
+                Sala.sala_id, Sala.sala_nome, Sala.chave_nome,
+                Reserva.data_hora_inicio, Reserva.data_hora_fim, Reserva.reserva_id,
+                Responsavel.responsavel_id, Responsavel.responsavel_nome
+            )
+            .select_from(Sala)
+            .outerjoin(Reserva, pendente)
+            .outerjoin(Responsavel, Responsavel.responsavel_id == Reserva.responsavel_id)
+        ).all()
+
+        # Uma busca no índice (sala_id, data_hora_inicio) por sala.
+        proxima = (
+            db.select(Reserva.reserva_id)
+            .where(Reserva.sala_id == Sala.sala_id, Reserva.data_hora_inicio >= valido_ate, nao_finalizada)
+            .order_by(Reserva.data_hora_inicio, Reserva.reserva_id)
+            .limit(1)
+            .correlate(Sala)
+            .scalar_subquery()
+        )
+        proximas = db.session.execute(
+            db.select(
+                Reserva.sala_id, Reserva.data_hora_inicio, Reserva.data_hora_fim, Reserva.reserva_id,
+                Responsavel.responsavel_id, Responsavel.responsavel_nome
+            )
+            .join(Responsavel, Responsavel.responsavel_id == Reserva.responsavel_id)
+            .where(Reserva.reserva_id.in_(db.select(proxima).select_from(Sala)))
+        ).all()
+
+        salas, pendentes, reservas, responsaveis = {}, defaultdict(list), {}, {}
+        for sala_id, sala_nome, chave_nome, *reserva in linhas:
+            salas[sala_id] = {"sala_nome": sala_nome, "chave_nome": chave_nome}
+            if reserva[2] is not None:
+                pendentes[sala_id].append(reserva)
+        for sala_id, *reserva in proximas:
+            pendentes[sala_id].append(reserva)
+        for sala_id, itens in pendentes.items():
+            itens.sort()
+            for i, (inicio, fim, reserva_id, responsavel_id, responsavel_nome) in enumerate(itens):
+                itens[i] = (inicio, fim, reserva_id, responsavel_id)
+                reservas[reserva_id] = sala_id
+                responsaveis[responsavel_id] = responsavel_nome
+        estado = _Estado(salas, dict(pendentes), reservas, responsaveis, valido_ate)
+
+        with self._lock:
+            # Se houve escrita durante a carga, o resultado pode estar
+            # defasado: usa só nesta chamada e deixa a próxima recarregar.
+            if self._versao == versao:
+                self._estado_atual = estado
+        return estado
+
+    def _estado(self):
+        with self._lock:
+            estado = self._estado_atual
+            if (estado and time.monotonic() - estado.carregado_em < self.ttl
+                    and datetime.now() < estado.valido_ate):
+                return estado
+        return self.carregar()
+
+    def adicionar(self, reserva_id, sala_id, responsavel_id, inicio, fim, responsavel_nome):
+        with self._lock:
+            self._versao += 1
+            estado = self._estado_atual
+            if estado is None or fim <= datetime.now() - JANELA_ATRASO:
+                return
+            if sala_id not in estado.salas:
+                # Sala criada por outro processo: só a recarga a conhece.
+                self._estado_atual = None
+                return
+            itens = estado.pendentes.setdefault(sala_id, [])
+            item = (inicio, fim, reserva_id, responsavel_id)
+            if inicio >= estado.valido_ate:
+                # Depois de hoje só a primeira reserva interessa.
+                i = bisect.bisect_left(itens, (estado.valido_ate,))
+                if i < len(itens):
+                    if itens[i] < item:
+                        return
+                    del estado.reservas[itens.pop(i)[2]]
+            bisect.insort(itens, item)
+            estado.reservas[reserva_id] = sala_id
+            estado.responsaveis[responsavel_id] = responsavel_nome
+
+    def remover(self, reserva_ids):
+        """Tira do quadro reservas finalizadas ou apagadas."""
+        with self._lock:
+            self._versao += 1
+            estado = self._estado_atual
+            if estado is None:
+                return
+            for reserva_id in reserva_ids:
+                sala_id = estado.reservas.pop(reserva_id, None)
+                if sala_id is None:
+                    continue
+                itens = estado.pendentes[sala_id]
+                if any(item[2] == reserva_id and item[0] >= estado.valido_ate for item in itens):
+                    # Era a próxima reserva da sala e a seguinte não foi lida.
+                    self._estado_atual = None
+                    return
+                estado.pendentes[sala_id] = [item for item in itens if item[2] != reserva_id]
+
+    def invalidar(self):
+        """Para escritas que o quadro não acompanha item a item (salas,
+        responsáveis, edição de reservas): a próxima leitura recarrega."""
+        with self._lock:
+            self._versao += 1
+            self._estado_atual = None
+
+    def situacao(self, agora=None):
+        """Uma entrada por chave, em ordem de sala, sem acessar o banco
+        enquanto o quadro estiver carregado."""
+        estado = self._estado()
+        agora = agora or datetime.now()
+        chaves = []
+        with self._lock:
+            for sala_id, sala in sorted(estado.salas.items()):
+                itens = estado.pendentes.get(sala_id, ())
+                i = bisect.bisect_right(itens, (agora, datetime.max))
+                atual = itens[i - 1] if i else None
+                proxima = itens[i] if i < len(itens) else None
+
+                chave = {"sala_id": sala_id, **sala, "situacao": "disponivel", "reserva": None, "proxima_reserva": None}
+                if atual:
+                    chave["situacao"] = "emprestada" if atual[1] > agora else "atrasada"
+                    chave["reserva"] = self._reserva(atual, estado)
+                if proxima:
+                    chave["proxima_reserva"] = self._reserva(proxima, estado)
+                chaves.append(chave)
+        return chaves
+
+    @staticmethod
+    def _reserva(item, estado):
+        inicio, fim, reserva_id, responsavel_id = item
+        return {
+            "reserva_id": reserva_id,
+            "responsavel_id": responsavel_id,
+            "responsavel_nome": estado.responsaveis.get(responsavel_id),
+            "data_hora_inicio": inicio.isoformat(),
+            "data_hora_fim": fim.isoformat(),
+        }
+
+
+quadro = QuadroChaves()
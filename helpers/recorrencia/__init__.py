@@ -0,0 +1,243 @@
+"""Reservas recorrentes como regras: conflitos por aritmética, ocorrências
+só sob demanda.
+
+Uma ``Regra`` ocorre no dia ``d`` se ``d`` está em ``[data_inicio,
+data_fim]``, o dia da semana está na máscara, a semana de ``d`` dista da
+semana de ``data_inicio`` um múltiplo de ``intervalo`` e ``d`` não é
+exceção. As semanas são numeradas a partir de 0001-01-01 (uma segunda),
+então "semana de ``d``" é só ``(d.toordinal() - 1) // 7``.
+
+Duas regras com horários que se cruzam conflitam se existe uma semana
+``w`` com ``w ≡ base_a (mod k_a)`` e ``w ≡ base_b (mod k_b)`` e um dia da
+semana comum dentro das duas vigências: o teorema chinês do resto dá a
+primeira semana e as seguintes vêm a cada ``mmc(k_a, k_b)``. Cada exceção
+descarta no máximo uma data candidata, então a busca anda no máximo
+``len(excecoes) + 1`` passos, seja qual for a vigência. Contra uma reserva
+avulsa basta olhar os dias que ela cobre.
+"""
+from datetime import date, datetime, timedelta
+from math import gcd
+from helpers.database import db
+from models.ReservaRecorrente import ReservaRecorrente, ExcecaoRecorrencia, DIAS_SEMANA
+from models.Reserva import Reserva
+
+# Maior janela expandida de uma vez (listagens e ocorrências).
+JANELA_MAXIMA = timedelta(days=92)
+
+
+def semana(dia):
+    """Número absoluto da semana (de segunda a domingo) de ``dia``."""
+    return (dia.toordinal() - 1) // 7
+
+
+def _segunda(numero):
+    return date.fromordinal(numero * 7 + 1)
+
+
+def _dias(mascara):
+    return [dia for dia in range(DIAS_SEMANA) if mascara >> dia & 1]
+
+
+class Regra:
+    __slots__ = ("chave", "sala_id", "responsavel_id", "dias", "intervalo", "hora_inicio", "hora_fim",
+                 "data_inicio", "data_fim", "excecoes", "base")
+
+    def __init__(self, chave, sala_id, responsavel_id, dias, intervalo, hora_inicio, hora_fim,
+                 data_inicio, data_fim, excecoes=()):
+        self.chave = chave
+        self.sala_id = sala_id
+        self.responsavel_id = responsavel_id
+        self.dias = dias
+        self.intervalo = intervalo
+        self.hora_inicio = hora_inicio
+        self.hora_fim = hora_fim
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.excecoes = frozenset(excecoes)
+        self.base = semana(data_inicio)
+
+    @classmethod
+    def do_modelo(cls, recorrencia):
+        return cls(
+            recorrencia.recorrencia_id, recorrencia.sala_id, recorrencia.responsavel_id,
+            recorrencia.dias_semana, recorrencia.intervalo_semanas,
+            recorrencia.hora_inicio, recorrencia.hora_fim, recorrencia.data_inicio, recorrencia.data_fim,
+            (excecao.data for excecao in recorrencia.excecoes)
+        )
+
+    def ocorre_em(self, dia):
+        return (
+            self.data_inicio <= dia <= self.data_fim
+            and self.dias >> dia.weekday() & 1
+            and (semana(dia) - self.base) % self.intervalo == 0
+            and dia not in self.excecoes
+        )
+
+    def periodo(self, dia):
+        """``(inicio, fim)`` da ocorrência em ``dia``."""
+        return datetime.combine(dia, self.hora_inicio), datetime.combine(dia, self.hora_fim)
+
+    def ocorrencias(self, de, ate):
+        """``(inicio, fim)`` das ocorrências que cruzam ``[de, ate)``, em
+        ordem. Só percorre as semanas da regra dentro da janela."""
+        primeiro = max(self.data_inicio, de.date())
+        ultimo = min(self.data_fim, ate.date())
+        if primeiro > ultimo:
+            return
+        dias = _dias(self.dias)
+        numero = semana(primeiro)
+        numero += (self.base - numero) % self.intervalo
+        while True:
+            segunda = _segunda(numero)
+            if segunda > ultimo:
+                return
+            for dia_semana in dias:
+                dia = segunda + timedelta(days=dia_semana)
+                if dia < primeiro or dia in self.excecoes:
+                    continue
+                if dia > ultimo:
+                    return
+                inicio, fim = self.periodo(dia)
+                if inicio < ate and fim > de:
+                    yield inicio, fim
+            numero += self.intervalo
+
+    def cruza(self, inicio, fim):
+        """Primeiro dia em que uma ocorrência cruza ``[inicio, fim)``, ou
+        ``None``. Uma ocorrência não passa da meia-noite, então só os dias
+        que o período cobre podem conflitar."""
+        dia = max(inicio.date(), self.data_inicio)
+        ultimo = min(fim.date(), self.data_fim)
+        while dia <= ultimo:
+            if self.ocorre_em(dia):
+                comeco, termino = self.periodo(dia)
+                if comeco < fim and termino > inicio:
+                    return dia
+            dia += timedelta(days=1)
+        return None
+
+
+def primeiro_conflito(a, b):
+    """Primeiro dia em que as regras ``a`` e ``b`` ocorrem com horários que
+    se cruzam, ou ``None``, sem expandir nenhuma das duas."""
+    if not (a.hora_inicio < b.hora_fim and b.hora_inicio < a.hora_fim):
+        return None
+    dias = a.dias & b.dias
+    primeiro, ultimo = max(a.data_inicio, b.data_inicio), min(a.data_fim, b.data_fim)
+    if not dias or primeiro > ultimo:
+        return None
+
+    # w = base_a + k_a * t com k_a * t ≡ base_b - base_a (mod k_b): tem
+    # solução só se o mdc divide a diferença, e então t é único mod k_b / mdc.
+    mdc = gcd(a.intervalo, b.intervalo)
+    if (b.base - a.base) % mdc:
+        return None
+    modulo = b.intervalo // mdc
+    t = (b.base - a.base) // mdc * pow(a.intervalo // mdc, -1, modulo) % modulo
+    passo = a.intervalo // mdc * b.intervalo
+    numero = a.base + a.intervalo * t
+    numero -= (numero - semana(primeiro)) // passo * passo
+
+    dias = _dias(dias)
+    while True:
+        segunda = _segunda(numero)
+        if segunda > ultimo:
+            return None
+        for dia_semana in dias:
+            dia = segunda + timedelta(days=dia_semana)
+            if dia < primeiro:
+                continue
+            if dia > ultimo:
+                return None
+            if dia not in a.excecoes and dia not in b.excecoes:
+                return dia
+        numero += passo
+
+
+def regras_vigentes(de, ate, sala_ids=None, responsavel_id=None, ignorar=None):
+    """``Regra`` de cada recorrência vigente em algum dia de ``[de, ate]``
+    (datas); as exceções vêm numa segunda consulta (selectin)."""
+    consulta = (
+        db.select(ReservaRecorrente)
+        .where(ReservaRecorrente.data_inicio <= ate, ReservaRecorrente.data_fim >= de)
+        .options(db.selectinload(ReservaRecorrente.excecoes))
+    )
+    if sala_ids is not None:
+        consulta = consulta.where(ReservaRecorrente.sala_id.in_(sala_ids))
+    if responsavel_id is not None:
+        consulta = consulta.where(ReservaRecorrente.responsavel_id == responsavel_id)
+    if ignorar is not None:
+        consulta = consulta.where(ReservaRecorrente.recorrencia_id != ignorar)
+    return [Regra.do_modelo(recorrencia) for recorrencia in db.session.execute(consulta).scalars()]
+
+
+def regras_por_sala(sala_ids, de, ate):
+    regras = {}
+    for regra in regras_vigentes(de, ate, sala_ids=sala_ids):
+        regras.setdefault(regra.sala_id, []).append(regra)
+    return regras
+
+
+def conflito_com_regras(sala_id, inicio, fim, regras=None):
+    """``(recorrencia_id, dia)`` da primeira regra da sala que cruza
+    ``[inicio, fim)``, ou ``None``. ``regras`` evita a consulta quando o
+    chamador já carregou as regras da sala (lotes)."""
+    if regras is None:
+        regras = regras_vigentes(inicio.date(), fim.date(), sala_ids=[sala_id])
+    for regra in regras:
+        dia = regra.cruza(inicio, fim)
+        if dia is not None:
+            return regra.chave, dia
+    return None
+
+
+def conflito_da_regra(regra, ignorar=None):
+    """Primeiro conflito de ``regra`` na sala dela: ``{"recorrencia_id",
+    "data"}`` contra outra regra, ``{"reserva_id", "data"}`` contra uma
+    reserva avulsa, ou ``None``. Só é confiável dentro de
+    ``travar_salas``."""
+    for outra in regras_vigentes(regra.data_inicio, regra.data_fim, sala_ids=[regra.sala_id], ignorar=ignorar):
+        dia = primeiro_conflito(regra, outra)
+        if dia is not None:
+            return {"recorrencia_id": outra.chave, "data": dia.isoformat()}
+
+    reservas = db.session.execute(
+        db.select(Reserva.data_hora_inicio, Reserva.data_hora_fim, Reserva.reserva_id)
+        .where(
+            Reserva.sala_id == regra.sala_id,
+            Reserva.data_hora_inicio < datetime.combine(regra.data_fim, regra.hora_fim),
+            Reserva.data_hora_fim > datetime.combine(regra.data_inicio, regra.hora_inicio)
+        )
+        .order_by(Reserva.data_hora_inicio)
+    )
+    for inicio, fim, reserva_id in reservas:
+        dia = regra.cruza(inicio, fim)
+        if dia is not None:
+            return {"reserva_id": reserva_id, "data": dia.isoformat()}
+    return None
+
+
+def ocorrencias_na_janela(regras, de, ate):
+    """``(inicio, fim, regra)`` de todas as ``regras`` que cruzam
+    ``[de, ate)``, em ordem de início."""
+    return sorted(
+        ((inicio, fim, regra) for regra in regras for inicio, fim in regra.ocorrencias(de, ate)),
+        key=lambda ocorrencia: ocorrencia[:2]
+    )
+
+
+def materializar(recorrencia, dia):
+    """Transforma a ocorrência de ``dia`` em uma ``Reserva`` comum e o dia
+    em exceção da regra, na sessão atual e sem commit, para a ocorrência
+    seguir o caminho normal (finalização, histórico). Quem chama confere
+    antes que ``dia`` é uma ocorrência; uma segunda materialização do mesmo
+    dia esbarra na chave primária da exceção."""
+    inicio, fim = Regra.do_modelo(recorrencia).periodo(dia)
+    recorrencia.excecoes.append(ExcecaoRecorrencia(data=dia))
+    reserva = Reserva(
+        sala_id=recorrencia.sala_id, responsavel_id=recorrencia.responsavel_id,
+        data_hora_inicio=inicio, data_hora_fim=fim
+    )
+    db.session.add(reserva)
+    db.session.flush()
+    return reserva
@@ -0,0 +1,89 @@
+import importlib
+import threading
+from flask import request, abort
+from flask_restful import Api, Resource
+
+# (módulo em resources/, classe, métodos, rota). O módulo só é importado na
+# primeira requisição a uma das suas rotas, ou no aquecimento; os métodos
+# ficam aqui porque o Flask precisa deles ao registrar a regra.
+ROTAS = (
+    ("IndexResource", "IndexResource", ("GET",), "/"),
+    ("ProntoResource", "ProntoResource", ("GET",), "/pronto"),
+    ("SalaResource", "SalasResource", ("GET", "POST"), "/salas"),
+    ("SalaResource", "SalasLivresResource", ("GET",), "/salas/livres"),
+    ("SalaResource", "SalaResource", ("GET", "PUT", "DELETE"), "/salas/<int:sala_id>"),
+    ("SalaResource", "SalaDisponibilidadeResource", ("GET",), "/salas/<int:sala_id>/disponibilidade"),
+    ("SalaResource", "SalaUsoResource", ("GET",), "/salas/<int:sala_id>/uso"),
+    ("ReservaResource", "ReservasResource", ("GET", "POST"), "/reservas"),
+    ("ReservaResource", "ReservaResource", ("GET", "PUT", "DELETE"), "/reservas/<int:reserva_id>"),
+    ("ReservaResource", "ReservasLoteResource", ("POST",), "/reservas/lote"),
+    ("RecorrenciaResource", "RecorrenciasResource", ("GET", "POST"), "/recorrencias"),
+    ("RecorrenciaResource", "RecorrenciaResource", ("GET", "PUT", "DELETE"), "/recorrencias/<int:recorrencia_id>"),
+    ("RecorrenciaResource", "RecorrenciaExcecoesResource", ("POST",), "/recorrencias/<int:recorrencia_id>/excecoes"),
+    ("RecorrenciaResource", "RecorrenciaOcorrenciasResource", ("GET",), "/recorrencias/<int:recorrencia_id>/ocorrencias"),
+    ("ResponsavelResource", "ResponsaveisResource", ("GET", "POST"), "/responsaveis"),
+    ("ResponsavelResource", "ResponsavelResource", ("GET", "PUT", "DELETE"), "/responsaveis/<int:responsavel_id>"),
+    ("ResponsavelResource", "ResponsaveisImportacaoResource", ("POST",), "/responsaveis/importar"),
+    ("FinalizarResource", "FinalizacõesResource", ("GET", "POST"), "/finalizacoes"),
+    ("FinalizarResource", "FinalizarResource", ("GET", "PUT", "DELETE"), "/finalizacoes/<int:finalizar_id>"),
+    ("FinalizarResource", "FinalizacoesLoteResource", ("POST",), "/finalizacoes/lote"),
+    ("HistoricoResource", "HistoricosResource", ("GET", "POST"), "/historicos"),
+    ("HistoricoResource", "HistoricoResource", ("GET", "PUT", "DELETE"), "/historicos/<int:historico_id>"),
+    ("HistoricoResource", "HistoricosExportResource", ("GET",), "/historicos/export"),
+    ("ChaveResource", "ChavesStatusResource", ("GET",), "/chaves/status"),
+    ("EventoResource", "EventosResource", ("GET",), "/eventos"),
+    ("RelatorioResource", "OcupacaoResource", ("GET",), "/relatorios/ocupacao"),
+    ("CacheResource", "CacheResource", ("GET",), "/cache"),
+    ("MetricasResource", "MetricasResource", ("GET",), "/metrics"),
+)
+
+_classes = {}
+_lock = threading.Lock()
+
+
+def carregar(modulo, classe):
+    """Importa (uma vez) e devolve a classe do recurso."""
+    chave = (modulo, classe)
+    if chave not in _classes:
+        with _lock:
+            if chave not in _classes:
+                _classes[chave] = getattr(importlib.import_module(f"resources.{modulo}"), classe)
+    return _classes[chave]
+
+
+class RecursoPreguicoso(Resource):
+    """Repassa a requisição para o recurso de verdade, importado no primeiro
+    uso. Subclasses definem ``modulo``, ``classe`` e ``methods``."""
+    modulo = None
+    classe = None
+
+    def dispatch_request(self, *args, **kwargs):
+        recurso = carregar(self.modulo, self.classe)
+        metodo = request.method.lower()
+        if not hasattr(recurso, metodo) and not (metodo == "head" and hasattr(recurso, "get")):
+            abort(405)
+        return recurso().dispatch_request(*args, **kwargs)
+
+
+def registrar_rotas(app):
+    """Cria o ``Api`` do app com um ``RecursoPreguicoso`` por rota; os
+    endpoints têm o mesmo nome que teriam com a classe real."""
+    api = Api(app)
+    for modulo, classe, metodos, rota in ROTAS:
+        representante = type(classe, (RecursoPreguicoso,), {
+            "modulo": modulo, "classe": classe, "methods": set(metodos)
+        })
+        api.add_resource(representante, rota)
+    return api
+
+
+def carregar_todas():
+    """Importa todos os recursos e confere os métodos declarados em
+    ``ROTAS``; lança ``RuntimeError`` se algum divergir da classe."""
+    divergentes = []
+    for modulo, classe, metodos, rota in ROTAS:
+        recurso = carregar(modulo, classe)
+        if set(recurso.methods or ()) != set(metodos):
+            divergentes.append(f"{rota} ({classe}): declarado {sorted(metodos)}, classe {sorted(recurso.methods or ())}")
+    if divergentes:
+        raise RuntimeError("Métodos de ROTAS divergem dos recursos: " + "; ".join(divergentes))
@@ -0,0 +1,295 @@
+"""Servidor de produção: um mestre e N workers pré-forkados.
+
+O mestre abre o socket de escuta e forka os workers, que aceitam conexões
+do mesmo socket e atendem cada uma num pool de threads. O mestre não
+atende requisições: só repõe workers que morrerem e trata os sinais.
+
+``SIGTERM``/``SIGINT``  cada worker para de aceitar, termina as requisições
+                        em andamento e sai; o mestre sai depois
+``SIGHUP``              sobe uma geração nova de workers e drena a antiga
+
+Quem passar de ``tempo_drenagem`` segundos drenando leva ``SIGKILL``
+(conexões de ``/eventos`` nunca terminam sozinhas).
+
+Sem ``preload`` cada worker importa o app depois do fork, e o ``SIGHUP``
+carrega o código novo. Com ``preload`` o app é montado uma vez no mestre
+e os workers herdam a memória; o pool de conexões herdado é descartado em
+cada worker (``apos_fork``) para nenhuma conexão ser usada por dois
+processos.
+
+Estado em memória (caches, quadro de chaves, barramento de ``/eventos``,
+métricas, travas fora do Postgres) é de cada worker. Com vários workers,
+prefira ``LOG_HANDLERS=stream``: vários processos rotacionando o mesmo
+arquivo se atropelam.
+"""
+import importlib
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from helpers.logging import logger
+
+THREADS_PADRAO = 8
+TEMPO_DRENAGEM = 30
+BACKLOG = 2048
+# Intervalo do laço do mestre entre colher filhos e conferir sinais.
+INTERVALO_MESTRE = 0.1
+# Quanto o worker espera uma thread livre antes de voltar ao laço do
+# serve_forever (que confere o shutdown).
+ESPERA_THREAD_LIVRE = 0.5
+
+
+def carregar_app(alvo):
+    """``modulo:atributo`` (padrão ``app:app``) para o objeto WSGI."""
+    modulo, _, atributo = alvo.partition(":")
+    return getattr(importlib.import_module(modulo), atributo or "app")
+
+
+def apos_fork(app, aquecer=False):
+    """Prepara o app herdado no processo filho.
+
+    O pool de cada engine é trocado por um vazio sem fechar as conexões
+    herdadas (``close=False``): elas continuam sendo do mestre. O
+    ``QueueListener`` do log é uma thread e não sobrevive ao fork, então o
+    logging é religado. O barramento de ``/eventos`` ganha uma instância
+    própria, para os ids de eventos de um worker não valerem em outro. Com
+    ``aquecer`` o aquecimento roda aqui, no pool do próprio worker.
+    """
+    # Importados aqui: sem preload o mestre não carrega nada do app, e uma
+    # geração nova de workers (SIGHUP) importa o código atual.
+    from helpers.database import db
+    from helpers.eventos import eventos
+    from helpers.logging import configurar_logging, criar_handlers, parar_logging
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    eventos.reiniciar()
+
+    parar_logging()
+    configurar_logging(criar_handlers(app.config["LOG_HANDLERS"]))
+
+    if aquecer:
+        from helpers.aquecimento import iniciar
+
+        app.extensions["keycontrol"]["pronto"].clear()
+        iniciar(app)
+
+
+class _Tratador(WSGIRequestHandler):
+    # Sem keep-alive: uma conexão ociosa não prende uma thread do worker.
+    protocol_version = "HTTP/1.0"
+
+
+class ServidorWorker(BaseWSGIServer):
+    """Servidor WSGI sobre um socket já aberto, com um pool fixo de
+    ``threads`` (o ``ThreadingMixIn`` criaria uma thread por conexão).
+
+    Só aceita uma conexão quando há thread livre: sem isso o executor
+    enfileiraria sem limite, e a conexão esperaria aqui mesmo com outro
+    worker ocioso. Assim ela fica no backlog do socket, para o primeiro
+    worker com thread livre.
+    """
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, app, soquete, threads=THREADS_PADRAO):
+        host, porta = soquete.getsockname()[:2]
+        super().__init__(host, porta, app, handler=_Tratador, fd=soquete.fileno())
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="requisicao")
+        self._livres = threading.BoundedSemaphore(threads)
+
+    def get_request(self):
+        # Espera com prazo: o serve_forever precisa voltar ao laço para ver
+        # um shutdown(). O OSError faz o socketserver desistir desta vez.
+        if not self._livres.acquire(timeout=ESPERA_THREAD_LIVRE):
+            raise OSError("nenhuma thread livre")
+        try:
+            return super().get_request()
+        except BaseException:
+            self._livres.release()
+            raise
+
+    def process_request(self, request, client_address):
+        try:
+            futuro = self._executor.submit(self._atender, request, client_address)
+        except BaseException:
+            self._livres.release()
+            raise
+        futuro.add_done_callback(lambda _: self._livres.release())
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drenar(self):
+        """Espera as requisições já aceitas terminarem."""
+        self._executor.shutdown(wait=True)
+
+
+def _executar_worker(soquete, alvo, app, threads, aquecer):
+    # O filho herda os handlers do mestre; Ctrl-C chega ao grupo inteiro,
+    # mas quem decide o desligamento é o mestre (com SIGTERM).
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    if app is None:
+        from helpers.logging import parar_logging
+
+        # O listener herdado do mestre morreu no fork; sem isto o
+        # create_app do worker reaproveitaria a fila sem ninguém lendo.
+        parar_logging()
+        app = carregar_app(alvo)
+    apos_fork(app, aquecer)
+    servidor = ServidorWorker(app, soquete, threads)
+
+    def terminar(signum, frame):
+        # shutdown() espera o serve_forever sair: não pode rodar na thread
+        # que está dentro dele.
+        threading.Thread(target=servidor.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, terminar)
+    logger.info(f"Worker {os.getpid()} atendendo com {threads} threads")
+    servidor.serve_forever()
+    servidor.drenar()
+    logger.info(f"Worker {os.getpid()} drenado")
+
+
+class Mestre:
+    def __init__(self, alvo="app:app", host="127.0.0.1", porta=8000, workers=None,
+                 threads=THREADS_PADRAO, preload=False, tempo_drenagem=TEMPO_DRENAGEM):
+        self.alvo = alvo
+        self.host = host
+        self.porta = porta
+        self.workers = workers or os.cpu_count() or 2
+        self.threads = threads
+        self.preload = preload
+        self.tempo_drenagem = tempo_drenagem
+        self.soquete = None
+        self._app = None
+        self._aquecer = False
+        self._ativos = set()
+        self._drenando = {}
+        self._parar = False
+        self._recarregar = False
+
+    def _forkar(self):
+        pid = os.fork()
+        if pid == 0:
+            codigo = 0
+            try:
+                _executar_worker(self.soquete, self.alvo, self._app, self.threads, self._aquecer)
+            except BaseException:
+                from helpers.logging import log_exception
+
+                log_exception(f"Erro no worker {os.getpid()}")
+                codigo = 1
+            finally:
+                from helpers.logging import parar_logging
+
+                parar_logging()
+                # Sem os atexit/finalizadores herdados do mestre.
+                os._exit(codigo)
+        self._ativos.add(pid)
+        return pid
+
+    def _drenar(self, pids):
+        prazo = time.monotonic() + self.tempo_drenagem
+        for pid in pids:
+            self._ativos.discard(pid)
+            self._drenando[pid] = prazo
+            self._sinalizar(pid, signal.SIGTERM)
+
+    @staticmethod
+    def _sinalizar(pid, sinal):
+        try:
+            os.kill(pid, sinal)
+        except ProcessLookupError:
+            pass
+
+    def _colher(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self._ativos:
+                self._ativos.discard(pid)
+                logger.warning(f"Worker {pid} saiu inesperadamente (status {status})")
+            self._drenando.pop(pid, None)
+
+    def _vencidos(self):
+        agora = time.monotonic()
+        for pid, prazo in list(self._drenando.items()):
+            if agora >= prazo:
+                logger.warning(f"Worker {pid} não drenou em {self.tempo_drenagem}s; encerrando à força")
+                self._sinalizar(pid, signal.SIGKILL)
+                self._drenando[pid] = float("inf")
+
+    def _ao_sinal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self._recarregar = True
+        else:
+            self._parar = True
+
+    def executar(self):
+        self.soquete = socket.create_server((self.host, self.porta), backlog=BACKLOG)
+        self._aquecer = os.environ.get("AQUECER", "0") not in ("", "0", "false", "False")
+        if self.preload:
+            # O aquecimento abre conexões; no mestre elas seriam descartadas
+            # no fork, então cada worker aquece depois (ver apos_fork).
+            os.environ["AQUECER"] = "0"
+            self._app = carregar_app(self.alvo)
+        else:
+            from helpers.logging import configurar_logging
+
+            configurar_logging()
+            # Sem preload o worker monta o app com o ambiente original.
+            self._aquecer = False
+
+        for sinal in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sinal, self._ao_sinal)
+        logger.info(
+            f"Mestre {os.getpid()} em http://{self.host}:{self.soquete.getsockname()[1]} "
+            f"com {self.workers} workers x {self.threads} threads"
+        )
+
+        try:
+            while not self._parar:
+                self._colher()
+                if self._recarregar:
+                    self._recarregar = False
+                    antigos = list(self._ativos)
+                    logger.info(f"Recarregando: {self.workers} workers novos, drenando {len(antigos)}")
+                    for _ in range(self.workers):
+                        self._forkar()
+                    self._drenar(antigos)
+                while len(self._ativos) < self.workers:
+                    self._forkar()
+                self._vencidos()
+                time.sleep(INTERVALO_MESTRE)
+
+            logger.info(f"Encerrando: drenando {len(self._ativos)} workers")
+            self._drenar(list(self._ativos))
+            while self._drenando:
+                self._colher()
+                self._vencidos()
+                time.sleep(INTERVALO_MESTRE)
+        finally:
+            self.soquete.close()
+        logger.info("Mestre encerrado")
+
+
+def servir(alvo="app:app", **opcoes):
+    """Atalho para ``Mestre(alvo, **opcoes).executar()``."""
+    Mestre(alvo, **opcoes).executar()
@@ -0,0 +1,29 @@
+"""python -m helpers.servidor [--app app:app] [--host 127.0.0.1] [--porta 8000]
+[--workers N] [--threads 8] [--preload] [--tempo-drenagem 30]"""
+import argparse
+import os
+from helpers.servidor import Mestre, THREADS_PADRAO, TEMPO_DRENAGEM
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m helpers.servidor", description="Servidor pré-fork do KeyControl.")
+    parser.add_argument("--app", default="app:app", help="objeto WSGI como modulo:atributo")
+    parser.add_argument("--host", default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument("--porta", type=int, default=int(os.environ.get("PORTA", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WORKERS", os.cpu_count() or 2)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("THREADS", THREADS_PADRAO)),
+                        help="threads por worker; cada conexão em /eventos ocupa uma")
+    parser.add_argument("--preload", action="store_true",
+                        help="monta o app no mestre antes do fork (SIGHUP não recarrega o código)")
+    parser.add_argument("--tempo-drenagem", type=float, default=TEMPO_DRENAGEM,
+                        help="segundos para um worker terminar as requisições antes do SIGKILL")
+    args = parser.parse_args()
+
+    Mestre(
+        args.app, host=args.host, porta=args.porta, workers=args.workers, threads=args.threads,
+        preload=args.preload, tempo_drenagem=args.tempo_drenagem
+    ).executar()
+
+
+if __name__ == "__main__":
+    main()
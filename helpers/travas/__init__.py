@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+from helpers.database import db
+from helpers import metricas
+
+# Primeiro argumento de pg_advisory_xact_lock(int, int): separa as travas
+# de reserva de qualquer outro uso de advisory lock no mesmo banco.
+CLASSE_RESERVA_SALA = 1
+FAIXAS = 64
+
+_faixas = [threading.Lock() for _ in range(FAIXAS)]
+
+
+@contextmanager
+def travar_salas(*sala_ids):
+    """Serializa as escritas de reserva de cada sala, sem travar as outras.
+
+    No Postgres toma ``pg_advisory_xact_lock`` por sala, em ordem de id
+    (duas requisições com as mesmas salas nunca se bloqueiam em ciclo). A
+    trava é da transação: só sai no ``commit``/``rollback``, então o bloco
+    deve terminar com um deles. Nos outros bancos não há advisory lock e a
+    trava é um ``threading.Lock`` por faixa de salas, que vale só dentro do
+    processo e é liberado ao sair do bloco.
+    """
+    ids = sorted({sala_id for sala_id in sala_ids if sala_id is not None})
+    inicio = time.perf_counter()
+
+    if db.engine.dialect.name == "postgresql":
+        for sala_id in ids:
+            db.session.execute(
+                db.text("SELECT pg_advisory_xact_lock(:classe, :sala_id)"),
+                {"classe": CLASSE_RESERVA_SALA, "sala_id": sala_id}
+            )
+        metricas.registrar_fase("trava", time.perf_counter() - inicio)
+        yield
+        return
+
+    faixas = sorted({sala_id % FAIXAS for sala_id in ids})
+    for faixa in faixas:
+        _faixas[faixa].acquire()
+    metricas.registrar_fase("trava", time.perf_counter() - inicio)
+    try:
+        yield
+    finally:
+        for faixa in reversed(faixas):
+            _faixas[faixa].release()
@@ -0,0 +1,353 @@
+import click
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from flask.cli import AppGroup
+from sqlalchemy.dialects import postgresql, sqlite
+from helpers.database import db
+from models.Sala import Sala
+from models.Reserva import Reserva
+from models.Finalizar import Finalizar
+from models.Historico import Historico
+from models.UsoSala import UsoSala
+
+METRICAS = (
+    "reservas", "segundos_reservados", "finalizadas", "segundos_usados", "atrasos", "segundos_atraso", "ausencias"
+)
+AGRUPAMENTOS = ("dia", "semana", "mes")
+DIAS_PADRAO = 30
+
+
+def _data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+
+def _mes(dia):
+    return dia.replace(day=1)
+
+
+def _proximo_mes(dia):
+    return (dia.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _segundos(inicio, fim):
+    if db.engine.dialect.name == "postgresql":
+        return db.extract("epoch", fim - inicio)
+    return (db.func.julianday(fim) - db.func.julianday(inicio)) * 86400
+
+
+def _soma(expressao):
+    return db.func.coalesce(db.func.sum(expressao), 0)
+
+
+def _agregar(filtro):
+    """``{(sala_id, dia): {métrica: valor}}`` a partir de reserva e
+    historico. ``filtro(sala_id, inicio)`` recebe as colunas de cada tabela
+    e devolve a condição das linhas a contar."""
+    agora = datetime.now()
+    agregados = defaultdict(lambda: dict.fromkeys(METRICAS, 0))
+
+    dia = db.func.date(Reserva.data_hora_inicio)
+    sem_finalizacao = ~db.exists().where(Finalizar.reserva_id == Reserva.reserva_id)
+    consulta = (
+        db.select(
+            Reserva.sala_id, dia, db.func.count(),
+            _soma(_segundos(Reserva.data_hora_inicio, Reserva.data_hora_fim)),
+            _soma(db.case((db.and_(Reserva.data_hora_fim < agora, sem_finalizacao), 1), else_=0))
+        )
+        .where(filtro(Reserva.sala_id, Reserva.data_hora_inicio))
+        .group_by(Reserva.sala_id, dia)
+    )
+    for sala_id, dia_, reservas, segundos, ausencias in db.session.execute(consulta):
+        linha = agregados[(sala_id, _data(dia_))]
+        linha.update(reservas=reservas, segundos_reservados=round(segundos), ausencias=int(ausencias))
+
+    dia = db.func.date(Historico.data_hora_inicio)
+    atrasada = Historico.data_hora_fim > Reserva.data_hora_fim
+    consulta = (
+        db.select(
+            Historico.sala_id, dia, db.func.count(),
+            _soma(_segundos(Historico.data_hora_inicio, Historico.data_hora_fim)),
+            _soma(db.case((atrasada, 1), else_=0)),
+            _soma(db.case((atrasada, _segundos(Reserva.data_hora_fim, Historico.data_hora_fim)), else_=0))
+        )
+        .outerjoin(Reserva, Reserva.reserva_id == Historico.reserva_id)
+        .where(filtro(Historico.sala_id, Historico.data_hora_inicio))
+        .group_by(Historico.sala_id, dia)
+    )
+    for sala_id, dia_, finalizadas, segundos, atrasos, segundos_atraso in db.session.execute(consulta):
+        linha = agregados[(sala_id, _data(dia_))]
+        linha.update(finalizadas=finalizadas, segundos_usados=max(round(segundos), 0),
+                     atrasos=int(atrasos), segundos_atraso=round(segundos_atraso))
+    return agregados
+
+
+def _agregar_dias(de, ate, sala_ids=None):
+    """Agregados das reservas e históricos que começam em ``[de, ate)``."""
+    inicio, fim = datetime.combine(de, datetime.min.time()), datetime.combine(ate, datetime.min.time())
+
+    def filtro(sala_id, comeco):
+        condicao = db.and_(comeco >= inicio, comeco < fim)
+        return condicao if sala_ids is None else db.and_(condicao, sala_id.in_(sala_ids))
+    return _agregar(filtro)
+
+
+def _agregar_chaves(chaves):
+    """Agregados só dos ``(sala_id, dia)`` de ``chaves``, numa consulta por
+    tabela seja qual for o número de chaves."""
+    def filtro(sala_id, comeco):
+        return db.or_(*(
+            db.and_(sala_id == sala, comeco >= datetime.combine(dia, datetime.min.time()),
+                    comeco < datetime.combine(dia + timedelta(days=1), datetime.min.time()))
+            for sala, dia in chaves
+        ))
+    return _agregar(filtro)
+
+
+def _upsert(linhas, somar=False):
+    """Grava ``linhas`` com ``INSERT ... ON CONFLICT DO UPDATE``: substitui
+    as métricas da linha existente ou, com ``somar``, soma a elas."""
+    insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+    comando = insert(UsoSala)
+    novo = comando.excluded
+    valores = {
+        metrica: getattr(UsoSala, metrica) + getattr(novo, metrica) if somar else getattr(novo, metrica)
+        for metrica in METRICAS
+    }
+    db.session.execute(
+        comando.on_conflict_do_update(
+            index_elements=["sala_id", "granularidade", "inicio"],
+            set_={**valores, "atualizado_em": novo.atualizado_em}
+        ),
+        linhas
+    )
+
+
+def _substituir(granularidade, de, ate, sala_ids, linhas):
+    apagar = db.delete(UsoSala).where(
+        UsoSala.granularidade == granularidade, UsoSala.inicio >= de, UsoSala.inicio < ate
+    )
+    if sala_ids is not None:
+        apagar = apagar.where(UsoSala.sala_id.in_(sala_ids))
+    db.session.execute(apagar)
+    if linhas:
+        db.session.execute(db.insert(UsoSala), linhas)
+
+
+def _recalcular_intervalo(de, ate, sala_ids=None):
+    """Refaz as linhas diárias de ``[de, ate)`` e as mensais dos meses que
+    o intervalo toca, de ``sala_ids`` ou de todas as salas."""
+    agora = datetime.now()
+    dias = _agregar_dias(de, ate, sala_ids)
+    _substituir("dia", de, ate, sala_ids, [
+        {"sala_id": sala_id, "granularidade": "dia", "inicio": dia, "atualizado_em": agora, **metricas}
+        for (sala_id, dia), metricas in dias.items()
+    ])
+
+    mes_de, mes_ate = _mes(de), _proximo_mes(ate - timedelta(days=1))
+    consulta = (
+        db.select(UsoSala.sala_id, *(db.func.sum(getattr(UsoSala, metrica)) for metrica in METRICAS))
+        .where(UsoSala.granularidade == "dia")
+        .group_by(UsoSala.sala_id)
+    )
+    if sala_ids is not None:
+        consulta = consulta.where(UsoSala.sala_id.in_(sala_ids))
+    atual = mes_de
+    while atual < mes_ate:
+        seguinte = _proximo_mes(atual)
+        linhas = [
+            {"sala_id": sala_id, "granularidade": "mes", "inicio": atual, "atualizado_em": agora,
+             **dict(zip(METRICAS, map(int, valores)))}
+            for sala_id, *valores in db.session.execute(
+                consulta.where(UsoSala.inicio >= atual, UsoSala.inicio < seguinte)
+            )
+        ]
+        _substituir("mes", atual, seguinte, sala_ids, linhas)
+        atual = seguinte
+
+
+def recalcular(chaves):
+    """Atualiza o uso das ``(sala_id, data ou datetime)`` afetadas por uma
+    escrita. Chamar antes do ``commit`` da escrita, na mesma transação.
+
+    Refaz só as linhas diárias das chaves e soma a diferença de cada uma
+    na linha do mês (``ON CONFLICT DO UPDATE SET ... = uso_sala... +
+    excluded...``), então o mês continua igual à soma dos dias sem ser
+    reagregado. São no máximo seis comandos, seja qual for o número de
+    chaves: trava, duas agregações, linhas diárias atuais e dois upserts.
+
+    As salas envolvidas são travadas em ordem com ``FOR NO KEY UPDATE``,
+    assim duas escritas na mesma sala recalculam uma depois da outra e a
+    segunda já vê os dados da primeira. O modo não conflita com o ``KEY
+    SHARE`` que a chave estrangeira de ``reserva``/``historico`` toma na
+    sala ao gravar, que com ``FOR UPDATE`` deixaria duas transações
+    esperando uma pela outra.
+    """
+    chaves = {(sala_id, _data(momento)) for sala_id, momento in chaves
+              if sala_id is not None and momento is not None}
+    if not chaves:
+        return
+
+    # Sem autoflush: a trava vem antes do INSERT/UPDATE/DELETE pendente da
+    # escrita, que só vai ao banco na agregação logo abaixo.
+    with db.session.no_autoflush:
+        db.session.execute(
+            db.select(Sala.sala_id)
+            .where(Sala.sala_id.in_({sala_id for sala_id, _ in chaves}))
+            .order_by(Sala.sala_id)
+            .with_for_update(key_share=True)
+        ).all()
+    novos = _agregar_chaves(chaves)
+    colunas = [getattr(UsoSala, metrica) for metrica in METRICAS]
+    atuais = {
+        (sala_id, _data(dia)): dict(zip(METRICAS, valores))
+        for sala_id, dia, *valores in db.session.execute(
+            db.select(UsoSala.sala_id, UsoSala.inicio, *colunas).where(
+                UsoSala.granularidade == "dia",
+                db.tuple_(UsoSala.sala_id, UsoSala.inicio).in_(chaves)
+            )
+        )
+    }
+
+    agora = datetime.now()
+    zeros = dict.fromkeys(METRICAS, 0)
+    dias, meses = [], {}
+    for sala_id, dia in sorted(chaves):
+        metricas, anteriores = novos.get((sala_id, dia), zeros), atuais.get((sala_id, dia), zeros)
+        if metricas == anteriores:
+            continue
+        dias.append({"sala_id": sala_id, "granularidade": "dia", "inicio": dia, "atualizado_em": agora, **metricas})
+        mes = meses.setdefault((sala_id, _mes(dia)), dict.fromkeys(METRICAS, 0))
+        for metrica in METRICAS:
+            mes[metrica] += metricas[metrica] - anteriores[metrica]
+    if dias:
+        _upsert(dias)
+        _upsert([
+            {"sala_id": sala_id, "granularidade": "mes", "inicio": inicio, "atualizado_em": agora, **diferenca}
+            for (sala_id, inicio), diferenca in meses.items()
+        ], somar=True)
+
+
+def recalcular_periodo(de, ate):
+    """Refaz todas as salas em ``[de, ate)``, um mês por vez. Usado na
+    carga inicial e, todo dia, para contar como ausência as reservas que
+    terminaram sem finalização."""
+    meses = 0
+    atual = de
+    while atual < ate:
+        seguinte = min(_proximo_mes(atual), ate)
+        _recalcular_intervalo(atual, seguinte)
+        db.session.commit()
+        meses += 1
+        atual = seguinte
+    return meses
+
+
+def intervalo(args):
+    """``(de, ate)`` dos parâmetros ``de``/``ate`` (AAAA-MM-DD, ``ate``
+    exclusivo); o padrão são os últimos ``DIAS_PADRAO`` dias. Lança
+    ``ValueError`` se forem inválidos."""
+    ate = date.fromisoformat(args["ate"]) if args.get("ate") else date.today() + timedelta(days=1)
+    de = date.fromisoformat(args["de"]) if args.get("de") else ate - timedelta(days=DIAS_PADRAO)
+    if ate <= de:
+        raise ValueError("ate")
+    return de, ate
+
+
+def _somar(linhas):
+    total = dict.fromkeys(METRICAS, 0)
+    for linha in linhas:
+        for metrica in METRICAS:
+            total[metrica] += linha[metrica]
+    return total
+
+
+def formatar(metricas):
+    reservadas = metricas["segundos_reservados"] / 3600
+    usadas = metricas["segundos_usados"] / 3600
+    return {
+        "reservas": metricas["reservas"],
+        "finalizadas": metricas["finalizadas"],
+        "ausencias": metricas["ausencias"],
+        "atrasos": metricas["atrasos"],
+        "horas_reservadas": round(reservadas, 2),
+        "horas_usadas": round(usadas, 2),
+        "horas_atraso": round(metricas["segundos_atraso"] / 3600, 2),
+        "taxa_uso": round(usadas / reservadas, 4) if reservadas else None,
+    }
+
+
+def _chave_periodo(dia, agrupar):
+    if agrupar == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if agrupar == "mes":
+        return _mes(dia)
+    return dia
+
+
+def uso_da_sala(sala_id, de, ate, agrupar="dia"):
+    """Uso de uma sala em ``[de, ate)`` por dia, semana (começando na
+    segunda) ou mês, mais o total do intervalo."""
+    colunas = [getattr(UsoSala, metrica) for metrica in METRICAS]
+    linhas = db.session.execute(
+        db.select(UsoSala.inicio, *colunas)
+        .where(
+            UsoSala.sala_id == sala_id, UsoSala.granularidade == "dia",
+            UsoSala.inicio >= de, UsoSala.inicio < ate
+        )
+        .order_by(UsoSala.inicio)
+    ).all()
+
+    periodos = {}
+    for dia, *valores in linhas:
+        chave = _chave_periodo(dia, agrupar)
+        periodo = periodos.setdefault(chave, dict.fromkeys(METRICAS, 0))
+        for metrica, valor in zip(METRICAS, valores):
+            periodo[metrica] += valor
+    return (
+        [{"inicio": chave.isoformat(), **formatar(metricas)} for chave, metricas in periodos.items()],
+        formatar(_somar(periodos.values()))
+    )
+
+
+def ocupacao(de, ate):
+    """Total por sala em ``[de, ate)``: meses inteiros vêm das linhas
+    mensais e só as pontas do intervalo das diárias, então o custo não
+    cresce com o número de dias."""
+    mes_de = de if de.day == 1 else _proximo_mes(de)
+    mes_ate = _mes(ate)
+    if mes_de < mes_ate:
+        filtro = db.or_(
+            db.and_(UsoSala.granularidade == "mes", UsoSala.inicio >= mes_de, UsoSala.inicio < mes_ate),
+            db.and_(UsoSala.granularidade == "dia", UsoSala.inicio >= de, UsoSala.inicio < mes_de),
+            db.and_(UsoSala.granularidade == "dia", UsoSala.inicio >= mes_ate, UsoSala.inicio < ate),
+        )
+    else:
+        filtro = db.and_(UsoSala.granularidade == "dia", UsoSala.inicio >= de, UsoSala.inicio < ate)
+
+    linhas = db.session.execute(
+        db.select(UsoSala.sala_id, *(db.func.sum(getattr(UsoSala, metrica)) for metrica in METRICAS))
+        .where(filtro)
+        .group_by(UsoSala.sala_id)
+        .order_by(UsoSala.sala_id)
+    ).all()
+    return [
+        {"sala_id": sala_id, **formatar(dict(zip(METRICAS, map(int, valores))))}
+        for sala_id, *valores in linhas
+    ]
+
+
+relatorios_cli = AppGroup("relatorios", help="Manutenção dos relatórios de uso das salas.")
+
+
+@relatorios_cli.command("recalcular-uso")
+@click.option("--de", type=click.DateTime(formats=["%Y-%m-%d"]), help="Primeiro dia (padrão: ontem).")
+@click.option("--ate", type=click.DateTime(formats=["%Y-%m-%d"]), help="Dia seguinte ao último (padrão: hoje).")
+def recalcular_uso_comando(de, ate):
+    """Refaz o uso das salas no intervalo (rodar todo dia pelo cron)."""
+    ate = ate.date() if ate else date.today()
+    de = de.date() if de else ate - timedelta(days=1)
+    click.echo(f"{recalcular_periodo(de, ate)} mês(es) recalculado(s) entre {de} e {ate}.")
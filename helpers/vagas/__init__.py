@@ -0,0 +1,133 @@
+"""Busca de horários livres em todas as salas de uma vez, com bitsets.
+
+A janela ``[de, ate)`` vira uma grade de fatias de ``passo`` e cada sala
+vira um ``int`` com o bit ``i`` ligado se alguma reserva ou ocorrência de
+recorrência cruza a fatia ``i``. Uma sala tem ``k`` fatias livres seguidas
+a partir de ``i`` se o bit ``i`` de ``livre & livre >> 1 & ... & livre >>
+(k - 1)`` está ligado; dobrando o deslocamento isso sai em ``log2(k)``
+operações sobre o ``int`` inteiro, sem olhar fatia por fatia.
+
+A duração é arredondada para cima em passos e uma fatia conta como ocupada
+se qualquer parte dela estiver reservada, então os inícios devolvidos são
+sempre seguros.
+"""
+import heapq
+import re
+from datetime import timedelta
+from helpers.database import db
+from helpers.recorrencia import regras_vigentes, ocorrencias_na_janela
+from models.Reserva import Reserva
+from models.Sala import Sala
+
+# Maior janela aceita e menor passo: juntos limitam os bits por sala.
+JANELA_MAXIMA = timedelta(days=31)
+PASSO_MINIMO = timedelta(minutes=5)
+PASSO_PADRAO = timedelta(minutes=15)
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 500
+# Quantos inícios cada sala da resposta lista (o total vai junto).
+INICIOS_POR_SALA = 10
+
+_DURACAO = re.compile(r"(?:(\d+)h)?(?:(\d+)m(?:in)?)?")
+
+
+def duracao(texto):
+    """``timedelta`` de ``"2h"``, ``"90m"``, ``"1h30m"`` ou só minutos
+    (``"90"``). Lança ``ValueError`` se for inválida ou zero."""
+    texto = texto.strip().lower()
+    if texto.isdigit():
+        minutos = int(texto)
+    else:
+        casamento = _DURACAO.fullmatch(texto)
+        if not casamento or not any(casamento.groups()):
+            raise ValueError(texto)
+        horas, minutos = casamento.groups()
+        minutos = int(horas or 0) * 60 + int(minutos or 0)
+    if minutos <= 0:
+        raise ValueError(texto)
+    return timedelta(minutes=minutos)
+
+
+def ocupar(bits, inicio, fim, de, passo, fatias):
+    """``bits`` com as fatias que ``[inicio, fim)`` cruza ligadas."""
+    primeira = max((inicio - de) // passo, 0)
+    ultima = min(-((de - fim) // passo), fatias)
+    if primeira >= ultima:
+        return bits
+    return bits | ((1 << (ultima - primeira)) - 1) << primeira
+
+
+def inicios_livres(ocupado, fatias, tamanho):
+    """Bits das fatias em que começam ``tamanho`` fatias livres seguidas."""
+    livre = ~ocupado & ((1 << fatias) - 1)
+    # Invariante: o bit i de ``livre`` diz que as fatias i .. i + cobertas - 1
+    # estão livres; o deslocamento nunca passa de ``cobertas``, então as
+    # duas metades se encostam.
+    cobertas = 1
+    while cobertas < tamanho and livre:
+        deslocamento = min(cobertas, tamanho - cobertas)
+        livre &= livre >> deslocamento
+        cobertas += deslocamento
+    return livre
+
+
+def _posicoes(bits, limite):
+    posicoes = []
+    while bits and len(posicoes) < limite:
+        baixo = bits & -bits
+        posicoes.append(baixo.bit_length() - 1)
+        bits ^= baixo
+    return posicoes
+
+
+def buscar_vagas(de, ate, tempo, passo=PASSO_PADRAO, limite=LIMITE_PADRAO):
+    """Salas com ``tempo`` livre começando em algum ponto da grade de
+    ``[de, ate)``, da que libera mais cedo para a mais tarde (empate: a com
+    mais inícios possíveis, depois a de menor id).
+
+    Três consultas, seja qual for o número de salas (mais as exceções das
+    recorrências, se houver): salas, reservas que cruzam a janela e
+    recorrências vigentes. Devolve ``(total de salas com vaga, [{sala_id,
+    sala_nome, inicios, total_inicios}])`` com no máximo ``limite`` salas.
+    """
+    fatias = (ate - de) // passo
+    tamanho = -(-tempo // passo)
+
+    salas = dict(db.session.execute(db.select(Sala.sala_id, Sala.sala_nome)).all())
+    ocupado = dict.fromkeys(salas, 0)
+
+    consulta = (
+        db.select(Reserva.sala_id, Reserva.data_hora_inicio, Reserva.data_hora_fim)
+        .where(Reserva.data_hora_inicio < ate, Reserva.data_hora_fim > de)
+    )
+    if db.engine.dialect.name == "postgresql":
+        # O índice GiST da restrição de exclusão (a2efadffec51) responde a
+        # sobreposição direto; só com os limites acima o plano varre todas
+        # as reservas que terminam depois de ``de``.
+        consulta = consulta.where(
+            db.func.tsrange(Reserva.data_hora_inicio, Reserva.data_hora_fim, "[)")
+            .op("&&")(db.func.tsrange(de, ate, "[)"))
+        )
+    for sala_id, inicio, fim in db.session.execute(consulta):
+        if sala_id in ocupado:
+            ocupado[sala_id] = ocupar(ocupado[sala_id], inicio, fim, de, passo, fatias)
+
+    for inicio, fim, regra in ocorrencias_na_janela(regras_vigentes(de.date(), ate.date()), de, ate):
+        if regra.sala_id in ocupado:
+            ocupado[regra.sala_id] = ocupar(ocupado[regra.sala_id], inicio, fim, de, passo, fatias)
+
+    candidatas = []
+    for sala_id, bits in ocupado.items():
+        inicios = inicios_livres(bits, fatias, tamanho)
+        if inicios:
+            candidatas.append(((inicios & -inicios).bit_length(), -bin(inicios).count("1"), sala_id, inicios))
+
+    return len(candidatas), [
+        {
+            "sala_id": sala_id,
+            "sala_nome": salas[sala_id],
+            "inicios": [(de + passo * posicao).isoformat() for posicao in _posicoes(inicios, INICIOS_POR_SALA)],
+            "total_inicios": -negativo
+        }
+        for _, negativo, sala_id, inicios in heapq.nsmallest(limite, candidatas)
+    ]
@@ -0,0 +1,114 @@
+"""Historico particionado por mes em data_hora_inicio
+
+Revision ID: 181cadb6436d
+Revises: 810d2bf6bb5a
+Create Date: 2026-10-18 11:02:15.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '181cadb6436d'
+down_revision = '810d2bf6bb5a'
+branch_labels = None
+depends_on = None
+
+
+# Cria (ou completa) as partições mensais de ``de`` até ``ate``. Cada mês
+# nasce como tabela comum, recebe as linhas que tenham caído na partição
+# padrão e só então é anexado, assim o ATTACH nunca falha por conflito com
+# historico_padrao. Devolve quantas partições foram criadas.
+CRIAR_PARTICOES = """
+CREATE OR REPLACE FUNCTION historico_criar_particoes(de date, ate date) RETURNS integer AS $$
+DECLARE
+    mes date := date_trunc('month', de)::date;
+    proximo date;
+    nome text;
+    criadas integer := 0;
+BEGIN
+    WHILE mes <= ate LOOP
+        proximo := (mes + interval '1 month')::date;
+        nome := 'historico_' || to_char(mes, 'YYYY_MM');
+        IF to_regclass(nome) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE historico INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', nome);
+            EXECUTE format(
+                'WITH movidas AS (DELETE FROM historico_padrao '
+                'WHERE data_hora_inicio >= %L AND data_hora_inicio < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM movidas',
+                mes, proximo, nome
+            );
+            EXECUTE format(
+                'ALTER TABLE historico ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                nome, mes, proximo
+            );
+            criadas := criadas + 1;
+        END IF;
+        mes := proximo;
+    END LOOP;
+    RETURN criadas;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    # A tabela antiga sai do caminho, mas a sequência de historico_id
+    # continua sendo usada pela nova.
+    op.execute("ALTER TABLE historico RENAME TO historico_antigo")
+    op.execute("ALTER INDEX historico_pkey RENAME TO historico_antigo_pkey")
+    op.execute("ALTER SEQUENCE historico_historico_id_seq OWNED BY NONE")
+
+    # A chave primária de uma tabela particionada precisa conter a chave de
+    # partição; para o ORM o historico_id continua sendo a identidade.
+    op.execute("""
+        CREATE TABLE historico (
+            historico_id integer NOT NULL DEFAULT nextval('historico_historico_id_seq'),
+            reserva_id integer NOT NULL,
+            sala_id integer NOT NULL,
+            responsavel_id integer NOT NULL,
+            data_hora_inicio timestamp without time zone NOT NULL,
+            data_hora_fim timestamp without time zone NOT NULL,
+            CONSTRAINT historico_pkey PRIMARY KEY (historico_id, data_hora_inicio)
+        ) PARTITION BY RANGE (data_hora_inicio)
+    """)
+    op.execute("ALTER SEQUENCE historico_historico_id_seq OWNED BY historico.historico_id")
+    op.execute("CREATE TABLE historico_padrao PARTITION OF historico DEFAULT")
+    op.execute(CRIAR_PARTICOES)
+
+    op.execute("""
+        SELECT historico_criar_particoes(
+            coalesce((SELECT min(data_hora_inicio) FROM historico_antigo), now())::date,
+            (now() + interval '3 months')::date
+        )
+    """)
+    op.execute(
+        "INSERT INTO historico (historico_id, reserva_id, sala_id, responsavel_id, data_hora_inicio, data_hora_fim) "
+        "SELECT historico_id, reserva_id, sala_id, responsavel_id, data_hora_inicio, data_hora_fim "
+        "FROM historico_antigo"
+    )
+    op.execute("DROP TABLE historico_antigo")
+    op.execute("ANALYZE historico")
+
+def downgrade():
+    op.execute("ALTER TABLE historico RENAME TO historico_particionada")
+    op.execute("ALTER INDEX historico_pkey RENAME TO historico_particionada_pkey")
+    op.execute("ALTER SEQUENCE historico_historico_id_seq OWNED BY NONE")
+    op.create_table('historico',
+    sa.Column('historico_id', sa.Integer(), server_default=sa.text("nextval('historico_historico_id_seq')"), nullable=False),
+    sa.Column('reserva_id', sa.Integer(), nullable=False),
+    sa.Column('sala_id', sa.Integer(), nullable=False),
+    sa.Column('responsavel_id', sa.Integer(), nullable=False),
+    sa.Column('data_hora_inicio', sa.DateTime(), nullable=False),
+    sa.Column('data_hora_fim', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('historico_id')
+    )
+    op.execute("ALTER SEQUENCE historico_historico_id_seq OWNED BY historico.historico_id")
+    op.execute(
+        "INSERT INTO historico (historico_id, reserva_id, sala_id, responsavel_id, data_hora_inicio, data_hora_fim) "
+        "SELECT historico_id, reserva_id, sala_id, responsavel_id, data_hora_inicio, data_hora_fim "
+        "FROM historico_particionada"
+    )
+    op.execute("DROP TABLE historico_particionada")
+    op.execute("DROP FUNCTION historico_criar_particoes(date, date)")
@@ -0,0 +1,48 @@
+"""Finalizacao unica por reserva
+
+Revision ID: 3f9c1b7d52e4
+Revises: 6ef94b7b2647
+Create Date: 2026-10-18 15:21:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1b7d52e4'
+down_revision = '6ef94b7b2647'
+branch_labels = None
+depends_on = None
+
+
+# Quantas reservas repetidas a mensagem de erro lista.
+REPETIDAS_LISTADAS = 50
+
+
+def upgrade():
+    # O POST /finalizacoes não impedia uma segunda finalização da mesma
+    # reserva. Qual delas vale é decisão de quem opera o banco, então a
+    # migração para e lista as reservas em vez de apagar linhas. No modo
+    # offline (--sql) não há como consultar; o CREATE UNIQUE INDEX falha
+    # sozinho se houver repetidas.
+    if not op.get_context().as_sql:
+        repetidas = op.get_bind().execute(sa.text(
+            "SELECT reserva_id, COUNT(*) FROM finalizacao GROUP BY reserva_id "
+            "HAVING COUNT(*) > 1 ORDER BY reserva_id"
+        )).all()
+        if repetidas:
+            listadas = ", ".join(f"{reserva_id} ({total}x)" for reserva_id, total in repetidas[:REPETIDAS_LISTADAS])
+            if len(repetidas) > REPETIDAS_LISTADAS:
+                listadas += f" e mais {len(repetidas) - REPETIDAS_LISTADAS}"
+            raise RuntimeError(
+                f"{len(repetidas)} reservas com mais de uma finalização: {listadas}. "
+                "Remova as finalizações excedentes de cada uma e rode a migração de novo."
+            )
+    op.drop_index('ix_finalizacao_reserva_id', table_name='finalizacao')
+    op.create_index('ix_finalizacao_reserva_id', 'finalizacao', ['reserva_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_finalizacao_reserva_id', table_name='finalizacao')
+    op.create_index('ix_finalizacao_reserva_id', 'finalizacao', ['reserva_id'], unique=False)
@@ -0,0 +1,50 @@
+"""Reservas recorrentes guardadas como regra, com excecoes por dia
+
+Revision ID: 6ef94b7b2647
+Revises: ce2ae50a4e48
+Create Date: 2026-10-18 13:02:17.440913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6ef94b7b2647'
+down_revision = 'ce2ae50a4e48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reserva_recorrente',
+    sa.Column('recorrencia_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('sala_id', sa.Integer(), nullable=False),
+    sa.Column('responsavel_id', sa.Integer(), nullable=False),
+    sa.Column('dias_semana', sa.Integer(), nullable=False),
+    sa.Column('intervalo_semanas', sa.Integer(), nullable=False),
+    sa.Column('hora_inicio', sa.Time(), nullable=False),
+    sa.Column('hora_fim', sa.Time(), nullable=False),
+    sa.Column('data_inicio', sa.Date(), nullable=False),
+    sa.Column('data_fim', sa.Date(), nullable=False),
+    sa.CheckConstraint('hora_fim > hora_inicio', name='reserva_recorrente_horario_valido'),
+    sa.CheckConstraint(
+        'data_fim >= data_inicio AND intervalo_semanas >= 1 AND dias_semana BETWEEN 1 AND 127',
+        name='reserva_recorrente_datas_validas'
+    ),
+    sa.ForeignKeyConstraint(['responsavel_id'], ['responsavel.responsavel_id'], name='reserva_recorrente_responsavel_id_fkey'),
+    sa.ForeignKeyConstraint(['sala_id'], ['sala.sala_id'], name='reserva_recorrente_sala_id_fkey'),
+    sa.PrimaryKeyConstraint('recorrencia_id')
+    )
+    op.create_index('ix_reserva_recorrente_sala_id_data_fim', 'reserva_recorrente', ['sala_id', 'data_fim'], unique=False)
+    op.create_table('reserva_recorrente_excecao',
+    sa.Column('recorrencia_id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['recorrencia_id'], ['reserva_recorrente.recorrencia_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('recorrencia_id', 'data')
+    )
+
+def downgrade():
+    op.drop_table('reserva_recorrente_excecao')
+    op.drop_index('ix_reserva_recorrente_sala_id_data_fim', table_name='reserva_recorrente')
+    op.drop_table('reserva_recorrente')
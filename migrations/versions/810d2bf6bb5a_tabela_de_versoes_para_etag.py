@@ -0,0 +1,34 @@
+"""Tabela de versoes usada nos ETags de salas e responsaveis
+
+Revision ID: 810d2bf6bb5a
+Revises: a2efadffec51
+Create Date: 2026-10-18 10:03:27.550912
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '810d2bf6bb5a'
+down_revision = 'a2efadffec51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    versao_tabela = op.create_table('versao_tabela',
+    sa.Column('tabela', sa.String(length=64), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('tabela')
+    )
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    op.bulk_insert(versao_tabela, [
+        {'tabela': 'sala', 'versao': 1, 'atualizado_em': agora},
+        {'tabela': 'responsavel', 'versao': 1, 'atualizado_em': agora}
+    ])
+
+def downgrade():
+    op.drop_table('versao_tabela')
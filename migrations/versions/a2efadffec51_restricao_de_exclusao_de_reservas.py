@@ -0,0 +1,36 @@
+"""Restricao de exclusao impedindo reservas sobrepostas na mesma sala
+
+Revision ID: a2efadffec51
+Revises: 6c6d383bcd36
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2efadffec51'
+down_revision = '6c6d383bcd36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.create_check_constraint(
+        'reserva_periodo_valido',
+        'reserva',
+        'data_hora_fim > data_hora_inicio'
+    )
+    op.execute(
+        "ALTER TABLE reserva ADD CONSTRAINT reserva_sala_periodo_excl "
+        "EXCLUDE USING gist ("
+        "sala_id WITH =, "
+        "tsrange(data_hora_inicio, data_hora_fim, '[)') WITH &&"
+        ")"
+    )
+
+def downgrade():
+    op.drop_constraint('reserva_sala_periodo_excl', 'reserva')
+    op.drop_constraint('reserva_periodo_valido', 'reserva', type_='check')
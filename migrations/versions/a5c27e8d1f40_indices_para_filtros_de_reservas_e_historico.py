@@ -0,0 +1,38 @@
+"""Indices para os filtros de reservas e historico
+
+Revision ID: a5c27e8d1f40
+Revises: 181cadb6436d
+Create Date: 2026-10-18 11:47:03.861529
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c27e8d1f40'
+down_revision = '181cadb6436d'
+branch_labels = None
+depends_on = None
+
+
+INDICES = [
+    ('ix_reserva_sala_id_data_hora_inicio', 'reserva', ['sala_id', 'data_hora_inicio']),
+    ('ix_reserva_responsavel_id_data_hora_inicio', 'reserva', ['responsavel_id', 'data_hora_inicio']),
+    ('ix_reserva_data_hora_inicio', 'reserva', ['data_hora_inicio']),
+    ('ix_reserva_data_hora_fim', 'reserva', ['data_hora_fim']),
+    # historico é particionada: o índice é criado em cada partição.
+    ('ix_historico_sala_id_data_hora_inicio', 'historico', ['sala_id', 'data_hora_inicio']),
+    ('ix_historico_responsavel_id_data_hora_inicio', 'historico', ['responsavel_id', 'data_hora_inicio']),
+    ('ix_historico_data_hora_inicio', 'historico', ['data_hora_inicio']),
+    ('ix_finalizacao_reserva_id', 'finalizacao', ['reserva_id']),
+]
+
+
+def upgrade():
+    for nome, tabela, colunas in INDICES:
+        op.create_index(nome, tabela, colunas, unique=False)
+
+def downgrade():
+    for nome, tabela, _ in reversed(INDICES):
+        op.drop_index(nome, table_name=tabela)
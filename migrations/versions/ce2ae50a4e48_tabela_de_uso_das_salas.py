@@ -0,0 +1,39 @@
+"""Tabela de uso das salas por dia e por mes
+
+Revision ID: ce2ae50a4e48
+Revises: a5c27e8d1f40
+Create Date: 2026-10-18 12:31:48.107265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ce2ae50a4e48'
+down_revision = 'a5c27e8d1f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Vazia ao criar: preencher com `flask relatorios recalcular-uso --de <primeiro dia>`.
+    op.create_table('uso_sala',
+    sa.Column('sala_id', sa.Integer(), nullable=False),
+    sa.Column('granularidade', sa.String(length=3), nullable=False),
+    sa.Column('inicio', sa.Date(), nullable=False),
+    sa.Column('reservas', sa.Integer(), nullable=False),
+    sa.Column('segundos_reservados', sa.Integer(), nullable=False),
+    sa.Column('finalizadas', sa.Integer(), nullable=False),
+    sa.Column('segundos_usados', sa.Integer(), nullable=False),
+    sa.Column('atrasos', sa.Integer(), nullable=False),
+    sa.Column('segundos_atraso', sa.Integer(), nullable=False),
+    sa.Column('ausencias', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sala_id', 'granularidade', 'inicio')
+    )
+    op.create_index('ix_uso_sala_granularidade_inicio', 'uso_sala', ['granularidade', 'inicio'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_uso_sala_granularidade_inicio', table_name='uso_sala')
+    op.drop_table('uso_sala')
@@ -1,17 +1,30 @@
 from helpers.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, ForeignKey, DateTime
-from marshmallow import Schema, fields, validate, ValidationError
+from sqlalchemy import Integer, ForeignKey, DateTime, Index
+from marshmallow import Schema, fields, validate, ValidationError, validates_schema
 from flask_restful import fields as flaskFields
+from helpers.codec import Codec
+from helpers.datas import DataHora
 
 
 finalizacao_fields = {
     'finalizacao_id': flaskFields.Integer,
     'reserva_id': flaskFields.Integer,
-    'data_hora_finalizacao': flaskFields.DateTime
+    'data_hora_finalizacao': flaskFields.DateTime(dt_format='iso8601')
 }
 
 
+# Índice único da migração 3f9c1b7d52e4: uma finalização por reserva. O
+# Postgres cita o nome do índice no IntegrityError; o SQLite, a coluna.
+FINALIZACAO_RESERVA_UNICA = "ix_finalizacao_reserva_id"
+
+
+def finalizacao_repetida(erro):
+    """Se o ``IntegrityError`` é de uma segunda finalização da mesma reserva."""
+    mensagem = str(erro.orig)
+    return FINALIZACAO_RESERVA_UNICA in mensagem or "finalizacao.reserva_id" in mensagem
+
+
 def validate_positive(value):
     if value < 0:
         raise ValidationError("O valor deve ser um número inteiro não negativo.")
@@ -19,6 +32,9 @@ def validate_positive(value):
 
 class Finalizar(db.Model):
     __tablename__ = "finalizacao"
+    __table_args__ = (
+        Index(FINALIZACAO_RESERVA_UNICA, "reserva_id", unique=True),
+    )
 
     finalizacao_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     reserva_id: Mapped[int] = mapped_column(Integer, ForeignKey('reserva.reserva_id'), nullable=False)
@@ -27,8 +43,9 @@ class Finalizar(db.Model):
 
 class FinalizarSchema(Schema):
     finalizacao_id = fields.Int(dump_only=True)
+    # Obrigatório, exceto quando a finalização é de uma ocorrência de
+    # recorrência (recorrencia_id + data_ocorrencia, só na criação).
     reserva_id = fields.Int(
-        required=True, 
         validate=validate_positive,
         error_messages={
             "required": "O campo reserva_id é obrigatório.",
@@ -36,11 +53,38 @@ class FinalizarSchema(Schema):
             "validator_failed": "O campo reserva_id deve ser valido(Maior que 0)."
         }
     )
-    data_hora_finalizacao = fields.DateTime(
+    data_hora_finalizacao = DataHora(
         required=True,
         format="iso",
         error_messages={
             "required": "O campo data_hora_finalizacao é obrigatório.",
             "invalid": "Formato inválido, use ISO 8601 (ex: 2025-08-17T14:00:00)."
         }
-    )
\ No newline at end of file
+    )
+
+    recorrencia_id = fields.Int(
+        load_only=True,
+        validate=validate_positive,
+        error_messages={"validator_failed": "O campo recorrencia_id deve ser valido(Maior que 0)."}
+    )
+    data_ocorrencia = fields.Date(
+        load_only=True,
+        format="iso",
+        error_messages={"invalid": "Formato inválido, use ISO 8601 (ex: 2025-08-17)."}
+    )
+
+    @validates_schema
+    def validate_alvo(self, data, partial=False, **kwargs):
+        ocorrencia = {"recorrencia_id", "data_ocorrencia"} & data.keys()
+        if ocorrencia and partial:
+            raise ValidationError("Só é possível informar a ocorrência ao criar a finalização.", field_name="recorrencia_id")
+        if ocorrencia and "reserva_id" in data:
+            raise ValidationError("Informe reserva_id ou recorrencia_id, não os dois.", field_name="reserva_id")
+        if ocorrencia and len(ocorrencia) < 2:
+            campo = ({"recorrencia_id", "data_ocorrencia"} - ocorrencia).pop()
+            raise ValidationError(f"O campo {campo} é obrigatório.", field_name=campo)
+        if not ocorrencia and not partial and "reserva_id" not in data:
+            raise ValidationError("O campo reserva_id é obrigatório.", field_name="reserva_id")
+
+
+finalizacao_codec = Codec(FinalizarSchema, finalizacao_fields)
@@ -1,8 +1,10 @@
 from helpers.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, ForeignKey, DateTime
+from sqlalchemy import Integer, ForeignKey, DateTime, Index
 from marshmallow import Schema, fields, validate, ValidationError
 from flask_restful import fields as flaskFields
+from helpers.codec import Codec
+from helpers.datas import DataHora
 
 
 historico_fields = {
@@ -10,8 +12,8 @@ historico_fields = {
     'reserva_id': flaskFields.Integer,
     'sala_id': flaskFields.Integer,
     'responsavel_id': flaskFields.Integer,
-    'data_hora_inicio': flaskFields.DateTime,
-    'data_hora_fim': flaskFields.DateTime
+    'data_hora_inicio': flaskFields.DateTime(dt_format='iso8601'),
+    'data_hora_fim': flaskFields.DateTime(dt_format='iso8601')
 }
 
 
@@ -21,8 +23,15 @@ def validate_positive(value):
 
 
 class Historico(db.Model):
+    # No Postgres a tabela é particionada por mês em data_hora_inicio e a
+    # chave primária física é (historico_id, data_hora_inicio); ver a
+    # migração 181cadb6436d e helpers.particionamento.
     __tablename__ = "historico"
-
+    __table_args__ = (
+        Index("ix_historico_sala_id_data_hora_inicio", "sala_id", "data_hora_inicio"),
+        Index("ix_historico_responsavel_id_data_hora_inicio", "responsavel_id", "data_hora_inicio"),
+        Index("ix_historico_data_hora_inicio", "data_hora_inicio"),
+    )
 
     historico_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     reserva_id: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -60,7 +69,7 @@ class HistoricoSchema(Schema):
             "validator_failed": "O campo COresponsavel_id_UF deve ser valido(Maior que 0)"
         }
     )
-    data_hora_inicio = fields.DateTime(
+    data_hora_inicio = DataHora(
         required=True,
         format="iso",
         error_messages={
@@ -69,7 +78,7 @@ class HistoricoSchema(Schema):
         }
     )
 
-    data_hora_fim = fields.DateTime(
+    data_hora_fim = DataHora(
         required=True,
         format="iso",
         error_messages={
@@ -77,3 +86,6 @@ class HistoricoSchema(Schema):
             "invalid": "Formato inválido, use ISO 8601 (ex: 2025-08-17T16:00:00)."
         }
     )
+
+
+historico_codec = Codec(HistoricoSchema, historico_fields)
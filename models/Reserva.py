@@ -1,19 +1,29 @@
 from helpers.database import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, ForeignKey, DateTime
-from marshmallow import Schema, fields, validate, ValidationError
+from sqlalchemy import Integer, ForeignKey, DateTime, CheckConstraint, Index, DDL, event, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from marshmallow import Schema, fields, validate, ValidationError, validates_schema
 from flask_restful import fields as flaskFields
+from helpers.codec import Codec
+from helpers.datas import DataHora
 
 
 reserva_fields = {
     'reserva_id': flaskFields.Integer,
     'sala_id': flaskFields.Integer,
     'responsavel_id': flaskFields.Integer,
-    'data_hora_inicio': flaskFields.DateTime,
-    'data_hora_fim': flaskFields.DateTime
+    'data_hora_inicio': flaskFields.DateTime(dt_format='iso8601'),
+    'data_hora_fim': flaskFields.DateTime(dt_format='iso8601')
 }
 
 
+# Restrições criadas pela migração a2efadffec51 (exigem PostgreSQL + btree_gist).
+RESERVA_CONFLITO = "reserva_sala_periodo_excl"
+RESERVA_PERIODO_VALIDO = "reserva_periodo_valido"
+RESERVA_SALA_FK = "reserva_sala_id_fkey"
+RESERVA_RESPONSAVEL_FK = "reserva_responsavel_id_fkey"
+
+
 def validate_positive(value):
     if value < 0:
         raise ValidationError("O valor deve ser um número inteiro não negativo.")
@@ -21,6 +31,20 @@ def validate_positive(value):
 
 class Reserva(db.Model):
     __tablename__ = "reserva"
+    __table_args__ = (
+        CheckConstraint("data_hora_fim > data_hora_inicio", name=RESERVA_PERIODO_VALIDO),
+        # Só existe no PostgreSQL; em outros bancos o create_all a ignora.
+        ExcludeConstraint(
+            ("sala_id", "="),
+            (text("tsrange(data_hora_inicio, data_hora_fim, '[)')"), "&&"),
+            name=RESERVA_CONFLITO,
+            using="gist"
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_reserva_sala_id_data_hora_inicio", "sala_id", "data_hora_inicio"),
+        Index("ix_reserva_responsavel_id_data_hora_inicio", "responsavel_id", "data_hora_inicio"),
+        Index("ix_reserva_data_hora_inicio", "data_hora_inicio"),
+        Index("ix_reserva_data_hora_fim", "data_hora_fim"),
+    )
 
     reserva_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     sala_id: Mapped[int] = mapped_column(Integer, ForeignKey('sala.sala_id'), nullable=False)
@@ -32,6 +56,13 @@ class Reserva(db.Model):
     responsavel = relationship("Responsavel", back_populates="reserva")
 
 
+# O "sala_id WITH =" da restrição de exclusão precisa do btree_gist.
+event.listen(
+    Reserva.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql")
+)
+
+
 class ReservaSchema(Schema):
     reserva_id = fields.Int(dump_only=True)
     sala_id = fields.Int(
@@ -52,7 +83,7 @@ class ReservaSchema(Schema):
             "validator_failed": "O campo COresponsavel_id_UF deve ser valido(Maior que 0)"
         }
     )
-    data_hora_inicio = fields.DateTime(
+    data_hora_inicio = DataHora(
         required=True,
         format="iso",
         error_messages={
@@ -61,7 +92,7 @@ class ReservaSchema(Schema):
         }
     )
 
-    data_hora_fim = fields.DateTime(
+    data_hora_fim = DataHora(
         required=True,
         format="iso",
         error_messages={
@@ -69,3 +100,16 @@ class ReservaSchema(Schema):
             "invalid": "Formato inválido, use ISO 8601 (ex: 2025-08-17T16:00:00)."
         }
     )
+
+    @validates_schema(skip_on_field_errors=False)
+    def validate_periodo(self, data, **kwargs):
+        inicio = data.get("data_hora_inicio")
+        fim = data.get("data_hora_fim")
+        if inicio and fim and fim <= inicio:
+            raise ValidationError(
+                "O campo data_hora_fim deve ser posterior a data_hora_inicio.",
+                field_name="data_hora_fim"
+            )
+
+
+reserva_codec = Codec(ReservaSchema, reserva_fields)
@@ -0,0 +1,194 @@
+from helpers.database import db
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import Integer, ForeignKey, Date, Time, CheckConstraint, Index
+from marshmallow import Schema, fields, validate, ValidationError, validates_schema, post_load
+from flask_restful import fields as flaskFields
+from helpers.codec import Codec, DateFormat
+
+DIAS_SEMANA = 7
+
+
+class DiasSemana(flaskFields.Raw):
+    """Máscara de bits (bit 0 = segunda) como lista de dias, 0 = segunda."""
+    def format(self, value):
+        return [dia for dia in range(DIAS_SEMANA) if value >> dia & 1]
+
+
+class DatasExcecao(flaskFields.Raw):
+    def format(self, value):
+        return sorted(excecao.data.isoformat() for excecao in value)
+
+
+recorrencia_fields = {
+    'recorrencia_id': flaskFields.Integer,
+    'sala_id': flaskFields.Integer,
+    'responsavel_id': flaskFields.Integer,
+    'dias_semana': DiasSemana,
+    'intervalo_semanas': flaskFields.Integer,
+    'hora_inicio': DateFormat,
+    'hora_fim': DateFormat,
+    'data_inicio': DateFormat,
+    'data_fim': DateFormat,
+    'excecoes': DatasExcecao
+}
+
+
+RECORRENCIA_HORARIO_VALIDO = "reserva_recorrente_horario_valido"
+RECORRENCIA_DATAS_VALIDAS = "reserva_recorrente_datas_validas"
+RECORRENCIA_SALA_FK = "reserva_recorrente_sala_id_fkey"
+RECORRENCIA_RESPONSAVEL_FK = "reserva_recorrente_responsavel_id_fkey"
+
+
+def validate_positive(value):
+    if value < 0:
+        raise ValidationError("O valor deve ser um número inteiro não negativo.")
+
+
+class ReservaRecorrente(db.Model):
+    """Regra de reserva que se repete: nos ``dias_semana`` (máscara, bit 0 =
+    segunda) de uma semana a cada ``intervalo_semanas``, contadas a partir da
+    semana de ``data_inicio``, das ``hora_inicio`` às ``hora_fim``, até
+    ``data_fim`` inclusive. As ocorrências não viram linhas de ``reserva``;
+    ver ``helpers.recorrencia``."""
+    __tablename__ = "reserva_recorrente"
+    __table_args__ = (
+        CheckConstraint("hora_fim > hora_inicio", name=RECORRENCIA_HORARIO_VALIDO),
+        CheckConstraint(
+            "data_fim >= data_inicio AND intervalo_semanas >= 1 AND dias_semana BETWEEN 1 AND 127",
+            name=RECORRENCIA_DATAS_VALIDAS
+        ),
+        Index("ix_reserva_recorrente_sala_id_data_fim", "sala_id", "data_fim"),
+    )
+
+    recorrencia_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    sala_id: Mapped[int] = mapped_column(Integer, ForeignKey('sala.sala_id'), nullable=False)
+    responsavel_id: Mapped[int] = mapped_column(Integer, ForeignKey('responsavel.responsavel_id'), nullable=False)
+    dias_semana: Mapped[int] = mapped_column(Integer, nullable=False)
+    intervalo_semanas: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    hora_inicio: Mapped[Time] = mapped_column(Time, nullable=False)
+    hora_fim: Mapped[Time] = mapped_column(Time, nullable=False)
+    data_inicio: Mapped[Date] = mapped_column(Date, nullable=False)
+    data_fim: Mapped[Date] = mapped_column(Date, nullable=False)
+
+    excecoes = relationship(
+        "ExcecaoRecorrencia", cascade="all, delete-orphan", order_by="ExcecaoRecorrencia.data"
+    )
+
+
+class ExcecaoRecorrencia(db.Model):
+    """Dia em que a regra não ocorre: cancelado, ou transformado em uma
+    ``Reserva`` comum para ser finalizado."""
+    __tablename__ = "reserva_recorrente_excecao"
+
+    recorrencia_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('reserva_recorrente.recorrencia_id', ondelete="CASCADE"), primary_key=True
+    )
+    data: Mapped[Date] = mapped_column(Date, primary_key=True)
+
+
+class ReservaRecorrenteSchema(Schema):
+    recorrencia_id = fields.Int(dump_only=True)
+    sala_id = fields.Int(
+        required=True,
+        validate=validate_positive,
+        error_messages={
+            "required": "O campo sala_id é obrigatório.",
+            "null": "O campo sala_id não pode ser nulo.",
+            "validator_failed": "O campo sala_id deve ser valido(Maior que 0)."
+        }
+    )
+    responsavel_id = fields.Int(
+        required=True,
+        validate=validate_positive,
+        error_messages={
+            "required": "O campo responsavel_id é obrigatório.",
+            "null": "O campo responsavel_id não pode ser nulo.",
+            "validator_failed": "O campo responsavel_id deve ser valido(Maior que 0)."
+        }
+    )
+    dias_semana = fields.List(
+        fields.Int(validate=validate.Range(min=0, max=DIAS_SEMANA - 1, error="Use dias de 0 (segunda) a 6 (domingo).")),
+        required=True,
+        validate=validate.Length(min=1, error="Informe ao menos um dia da semana."),
+        error_messages={"required": "O campo dias_semana é obrigatório."}
+    )
+    intervalo_semanas = fields.Int(
+        load_default=1,
+        validate=validate.Range(min=1, error="O campo intervalo_semanas deve ser ao menos 1.")
+    )
+    hora_inicio = fields.Time(
+        required=True,
+        format="iso",
+        error_messages={
+            "required": "O campo hora_inicio é obrigatório.",
+            "invalid": "Formato inválido, use ISO 8601 (ex: 14:00:00)."
+        }
+    )
+    hora_fim = fields.Time(
+        required=True,
+        format="iso",
+        error_messages={
+            "required": "O campo hora_fim é obrigatório.",
+            "invalid": "Formato inválido, use ISO 8601 (ex: 16:00:00)."
+        }
+    )
+    data_inicio = fields.Date(
+        required=True,
+        format="iso",
+        error_messages={
+            "required": "O campo data_inicio é obrigatório.",
+            "invalid": "Formato inválido, use ISO 8601 (ex: 2025-08-04)."
+        }
+    )
+    data_fim = fields.Date(
+        required=True,
+        format="iso",
+        error_messages={
+            "required": "O campo data_fim é obrigatório.",
+            "invalid": "Formato inválido, use ISO 8601 (ex: 2025-12-19)."
+        }
+    )
+    excecoes = fields.List(
+        fields.Date(format="iso", error_messages={"invalid": "Formato inválido, use ISO 8601 (ex: 2025-09-07)."}),
+        load_default=list
+    )
+
+    @validates_schema(skip_on_field_errors=False)
+    def validate_periodo(self, data, **kwargs):
+        inicio, fim = data.get("hora_inicio"), data.get("hora_fim")
+        if inicio and fim and fim <= inicio:
+            raise ValidationError(
+                "O campo hora_fim deve ser posterior a hora_inicio (a ocorrência não passa da meia-noite).",
+                field_name="hora_fim"
+            )
+        inicio, fim = data.get("data_inicio"), data.get("data_fim")
+        if inicio and fim and fim < inicio:
+            raise ValidationError("O campo data_fim não pode ser anterior a data_inicio.", field_name="data_fim")
+
+    @post_load
+    def mascara(self, data, **kwargs):
+        if "dias_semana" in data:
+            data["dias_semana"] = sum(1 << dia for dia in set(data["dias_semana"]))
+        return data
+
+
+class ExcecaoRecorrenciaSchema(Schema):
+    recorrencia_id = fields.Int(dump_only=True)
+    data = fields.Date(
+        required=True,
+        format="iso",
+        error_messages={
+            "required": "O campo data é obrigatório.",
+            "invalid": "Formato inválido, use ISO 8601 (ex: 2025-09-07)."
+        }
+    )
+
+
+excecao_fields = {
+    'recorrencia_id': flaskFields.Integer,
+    'data': DateFormat
+}
+
+
+recorrencia_codec = Codec(ReservaRecorrenteSchema, recorrencia_fields)
+excecao_codec = Codec(ExcecaoRecorrenciaSchema, excecao_fields)
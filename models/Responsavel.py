@@ -3,10 +3,7 @@ from sqlalchemy import String, Integer, Date
 from helpers.database import db
 from marshmallow import Schema, fields, validate, ValidationError, validates
 from flask_restful import fields as flaskFields
-
-class DateFormat(flaskFields.Raw):
-    def format(self, value):
-        return value.isoformat() if value else None
+from helpers.codec import Codec, DateFormat
 
 responsavel_fields = {
     'responsavel_id': flaskFields.Integer,
@@ -76,3 +73,17 @@ class ResponsavelSchema(Schema):
         if db.session.query(Responsavel).filter_by(responsavel_siap=value).first():
             raise ValidationError({"unique": "Já existe um Responsavel cadastrado com esse SIAP."})
 
+
+class ResponsavelImportacaoSchema(ResponsavelSchema):
+    """Mesmas regras de campo, sem as consultas de unicidade: na importação
+    CPF e SIAP são conferidos de uma vez só, no banco."""
+
+    def validate_unique_cpf(self, value, **kwargs):
+        pass
+
+    def validate_unique_siap(self, value, **kwargs):
+        pass
+
+
+responsavel_codec = Codec(ResponsavelSchema, responsavel_fields)
+responsavel_importacao_codec = Codec(ResponsavelImportacaoSchema, responsavel_fields)
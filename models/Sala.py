@@ -3,6 +3,7 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import Integer, Text
 from marshmallow import Schema, fields, validate, ValidationError
 from flask_restful import fields as flaskFields
+from helpers.codec import Codec
 
 
 sala_fields = {
@@ -47,3 +48,6 @@ class SalaSchema(Schema):
             "validator_failed": "O campo chave_nome deve ter exatamente 2 caracteres."
         }
     )
+
+
+sala_codec = Codec(SalaSchema, sala_fields)
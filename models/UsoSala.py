@@ -0,0 +1,27 @@
+from helpers.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, String, Date, DateTime, Index
+
+GRANULARIDADES = ("dia", "mes")
+
+
+class UsoSala(db.Model):
+    """Uso agregado de uma sala por dia e por mês (``inicio`` é o dia ou o
+    primeiro dia do mês). Mantido por ``helpers.uso``; os segundos contam a
+    partir do início de cada reserva, no dia em que ela começa."""
+    __tablename__ = "uso_sala"
+    __table_args__ = (
+        Index("ix_uso_sala_granularidade_inicio", "granularidade", "inicio"),
+    )
+
+    sala_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    granularidade: Mapped[str] = mapped_column(String(3), primary_key=True)
+    inicio: Mapped[Date] = mapped_column(Date, primary_key=True)
+    reservas: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    segundos_reservados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    finalizadas: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    segundos_usados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    atrasos: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    segundos_atraso: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ausencias: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    atualizado_em: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
@@ -0,0 +1,11 @@
+from helpers.database import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, String, DateTime
+
+
+class VersaoTabela(db.Model):
+    __tablename__ = "versao_tabela"
+
+    tabela: Mapped[str] = mapped_column(String(64), primary_key=True)
+    versao: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    atualizado_em: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
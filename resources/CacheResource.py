@@ -0,0 +1,9 @@
+from flask_restful import Resource
+from helpers.cache import entidades
+from helpers.orcamento import orcamento_consultas
+
+
+class CacheResource(Resource):
+    @orcamento_consultas(0)
+    def get(self):
+        return entidades.estatisticas(), 200
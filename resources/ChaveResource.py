@@ -0,0 +1,33 @@
+from flask import request, abort
+from flask_restful import Resource
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+from helpers.database import db
+from helpers.logging import logger, log_exception
+from helpers.quadro import quadro, SITUACOES
+from helpers.orcamento import orcamento_consultas
+
+
+class ChavesStatusResource(Resource):
+    @orcamento_consultas(2)
+    def get(self):
+        logger.info("GET - Quadro de chaves")
+
+        situacao = request.args.get("situacao")
+        if situacao and situacao not in SITUACOES:
+            return {"erro": f"Situação inválida, use uma de: {', '.join(SITUACOES)}."}, 400
+
+        try:
+            agora = datetime.now()
+            chaves = quadro.situacao(agora)
+            if situacao:
+                chaves = [chave for chave in chaves if chave["situacao"] == situacao]
+            return {"gerado_em": agora.isoformat(), "chaves": chaves}, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao montar o quadro de chaves")
+            db.session.rollback()
+            abort(500, description="Erro ao montar o quadro de chaves no banco de dados.")
+        except Exception:
+            log_exception("Erro inesperado ao montar o quadro de chaves")
+            abort(500, description="Erro interno inesperado.")
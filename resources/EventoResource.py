@@ -0,0 +1,20 @@
+from flask import Response, request
+from flask_restful import Resource
+from helpers.logging import logger
+from helpers.eventos import eventos
+from helpers.orcamento import orcamento_consultas
+
+
+class EventosResource(Resource):
+    @orcamento_consultas(0)
+    def get(self):
+        # EventSource só manda Last-Event-ID ao reconectar; na primeira
+        # conexão o cliente pode informar o último id visto em ?ultimo_id=.
+        ultimo_id = request.headers.get("Last-Event-ID") or request.args.get("ultimo_id")
+        logger.info(f"GET - Stream de eventos (último id: {ultimo_id or '-'})")
+
+        return Response(
+            eventos.stream(ultimo_id),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
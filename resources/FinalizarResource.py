@@ -1,16 +1,32 @@
 from flask import request, abort
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 from marshmallow import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from helpers.database import db
 from helpers.logging import logger, log_exception
-from datetime import datetime
-from models.Finalizar import Finalizar, FinalizarSchema, finalizacao_fields
-from models.Reserva import Reserva
+from helpers.paginacao import PaginacaoInvalida, modo_cursor, pagina_por_cursor
+from helpers.disponibilidade import disponibilidade
+from helpers import uso
+from helpers.quadro import quadro
+from helpers.eventos import eventos
+from helpers.orcamento import orcamento_consultas
+from helpers.recorrencia import Regra, materializar
+from helpers.travas import travar_salas
+from models.Finalizar import Finalizar, finalizacao_codec, finalizacao_repetida
+from models.Reserva import Reserva, RESERVA_CONFLITO
+from models.ReservaRecorrente import ReservaRecorrente, ExcecaoRecorrencia
 from models.Historico import Historico
 
+LOTE_MAXIMO = 1000
+# Orçamento de consultas do lote, que não cresce com o número de itens: as
+# finalizações e os históricos vão em um INSERT ... SELECT cada e o uso é
+# recalculado de uma vez (ver helpers.orcamento).
+CONSULTAS_LOTE = 12
+
 
 class FinalizacõesResource(Resource):
+    @orcamento_consultas(2)
     def get(self):
         logger.info("GET ALL - Listagem de Finalizações")
 
@@ -18,13 +34,21 @@ class FinalizacõesResource(Resource):
         per_page = int(request.args.get("per_page", 50))
 
         try:
+            if modo_cursor():
+                finalizacoes, proximo = pagina_por_cursor(db.select(Finalizar), Finalizar.finalizacao_id)
+                logger.info("Finalizações retornadas com sucesso")
+                return {"dados": finalizacao_codec.dump_lista(finalizacoes), "next": proximo}, 200
+
             query = db.select(Finalizar).order_by(Finalizar.finalizacao_id)
             finalizacoes = db.session.execute(
                 query.offset((page - 1) * per_page).limit(per_page)
             ).scalars().all()
 
             logger.info("Finalizações retornadas com sucesso")
-            return marshal(finalizacoes, finalizacao_fields), 200
+            return finalizacao_codec.dump_lista(finalizacoes), 200
+
+        except PaginacaoInvalida as err:
+            return {"erro": str(err)}, 400
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Finalizações")
@@ -36,43 +60,79 @@ class FinalizacõesResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(20)
     def post(self):
         logger.info("POST - Nova Finalização")
-        schema = FinalizarSchema()
         dados = request.get_json()
-        
-        reserva_id = dados.get("reserva_id")
-        data_hora_finalizacao = dados.get("data_hora_finalizacao")
 
         try:
-            data_hora_finalizacao = datetime.fromisoformat(data_hora_finalizacao)
-            reserva = db.session.get(Reserva, reserva_id)
-            if not reserva:
-                return {"erro": "Reserva não encontrada"}, 404
-            
-            validado = schema.load(dados)
-            nova_finalizacao = Finalizar(**validado)
-            db.session.add(nova_finalizacao)
-
-            novo_historico = Historico(
-                reserva_id=reserva.reserva_id,
-                sala_id=reserva.sala_id,
-                responsavel_id=reserva.responsavel_id,
-                data_hora_inicio=reserva.data_hora_inicio,
-                data_hora_fim=data_hora_finalizacao
-            )
-            db.session.add(novo_historico)
+            validado = finalizacao_codec.load(dados)
+            recorrencia = None
+            if "recorrencia_id" in validado:
+                recorrencia_id, dia = validado.pop("recorrencia_id"), validado.pop("data_ocorrencia")
+                recorrencia = db.session.get(ReservaRecorrente, recorrencia_id)
+                if not recorrencia:
+                    return {"erro": "Recorrência não encontrada"}, 404
 
-            db.session.commit()
+            # Ocorrência de recorrência: vira uma reserva comum (e exceção da
+            # regra) na mesma transação, e segue o caminho normal. Como uma
+            # reserva nova, a sala fica travada da checagem até o commit.
+            with travar_salas(recorrencia.sala_id if recorrencia else None):
+                if recorrencia:
+                    regra = Regra.do_modelo(recorrencia)
+                    if dia in regra.excecoes:
+                        db.session.rollback()
+                        return {"erro": "Ocorrência cancelada ou já finalizada."}, 409
+                    if not regra.ocorre_em(dia):
+                        db.session.rollback()
+                        return {"erro": "Dados inválidos", "detalhes": {"data_ocorrencia": ["A recorrência não ocorre nesta data."]}}, 422
+                    reserva = materializar(recorrencia, dia)
+                    validado["reserva_id"] = reserva.reserva_id
+                else:
+                    reserva = db.session.get(Reserva, validado["reserva_id"])
+                    if not reserva:
+                        return {"erro": "Reserva não encontrada"}, 404
+
+                nova_finalizacao = Finalizar(**validado)
+                db.session.add(nova_finalizacao)
+
+                novo_historico = Historico(
+                    reserva_id=reserva.reserva_id,
+                    sala_id=reserva.sala_id,
+                    responsavel_id=reserva.responsavel_id,
+                    data_hora_inicio=reserva.data_hora_inicio,
+                    data_hora_fim=validado["data_hora_finalizacao"]
+                )
+                db.session.add(novo_historico)
+                uso.recalcular([(reserva.sala_id, reserva.data_hora_inicio)])
+
+                db.session.commit()
+            disponibilidade.invalidar(reserva.sala_id)
+            quadro.remover([reserva.reserva_id])
+            eventos.publicar(
+                "finalizacao.criada", finalizacao_id=nova_finalizacao.finalizacao_id,
+                reserva_id=reserva.reserva_id, sala_id=reserva.sala_id
+            )
             logger.info(
                 f"Finalização {nova_finalizacao.finalizacao_id} criada "
                 f"e reserva {reserva.reserva_id} adicionada ao histórico!"
             )
 
-            return marshal(nova_finalizacao, finalizacao_fields), 201
+            return finalizacao_codec.dump(nova_finalizacao), 201
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError as e:
+            db.session.rollback()
+            # Outra requisição materializou a mesma ocorrência antes.
+            if ExcecaoRecorrencia.__tablename__ in str(e.orig):
+                return {"erro": "Ocorrência cancelada ou já finalizada."}, 409
+            if finalizacao_repetida(e):
+                return {"erro": "Reserva já finalizada."}, 409
+            if RESERVA_CONFLITO in str(e.orig):
+                return {"erro": "A sala não está disponível para o período solicitado."}, 409
+            log_exception("Erro de integridade ao inserir finalização/histórico")
+            abort(500, description="Erro ao inserir finalização/histórico no banco.")
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao inserir finalização/histórico")
             db.session.rollback()
@@ -84,13 +144,14 @@ class FinalizacõesResource(Resource):
 
 
 class FinalizarResource(Resource):
+    @orcamento_consultas(2)
     def get(self, finalizar_id):
         logger.info(f"GET BY finalizacao_id - Finalização {finalizar_id}")
         try:
             finalizar = db.session.get(Finalizar, finalizar_id)
             if not finalizar:
                 return {"erro": "Finalização não encontrada"}, 404
-            return marshal(finalizar, finalizacao_fields), 200
+            return finalizacao_codec.dump(finalizar), 200
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Finalização")
@@ -100,9 +161,9 @@ class FinalizarResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(4)
     def put(self, finalizar_id):
         logger.info(f"PUT - Finalização {finalizar_id}")
-        schema = FinalizarSchema()
         dados = request.get_json()
 
         try:
@@ -110,15 +171,25 @@ class FinalizarResource(Resource):
             if not finalizacao:
                 return {"erro": "Finalização não encontrada"}, 404
 
-            atualizados = schema.load(dados, partial=True)
+            atualizados = finalizacao_codec.load(dados, partial=True)
             for campo, valor in atualizados.items():
                 setattr(finalizacao, campo, valor)
 
             db.session.commit()
-            return marshal(finalizacao, finalizacao_fields), 200
+            quadro.invalidar()
+            eventos.publicar(
+                "finalizacao.atualizada", finalizacao_id=finalizar_id, reserva_id=finalizacao.reserva_id
+            )
+            return finalizacao_codec.dump(finalizacao), 200
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError as e:
+            db.session.rollback()
+            if finalizacao_repetida(e):
+                return {"erro": "Reserva já finalizada."}, 409
+            log_exception("Erro de integridade ao atualizar Finalização")
+            abort(500, description="Erro ao atualizar Finalização.")
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao atualizar Finalização")
             db.session.rollback()
@@ -127,6 +198,7 @@ class FinalizarResource(Resource):
             log_exception("Erro inesperado ao atualizar Finalização")
             abort(500, description="Erro interno inesperado.")
 
+    @orcamento_consultas(14)
     def delete(self, finalizar_id):
         logger.info(f"DELETE - Finalização {finalizar_id}")
         try:
@@ -134,8 +206,16 @@ class FinalizarResource(Resource):
             if not finalizacao:
                 return {"erro": "finalizacao não encontrada"}, 404
 
+            reserva = db.session.get(Reserva, finalizacao.reserva_id)
             db.session.delete(finalizacao)
+            if reserva:
+                uso.recalcular([(reserva.sala_id, reserva.data_hora_inicio)])
             db.session.commit()
+            quadro.invalidar()
+            eventos.publicar(
+                "finalizacao.removida", finalizacao_id=finalizar_id, reserva_id=finalizacao.reserva_id,
+                sala_id=reserva.sala_id if reserva else None
+            )
             return {"mensagem": "finalizacao removida com sucesso"}, 200
 
 
@@ -146,3 +226,118 @@ class FinalizarResource(Resource):
         except Exception:
             log_exception("Erro inesperado ao remover finalizacao")
             abort(500, description="Erro interno inesperado.")
+
+
+class FinalizacoesLoteResource(Resource):
+    @orcamento_consultas(CONSULTAS_LOTE)
+    def post(self):
+        logger.info("POST - Lote de finalizações")
+        dados = request.get_json()
+
+        if not isinstance(dados, list) or not dados:
+            return {"erro": "Dados inválidos", "detalhes": "Envie uma lista não vazia de finalizações."}, 422
+        if len(dados) > LOTE_MAXIMO:
+            return {"erro": "Dados inválidos", "detalhes": f"O lote aceita no máximo {LOTE_MAXIMO} finalizações."}, 422
+
+        try:
+            try:
+                validados = finalizacao_codec.load_lista(dados)
+                erros = {}
+            except ValidationError as err:
+                validados, erros = err.valid_data, err.messages
+
+            resultados = [None] * len(dados)
+            for indice, detalhes in erros.items():
+                resultados[indice] = {"indice": indice, "status": 422, "erro": "Dados inválidos", "detalhes": detalhes}
+
+            pendentes = {}
+            for i in range(len(dados)):
+                if resultados[i] is not None:
+                    continue
+                if "reserva_id" not in validados[i]:
+                    resultados[i] = {"indice": i, "status": 422, "erro": "Dados inválidos",
+                                     "detalhes": {"recorrencia_id": ["Finalize ocorrências de recorrência em POST /finalizacoes."]}}
+                    continue
+                reserva_id = validados[i]["reserva_id"]
+                if reserva_id in pendentes:
+                    resultados[i] = {"indice": i, "reserva_id": reserva_id, "status": 409,
+                                     "erro": "Reserva repetida no lote."}
+                else:
+                    pendentes[reserva_id] = i
+
+            if pendentes:
+                existentes = set(db.session.execute(
+                    db.select(Reserva.reserva_id).where(Reserva.reserva_id.in_(pendentes))
+                ).scalars())
+                for reserva_id in [r for r in pendentes if r not in existentes]:
+                    i = pendentes.pop(reserva_id)
+                    resultados[i] = {"indice": i, "reserva_id": reserva_id, "status": 404,
+                                     "erro": "Reserva não encontrada"}
+
+            criadas = {}
+            if pendentes:
+                # Duas instruções INSERT ... SELECT para o lote todo. O ON
+                # CONFLICT no índice único de reserva_id deixa de fora reservas
+                # já finalizadas, inclusive por outra requisição concorrente
+                # (um NOT EXISTS não vê o INSERT ainda não confirmado dela), e
+                # o RETURNING diz quais entraram.
+                ids = list(pendentes)
+                finalizacao = db.case(
+                    {reserva_id: validados[i]["data_hora_finalizacao"] for reserva_id, i in pendentes.items()},
+                    value=Reserva.reserva_id
+                )
+                insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+                criadas = dict(db.session.execute(
+                    insert(Finalizar)
+                    .from_select(
+                        ["reserva_id", "data_hora_finalizacao"],
+                        db.select(Reserva.reserva_id, finalizacao).where(Reserva.reserva_id.in_(ids))
+                    )
+                    .on_conflict_do_nothing(index_elements=["reserva_id"])
+                    .returning(Finalizar.reserva_id, Finalizar.finalizacao_id)
+                ).all())
+
+                afetados = []
+                if criadas:
+                    afetados = db.session.execute(
+                        db.insert(Historico)
+                        .from_select(
+                            ["reserva_id", "sala_id", "responsavel_id", "data_hora_inicio", "data_hora_fim"],
+                            db.select(
+                                Reserva.reserva_id, Reserva.sala_id, Reserva.responsavel_id,
+                                Reserva.data_hora_inicio, finalizacao
+                            ).where(Reserva.reserva_id.in_(list(criadas)))
+                        )
+                        .returning(Historico.sala_id, Historico.data_hora_inicio)
+                    ).all()
+                    uso.recalcular(afetados)
+                db.session.commit()
+                for sala_id in {sala_id for sala_id, _ in afetados}:
+                    disponibilidade.invalidar(sala_id)
+                quadro.remover(criadas)
+                if criadas:
+                    eventos.publicar(
+                        "finalizacao.lote", reserva_ids=sorted(criadas),
+                        sala_ids=sorted({sala_id for sala_id, _ in afetados})
+                    )
+
+                for reserva_id, i in pendentes.items():
+                    if reserva_id in criadas:
+                        resultados[i] = {"indice": i, "reserva_id": reserva_id, "status": 201,
+                                         "finalizacao_id": criadas[reserva_id]}
+                    else:
+                        resultados[i] = {"indice": i, "reserva_id": reserva_id, "status": 409,
+                                         "erro": "Reserva já finalizada."}
+
+            rejeitadas = len(dados) - len(criadas)
+            logger.info(f"Lote de finalizações: {len(criadas)} criadas, {rejeitadas} rejeitadas")
+            status = 201 if not rejeitadas else 207
+            return {"finalizadas": len(criadas), "rejeitadas": rejeitadas, "resultados": resultados}, status
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao inserir lote de finalizações")
+            db.session.rollback()
+            abort(500, description="Erro ao inserir lote de finalizações no banco.")
+        except Exception:
+            log_exception("Erro inesperado ao inserir lote de finalizações")
+            abort(500, description="Erro interno inesperado.")
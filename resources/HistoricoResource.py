@@ -1,14 +1,99 @@
-from flask import request, abort
-from flask_restful import Resource, marshal
+from flask import request, abort, Response, stream_with_context
+from flask_restful import Resource
 from marshmallow import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from helpers.database import db
+from helpers.datas import data_hora
 from helpers.logging import logger, log_exception
-from models.Historico import Historico, HistoricoSchema, historico_fields
+from helpers.paginacao import PaginacaoInvalida, modo_cursor, pagina_por_cursor
+from helpers import uso
+from helpers.orcamento import conferir_ao_fim, orcamento_consultas
+from models.Historico import Historico, historico_codec
 from datetime import datetime
+import csv
+import io
+import json
+import zlib
+
+FORMATOS_EXPORTACAO = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+TAMANHO_LOTE_EXPORTACAO = 2000
+ERRO_EXPORTACAO = "Exportação interrompida por erro no servidor; o arquivo está incompleto."
+COLUNAS_HISTORICO = (
+    "historico_id", "reserva_id", "sala_id", "responsavel_id", "data_hora_inicio", "data_hora_fim"
+)
+
+
+def filtrar_historicos(query, args):
+    """Aplica os filtros ``de``, ``ate``, ``sala_id`` e ``responsavel_id`` da
+    query string.
+
+    ``de``/``ate`` limitam ``data_hora_inicio``, a chave de partição de
+    historico, então o Postgres só lê os meses do intervalo. Lança
+    ``ValueError`` se algum parâmetro for inválido.
+    """
+    if args.get("de"):
+        query = query.where(Historico.data_hora_inicio >= data_hora(args["de"]))
+    if args.get("ate"):
+        query = query.where(Historico.data_hora_inicio < data_hora(args["ate"]))
+    if args.get("sala_id"):
+        query = query.where(Historico.sala_id == int(args["sala_id"]))
+    if args.get("responsavel_id"):
+        query = query.where(Historico.responsavel_id == int(args["responsavel_id"]))
+    return query
+
+
+def _valor(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _linhas_ndjson(resultado):
+    for lote in resultado.partitions():
+        yield "".join(
+            json.dumps(dict(zip(COLUNAS_HISTORICO, map(_valor, linha))), ensure_ascii=False) + "\n"
+            for linha in lote
+        )
+
+
+def _linhas_csv(resultado):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_HISTORICO)
+    for lote in resultado.partitions():
+        escritor.writerows([_valor(valor) for valor in linha] for linha in lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _linha_erro(formato):
+    """Último registro de uma exportação que falhou no meio, para o corte
+    aparecer no próprio arquivo mesmo sem compressão."""
+    if formato == "ndjson":
+        return json.dumps({"erro": ERRO_EXPORTACAO}, ensure_ascii=False) + "\n"
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["erro", ERRO_EXPORTACAO])
+    return buffer.getvalue()
+
+
+def _gzip(pedacos):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for pedaco in pedacos:
+            dados = compressor.compress(pedaco.encode())
+            if dados:
+                yield dados
+    except Exception:
+        # Manda o que já foi comprimido (com o registro de erro) sem fechar
+        # o gzip: sem o rodapé o cliente acusa o corte ao descompactar.
+        yield compressor.flush(zlib.Z_SYNC_FLUSH)
+        raise
+    yield compressor.flush()
 
 
 class HistoricosResource(Resource):
+    @orcamento_consultas(2)
     def get(self):
         logger.info("GET ALL - Listagem de Historicos")
 
@@ -16,13 +101,26 @@ class HistoricosResource(Resource):
         per_page = int(request.args.get("per_page", 50))
 
         try:
-            query = db.select(Historico).order_by(Historico.historico_id)
+            filtrada = filtrar_historicos(db.select(Historico), request.args)
+        except ValueError:
+            return {"erro": "Parâmetros inválidos: de/ate em ISO 8601 e sala_id/responsavel_id inteiros."}, 400
+
+        try:
+            if modo_cursor():
+                historicos, proximo = pagina_por_cursor(filtrada, Historico.historico_id)
+                logger.info("Historicos retornadas com sucesso")
+                return {"dados": historico_codec.dump_lista(historicos), "next": proximo}, 200
+
+            query = filtrada.order_by(Historico.historico_id)
             historicos = db.session.execute(
                 query.offset((page - 1) * per_page).limit(per_page)
             ).scalars().all()
 
             logger.info("Historicos retornadas com sucesso")
-            return marshal(historicos, historico_fields), 200
+            return historico_codec.dump_lista(historicos), 200
+
+        except PaginacaoInvalida as err:
+            return {"erro": str(err)}, 400
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Historicos")
@@ -34,18 +132,19 @@ class HistoricosResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(12)
     def post(self):
         logger.info("POST - Nova Historico")
-        schema = HistoricoSchema()
         dados = request.get_json()
 
         try:
-            validado = schema.load(dados)
+            validado = historico_codec.load(dados)
             novo_historico = Historico(**validado)
             db.session.add(novo_historico)
+            uso.recalcular([(novo_historico.sala_id, novo_historico.data_hora_inicio)])
             db.session.commit()
             logger.info(f"Historico {novo_historico.historico_id} criada com sucesso!")
-            return marshal(novo_historico, historico_fields), 201
+            return historico_codec.dump(novo_historico), 201
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
@@ -59,13 +158,14 @@ class HistoricosResource(Resource):
 
 
 class HistoricoResource(Resource):
+    @orcamento_consultas(2)
     def get(self, historico_id):
         logger.info(f"GET BY historico_id - historico {historico_id}")
         try:
             historico = db.session.get(Historico, historico_id)
             if not historico:
                 return {"erro": "historico não encontrada"}, 404
-            return marshal(historico, historico_fields), 200
+            return historico_codec.dump(historico), 200
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar historico")
@@ -75,9 +175,9 @@ class HistoricoResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(12)
     def put(self, historico_id):
         logger.info(f"PUT - historico {historico_id}")
-        schema = HistoricoSchema()
         dados = request.get_json()
 
         try:
@@ -85,12 +185,14 @@ class HistoricoResource(Resource):
             if not historico:
                 return {"erro": "Historico não encontrada"}, 404
 
-            atualizados = schema.load(dados, partial=True)
+            atualizados = historico_codec.load(dados, partial=True)
+            anterior = (historico.sala_id, historico.data_hora_inicio)
             for campo, valor in atualizados.items():
                 setattr(historico, campo, valor)
 
+            uso.recalcular([anterior, (historico.sala_id, historico.data_hora_inicio)])
             db.session.commit()
-            return marshal(historico, historico_fields), 200
+            return historico_codec.dump(historico), 200
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
@@ -102,6 +204,7 @@ class HistoricoResource(Resource):
             log_exception("Erro inesperado ao atualizar Historico")
             abort(500, description="Erro interno inesperado.")
 
+    @orcamento_consultas(12)
     def delete(self, historico_id):
         logger.info(f"DELETE - Historico {historico_id}")
         try:
@@ -110,6 +213,7 @@ class HistoricoResource(Resource):
                 return {"erro": "Historico não encontrada"}, 404
 
             db.session.delete(historico)
+            uso.recalcular([(historico.sala_id, historico.data_hora_inicio)])
             db.session.commit()
             return {"mensagem": "Historico removida com sucesso"}, 200
 
@@ -121,3 +225,60 @@ class HistoricoResource(Resource):
         except Exception:
             log_exception("Erro inesperado ao remover Historico")
             abort(500, description="Erro interno inesperado.")
+
+
+class HistoricosExportResource(Resource):
+    @orcamento_consultas(2)
+    def get(self):
+        logger.info("GET - Exportação de Historicos")
+
+        formato = request.args.get("formato", "ndjson")
+        if formato not in FORMATOS_EXPORTACAO:
+            return {"erro": f"Formato inválido, use um de: {', '.join(FORMATOS_EXPORTACAO)}."}, 400
+
+        try:
+            query = filtrar_historicos(
+                db.select(*(getattr(Historico, coluna) for coluna in COLUNAS_HISTORICO)),
+                request.args
+            ).order_by(Historico.data_hora_inicio, Historico.historico_id)
+        except ValueError:
+            return {"erro": "Parâmetros inválidos: de/ate em ISO 8601 e sala_id/responsavel_id inteiros."}, 400
+
+        def gerar():
+            # O status 200 já foi enviado quando um erro acontece: depois do
+            # registro de erro a exceção sobe e o servidor corta a conexão,
+            # sem o fim do chunked, para o cliente não aceitar o arquivo
+            # truncado como completo.
+            try:
+                # yield_per ativa stream_results: o driver usa cursor do
+                # lado do servidor e a memória fica constante.
+                resultado = db.session.execute(
+                    query.execution_options(yield_per=TAMANHO_LOTE_EXPORTACAO)
+                )
+                linhas = _linhas_ndjson(resultado) if formato == "ndjson" else _linhas_csv(resultado)
+                yield from linhas
+                logger.info("Exportação de Historicos concluída")
+            except SQLAlchemyError:
+                log_exception("Erro SQLAlchemy ao exportar Historicos")
+                db.session.rollback()
+                yield _linha_erro(formato)
+                raise
+            except Exception:
+                log_exception("Erro inesperado ao exportar Historicos")
+                yield _linha_erro(formato)
+                raise
+
+        headers = {
+            "Content-Disposition": f"attachment; filename=historico.{formato}",
+            "Vary": "Accept-Encoding"
+        }
+        corpo = conferir_ao_fim(gerar())
+        if request.accept_encodings["gzip"]:
+            corpo = _gzip(corpo)
+            headers["Content-Encoding"] = "gzip"
+
+        return Response(
+            stream_with_context(corpo),
+            mimetype=FORMATOS_EXPORTACAO[formato],
+            headers=headers
+        )
@@ -1,6 +1,8 @@
 from flask_restful import Resource
+from helpers.orcamento import orcamento_consultas
 
 class IndexResource(Resource):
+    @orcamento_consultas(0)
     def get(self):
         versao = {"versao": "1.0.0"}
         return versao, 200
\ No newline at end of file
@@ -0,0 +1,34 @@
+from flask import Response
+from flask_restful import Resource
+from helpers.cache import entidades
+from helpers.eventos import eventos
+from helpers import metricas
+from helpers.orcamento import orcamento_consultas
+
+
+def _metricas_cache():
+    linhas = [
+        "# HELP keycontrol_cache_consultas_total Consultas ao cache de entidades.",
+        "# TYPE keycontrol_cache_consultas_total counter",
+    ]
+    for entidade, contadores in sorted(entidades.estatisticas().items()):
+        for resultado, total in sorted(contadores.items()):
+            linhas.append(f'keycontrol_cache_consultas_total{{entidade="{entidade}",resultado="{resultado}"}} {total}')
+    return linhas
+
+
+def _metricas_eventos():
+    return [
+        "# HELP keycontrol_eventos_assinantes Conexões abertas em /eventos.",
+        "# TYPE keycontrol_eventos_assinantes gauge",
+        f"keycontrol_eventos_assinantes {eventos.assinantes()}",
+    ]
+
+
+class MetricasResource(Resource):
+    @orcamento_consultas(0)
+    def get(self):
+        return Response(
+            metricas.exportar(_metricas_cache() + _metricas_eventos()),
+            mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
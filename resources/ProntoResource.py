@@ -0,0 +1,11 @@
+from flask import current_app
+from flask_restful import Resource
+from helpers.orcamento import orcamento_consultas
+
+
+class ProntoResource(Resource):
+    @orcamento_consultas(0)
+    def get(self):
+        if not current_app.extensions["keycontrol"]["pronto"].is_set():
+            return {"pronto": False}, 503
+        return {"pronto": True}, 200
@@ -0,0 +1,317 @@
+from flask import request, abort
+from flask_restful import Resource
+from marshmallow import ValidationError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from helpers.database import db
+from helpers.datas import data_hora
+from helpers.logging import logger, log_exception
+from helpers.paginacao import PaginacaoInvalida, modo_cursor, pagina_por_cursor
+from helpers.cache import sala_por_id, responsavel_por_id
+from helpers.eventos import eventos
+from helpers.travas import travar_salas
+from helpers.orcamento import orcamento_consultas
+from helpers.recorrencia import JANELA_MAXIMA, Regra, conflito_da_regra
+from models.ReservaRecorrente import (
+    ReservaRecorrente, ExcecaoRecorrencia, recorrencia_codec, excecao_codec,
+    RECORRENCIA_HORARIO_VALIDO, RECORRENCIA_DATAS_VALIDAS, RECORRENCIA_SALA_FK, RECORRENCIA_RESPONSAVEL_FK
+)
+from datetime import datetime, timedelta
+
+CONFLITO = "A sala não está disponível em alguma ocorrência da recorrência."
+
+
+def _integridade(e):
+    """Resposta para as restrições de ``reserva_recorrente``, ou ``None``."""
+    msg = str(e.orig)
+    if RECORRENCIA_SALA_FK in msg:
+        return {"erro": "Sala não encontrada"}, 404
+    if RECORRENCIA_RESPONSAVEL_FK in msg:
+        return {"erro": "Responsável não encontrado"}, 404
+    if RECORRENCIA_HORARIO_VALIDO in msg:
+        return {"erro": "Dados inválidos", "detalhes": {"hora_fim": ["O campo hora_fim deve ser posterior a hora_inicio."]}}, 422
+    if RECORRENCIA_DATAS_VALIDAS in msg:
+        return {"erro": "Dados inválidos", "detalhes": {"data_fim": ["O campo data_fim não pode ser anterior a data_inicio."]}}, 422
+    return None
+
+
+class RecorrenciasResource(Resource):
+    @orcamento_consultas(3)
+    def get(self):
+        logger.info("GET ALL - Listagem de Recorrências")
+
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 50))
+
+        try:
+            query = db.select(ReservaRecorrente).options(db.selectinload(ReservaRecorrente.excecoes))
+            if request.args.get("sala_id"):
+                query = query.where(ReservaRecorrente.sala_id == int(request.args["sala_id"]))
+            if request.args.get("responsavel_id"):
+                query = query.where(ReservaRecorrente.responsavel_id == int(request.args["responsavel_id"]))
+        except ValueError:
+            return {"erro": "Parâmetros inválidos: sala_id/responsavel_id inteiros."}, 400
+
+        try:
+            if modo_cursor():
+                recorrencias, proximo = pagina_por_cursor(query, ReservaRecorrente.recorrencia_id)
+                return {"dados": recorrencia_codec.dump_lista(recorrencias), "next": proximo}, 200
+
+            recorrencias = db.session.execute(
+                query.order_by(ReservaRecorrente.recorrencia_id).offset((page - 1) * per_page).limit(per_page)
+            ).scalars().all()
+            return recorrencia_codec.dump_lista(recorrencias), 200
+
+        except PaginacaoInvalida as err:
+            return {"erro": str(err)}, 400
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao buscar recorrências")
+            db.session.rollback()
+            abort(500, description="Erro ao buscar recorrências no banco de dados.")
+
+        except Exception:
+            log_exception("Erro inesperado ao buscar recorrências")
+            abort(500, description="Erro interno inesperado.")
+
+
+    @orcamento_consultas(8)
+    def post(self):
+        logger.info("POST - Nova recorrência")
+        dados = request.get_json()
+
+        try:
+            validado = recorrencia_codec.load(dados)
+
+            if not sala_por_id(validado["sala_id"]):
+                return {"erro": "Sala não encontrada"}, 404
+            if not responsavel_por_id(validado["responsavel_id"]):
+                return {"erro": "Responsável não encontrado"}, 404
+
+            excecoes = sorted(set(validado.pop("excecoes")))
+            recorrencia = ReservaRecorrente(
+                **validado, excecoes=[ExcecaoRecorrencia(data=dia) for dia in excecoes]
+            )
+            # As reservas avulsas da sala usam a mesma trava, então nenhuma
+            # delas entra entre a checagem e o INSERT da regra.
+            with travar_salas(recorrencia.sala_id):
+                conflito = conflito_da_regra(Regra.do_modelo(recorrencia))
+                if conflito:
+                    db.session.rollback()
+                    return {"erro": CONFLITO, "conflito": conflito}, 409
+                db.session.add(recorrencia)
+                db.session.commit()
+
+            eventos.publicar(
+                "recorrencia.criada", recorrencia_id=recorrencia.recorrencia_id, sala_id=recorrencia.sala_id
+            )
+            logger.info(f"Recorrência {recorrencia.recorrencia_id} criada")
+            return recorrencia_codec.dump(recorrencia), 201
+
+        except ValidationError as err:
+            return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError as e:
+            db.session.rollback()
+            resposta = _integridade(e)
+            if resposta:
+                return resposta
+            log_exception("Erro de integridade ao inserir recorrência")
+            abort(500, description="Erro ao inserir recorrência no banco.")
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao inserir recorrência")
+            db.session.rollback()
+            abort(500, description="Erro ao inserir recorrência no banco.")
+        except Exception:
+            log_exception("Erro inesperado ao inserir recorrência")
+            abort(500, description="Erro interno inesperado.")
+
+
+class RecorrenciaResource(Resource):
+    @orcamento_consultas(2)
+    def get(self, recorrencia_id):
+        logger.info(f"GET BY recorrencia_id - Recorrência {recorrencia_id}")
+        try:
+            recorrencia = db.session.get(ReservaRecorrente, recorrencia_id)
+            if not recorrencia:
+                return {"erro": "Recorrência não encontrada"}, 404
+            return recorrencia_codec.dump(recorrencia), 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao buscar Recorrência")
+            abort(500, description="Erro ao buscar Recorrência no banco de dados.")
+        except Exception:
+            log_exception("Erro inesperado ao buscar Recorrência")
+            abort(500, description="Erro interno inesperado.")
+
+
+    @orcamento_consultas(10)
+    def put(self, recorrencia_id):
+        logger.info(f"PUT - Recorrência {recorrencia_id}")
+        dados = request.get_json()
+
+        try:
+            recorrencia = db.session.get(ReservaRecorrente, recorrencia_id)
+            if not recorrencia:
+                return {"erro": "Recorrência não encontrada"}, 404
+
+            atualizados = recorrencia_codec.load(dados, partial=True)
+            # Exceções podem ser ocorrências já finalizadas (viraram reservas):
+            # trocá-las aqui reabriria esses dias na regra.
+            if "excecoes" in atualizados:
+                return {"erro": "Dados inválidos", "detalhes": {"excecoes": [
+                    f"Use POST /recorrencias/{recorrencia_id}/excecoes para cancelar ocorrências."
+                ]}}, 422
+            if "sala_id" in atualizados and not sala_por_id(atualizados["sala_id"]):
+                return {"erro": "Sala não encontrada"}, 404
+            if "responsavel_id" in atualizados and not responsavel_por_id(atualizados["responsavel_id"]):
+                return {"erro": "Responsável não encontrado"}, 404
+
+            sala_anterior = recorrencia.sala_id
+            with travar_salas(sala_anterior, atualizados.get("sala_id")):
+                for campo, valor in atualizados.items():
+                    setattr(recorrencia, campo, valor)
+
+                # A validação parcial só vê os campos enviados; o período
+                # completo é conferido aqui, já com os valores atuais.
+                if recorrencia.hora_fim <= recorrencia.hora_inicio or recorrencia.data_fim < recorrencia.data_inicio:
+                    db.session.rollback()
+                    return {"erro": "Dados inválidos", "detalhes": {"periodo": [
+                        "hora_fim deve ser posterior a hora_inicio e data_fim não pode ser anterior a data_inicio."
+                    ]}}, 422
+
+                conflito = conflito_da_regra(Regra.do_modelo(recorrencia), ignorar=recorrencia_id)
+                if conflito:
+                    db.session.rollback()
+                    return {"erro": CONFLITO, "conflito": conflito}, 409
+                db.session.commit()
+
+            eventos.publicar(
+                "recorrencia.atualizada", recorrencia_id=recorrencia_id,
+                sala_id=recorrencia.sala_id, sala_anterior=sala_anterior
+            )
+            return recorrencia_codec.dump(recorrencia), 200
+
+        except ValidationError as err:
+            return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError as e:
+            db.session.rollback()
+            resposta = _integridade(e)
+            if resposta:
+                return resposta
+            log_exception("Erro de integridade ao atualizar recorrência")
+            abort(500, description="Erro ao atualizar recorrência.")
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao atualizar recorrência")
+            db.session.rollback()
+            abort(500, description="Erro ao atualizar recorrência.")
+        except Exception:
+            log_exception("Erro inesperado ao atualizar recorrência")
+            abort(500, description="Erro interno inesperado.")
+
+    @orcamento_consultas(5)
+    def delete(self, recorrencia_id):
+        logger.info(f"DELETE - Recorrência {recorrencia_id}")
+        try:
+            recorrencia = db.session.get(ReservaRecorrente, recorrencia_id)
+            if not recorrencia:
+                return {"erro": "Recorrência não encontrada"}, 404
+
+            # Ocorrências já finalizadas são reservas comuns e continuam.
+            sala_id = recorrencia.sala_id
+            db.session.delete(recorrencia)
+            db.session.commit()
+            eventos.publicar("recorrencia.removida", recorrencia_id=recorrencia_id, sala_id=sala_id)
+            return {"mensagem": "Recorrência removida com sucesso"}, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao remover Recorrência")
+            db.session.rollback()
+            abort(500, description="Erro ao remover Recorrência.")
+        except Exception:
+            log_exception("Erro inesperado ao remover Recorrência")
+            abort(500, description="Erro interno inesperado.")
+
+
+class RecorrenciaExcecoesResource(Resource):
+    @orcamento_consultas(4)
+    def post(self, recorrencia_id):
+        """Cancela a ocorrência de um dia."""
+        logger.info(f"POST - Exceção da Recorrência {recorrencia_id}")
+        dados = request.get_json()
+
+        try:
+            validado = excecao_codec.load(dados)
+            recorrencia = db.session.get(ReservaRecorrente, recorrencia_id)
+            if not recorrencia:
+                return {"erro": "Recorrência não encontrada"}, 404
+
+            regra = Regra.do_modelo(recorrencia)
+            if validado["data"] in regra.excecoes:
+                return {"erro": "Ocorrência cancelada ou já finalizada."}, 409
+            if not regra.ocorre_em(validado["data"]):
+                return {"erro": "Dados inválidos", "detalhes": {"data": ["A recorrência não ocorre nesta data."]}}, 422
+
+            sala_id = recorrencia.sala_id
+            excecao = ExcecaoRecorrencia(recorrencia_id=recorrencia_id, data=validado["data"])
+            recorrencia.excecoes.append(excecao)
+            db.session.commit()
+            eventos.publicar(
+                "recorrencia.atualizada", recorrencia_id=recorrencia_id, sala_id=sala_id, sala_anterior=sala_id
+            )
+            return excecao_codec.dump(excecao), 201
+
+        except ValidationError as err:
+            return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError:
+            # Mesmo dia cancelado ou finalizado por outra requisição.
+            db.session.rollback()
+            return {"erro": "Ocorrência cancelada ou já finalizada."}, 409
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao inserir exceção de recorrência")
+            db.session.rollback()
+            abort(500, description="Erro ao inserir exceção de recorrência no banco.")
+        except Exception:
+            log_exception("Erro inesperado ao inserir exceção de recorrência")
+            abort(500, description="Erro interno inesperado.")
+
+
+class RecorrenciaOcorrenciasResource(Resource):
+    @orcamento_consultas(2)
+    def get(self, recorrencia_id):
+        """Ocorrências que cruzam ``[de, ate)`` (padrão: os próximos 7 dias),
+        expandidas só para essa janela."""
+        logger.info(f"GET - Ocorrências da Recorrência {recorrencia_id}")
+
+        try:
+            de = request.args.get("de")
+            de = data_hora(de) if de else datetime.now().replace(microsecond=0)
+            ate = request.args.get("ate")
+            ate = data_hora(ate) if ate else de + timedelta(days=7)
+        except ValueError:
+            return {"erro": "Formato inválido, use ISO 8601 (ex: 2025-08-17T14:00:00)."}, 400
+
+        if not de < ate <= de + JANELA_MAXIMA:
+            return {"erro": f"O parâmetro ate deve ser posterior a de, com no máximo {JANELA_MAXIMA.days} dias entre eles."}, 400
+
+        try:
+            recorrencia = db.session.get(ReservaRecorrente, recorrencia_id)
+            if not recorrencia:
+                return {"erro": "Recorrência não encontrada"}, 404
+
+            return {
+                "recorrencia_id": recorrencia_id,
+                "sala_id": recorrencia.sala_id,
+                "de": de.isoformat(),
+                "ate": ate.isoformat(),
+                "ocorrencias": [
+                    {"data_hora_inicio": inicio.isoformat(), "data_hora_fim": fim.isoformat()}
+                    for inicio, fim in Regra.do_modelo(recorrencia).ocorrencias(de, ate)
+                ]
+            }, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao buscar ocorrências da Recorrência")
+            db.session.rollback()
+            abort(500, description="Erro ao buscar ocorrências da Recorrência no banco de dados.")
+        except Exception:
+            log_exception("Erro inesperado ao buscar ocorrências da Recorrência")
+            abort(500, description="Erro interno inesperado.")
@@ -0,0 +1,31 @@
+from flask import request, abort
+from flask_restful import Resource
+from sqlalchemy.exc import SQLAlchemyError
+from helpers.database import db
+from helpers.logging import logger, log_exception
+from helpers import uso
+from helpers.orcamento import orcamento_consultas
+
+
+class OcupacaoResource(Resource):
+    @orcamento_consultas(2)
+    def get(self):
+        logger.info("GET - Relatório de ocupação")
+
+        try:
+            de, ate = uso.intervalo(request.args)
+        except ValueError:
+            return {"erro": "Parâmetros inválidos: de/ate no formato AAAA-MM-DD, com ate posterior a de."}, 400
+
+        try:
+            salas = uso.ocupacao(de, ate)
+            logger.info("Relatório de ocupação gerado com sucesso")
+            return {"de": de.isoformat(), "ate": ate.isoformat(), "salas": salas}, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao gerar relatório de ocupação")
+            db.session.rollback()
+            abort(500, description="Erro ao gerar relatório de ocupação no banco de dados.")
+        except Exception:
+            log_exception("Erro inesperado ao gerar relatório de ocupação")
+            abort(500, description="Erro interno inesperado.")
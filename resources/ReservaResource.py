@@ -1,30 +1,173 @@
 from flask import request, abort
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 from marshmallow import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from helpers.database import db
 from helpers.logging import logger, log_exception
-from models.Reserva import Reserva, ReservaSchema, reserva_fields
-from datetime import datetime
+from helpers.paginacao import PaginacaoInvalida, modo_cursor, pagina_por_cursor
+from helpers.disponibilidade import disponibilidade, Intervalos
+from helpers.cache import sala_por_id, responsavel_por_id
+from helpers import uso
+from helpers.quadro import quadro
+from helpers.eventos import eventos
+from helpers.travas import travar_salas
+from helpers.datas import data_hora
+from helpers.orcamento import orcamento_consultas, itens_do_corpo
+from helpers.recorrencia import (
+    JANELA_MAXIMA, conflito_com_regras, regras_por_sala, regras_vigentes, ocorrencias_na_janela
+)
+from models.Reserva import (
+    Reserva, reserva_codec,
+    RESERVA_CONFLITO, RESERVA_PERIODO_VALIDO, RESERVA_SALA_FK, RESERVA_RESPONSAVEL_FK
+)
 from models.Responsavel import Responsavel
 from models.Sala import Sala
+from models.Finalizar import Finalizar
+from collections import defaultdict
+from datetime import datetime
+
+MODOS_LOTE = ("atomico", "parcial")
+LOTE_MAXIMO = 10000
+# Orçamento de consultas do lote: parte fixa (checagens, trava e o
+# recálculo do uso, que não cresce com o lote) mais o INSERT de cada
+# reserva; o Postgres agrupa os INSERTs, o SQLite manda um por linha (ver
+# helpers.orcamento).
+CONSULTAS_LOTE = 14
+CONSULTAS_POR_RESERVA_LOTE = 1
+VERDADEIROS = ("1", "true", "sim")
+FALSOS = ("0", "false", "nao", "não")
+CAMPOS_PERIODO = {"sala_id", "data_hora_inicio", "data_hora_fim"}
+
+
+def filtrar_reservas(query, args):
+    """Aplica os filtros ``sala_id``, ``responsavel_id``, ``de``, ``ate`` e
+    ``ativas`` da query string.
+
+    ``de``/``ate`` limitam ``data_hora_inicio``, como no historico.
+    ``ativas=true`` deixa só as reservas em andamento agora e ainda não
+    finalizadas. Cada filtro tem um índice na migração a5c27e8d1f40. Lança
+    ``ValueError`` se algum parâmetro for inválido.
+    """
+    if args.get("sala_id"):
+        query = query.where(Reserva.sala_id == int(args["sala_id"]))
+    if args.get("responsavel_id"):
+        query = query.where(Reserva.responsavel_id == int(args["responsavel_id"]))
+    if args.get("de"):
+        query = query.where(Reserva.data_hora_inicio >= data_hora(args["de"]))
+    if args.get("ate"):
+        query = query.where(Reserva.data_hora_inicio < data_hora(args["ate"]))
+
+    ativas = args.get("ativas", "").lower()
+    if ativas and ativas not in VERDADEIROS + FALSOS:
+        raise ValueError("ativas")
+    if ativas in VERDADEIROS:
+        agora = datetime.now()
+        query = query.where(
+            Reserva.data_hora_inicio <= agora,
+            Reserva.data_hora_fim > agora,
+            ~db.exists().where(Finalizar.reserva_id == Reserva.reserva_id)
+        )
+    return query
+
+
+def conflita(sala_id, inicio, fim, ignorar=None):
+    """Há reserva da sala, ou ocorrência de recorrência, cruzando ``[inicio,
+    fim)``, fora ``ignorar``? Só é confiável dentro de ``travar_salas``; no
+    Postgres a restrição de exclusão continua como garantia final para as
+    reservas (as recorrências dependem só da trava)."""
+    consulta = db.select(Reserva.reserva_id).where(
+        Reserva.sala_id == sala_id, Reserva.data_hora_inicio < fim, Reserva.data_hora_fim > inicio
+    )
+    if ignorar is not None:
+        consulta = consulta.where(Reserva.reserva_id != ignorar)
+    if db.session.execute(consulta.limit(1)).first() is not None:
+        return True
+    return conflito_com_regras(sala_id, inicio, fim) is not None
+
+
+def listar_com_recorrentes(args):
+    """Reservas que começam em ``[de, ate)`` junto com as ocorrências das
+    recorrências nessa janela, em ordem de início. As ocorrências são
+    expandidas só para a janela pedida, que por isso é obrigatória e limitada
+    a ``JANELA_MAXIMA``; lança ``ValueError`` se faltar ou passar disso."""
+    de, ate = data_hora(args["de"]), data_hora(args["ate"])
+    if not de < ate <= de + JANELA_MAXIMA:
+        raise ValueError("janela")
+
+    reservas = db.session.execute(
+        filtrar_reservas(db.select(Reserva), args).order_by(Reserva.data_hora_inicio)
+    ).scalars().all()
+    itens = [(reserva.data_hora_inicio, reserva_codec.dump(reserva)) for reserva in reservas]
+
+    # Ocorrências ainda não aconteceram como reserva, então nunca estão
+    # finalizadas: ``ativas`` só deixa as que estão em andamento agora.
+    ativas = args.get("ativas", "").lower() in VERDADEIROS
+    agora = datetime.now()
+    regras = regras_vigentes(
+        de.date(), ate.date(),
+        sala_ids=[int(args["sala_id"])] if args.get("sala_id") else None,
+        responsavel_id=int(args["responsavel_id"]) if args.get("responsavel_id") else None
+    )
+    for inicio, fim, regra in ocorrencias_na_janela(regras, de, ate):
+        if inicio < de or (ativas and not inicio <= agora < fim):
+            continue
+        itens.append((inicio, {
+            "reserva_id": None,
+            "recorrencia_id": regra.chave,
+            "sala_id": regra.sala_id,
+            "responsavel_id": regra.responsavel_id,
+            "data_hora_inicio": inicio.isoformat(),
+            "data_hora_fim": fim.isoformat()
+        }))
+    itens.sort(key=lambda item: item[0])
+    return [item for _, item in itens]
 
 
 class ReservasResource(Resource):
+    @orcamento_consultas(3)
     def get(self):
         logger.info("GET ALL - Listagem de Reservas")
 
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 50))
 
+        if request.args.get("recorrentes", "").lower() in VERDADEIROS:
+            try:
+                return listar_com_recorrentes(request.args), 200
+            except (KeyError, ValueError):
+                return {"erro": (
+                    f"Com recorrentes=true informe de e ate em ISO 8601, com no máximo {JANELA_MAXIMA.days} dias "
+                    "entre eles; sala_id/responsavel_id inteiros e ativas true/false."
+                )}, 400
+            except SQLAlchemyError:
+                log_exception("Erro SQLAlchemy ao buscar reservas")
+                db.session.rollback()
+                abort(500, description="Erro ao buscar reservas no banco de dados.")
+            except Exception:
+                log_exception("Erro inesperado ao buscar reservas")
+                abort(500, description="Erro interno inesperado.")
+
         try:
-            query = db.select(Reserva).order_by(Reserva.reserva_id)
+            filtrada = filtrar_reservas(db.select(Reserva), request.args)
+        except ValueError:
+            return {"erro": "Parâmetros inválidos: de/ate em ISO 8601, sala_id/responsavel_id inteiros e ativas true/false."}, 400
+
+        try:
+            if modo_cursor():
+                reservas, proximo = pagina_por_cursor(filtrada, Reserva.reserva_id)
+                logger.info("Reservas retornadas com sucesso")
+                return {"dados": reserva_codec.dump_lista(reservas), "next": proximo}, 200
+
+            query = filtrada.order_by(Reserva.reserva_id)
             reservas = db.session.execute(
                 query.offset((page - 1) * per_page).limit(per_page)
             ).scalars().all()
 
             logger.info("Reservas retornadas com sucesso")
-            return marshal(reservas, reserva_fields), 200
+            return reserva_codec.dump_lista(reservas), 200
+
+        except PaginacaoInvalida as err:
+            return {"erro": str(err)}, 400
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar reservas")
@@ -36,46 +179,57 @@ class ReservasResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(18)
     def post(self):
         logger.info("POST - Nova reserva")
-        schema = ReservaSchema()
         dados = request.get_json()
-        
-        sala_id = dados.get("sala_id")
-        responsavel_id = dados.get("responsavel_id")
-        data_hora_inicio = dados.get("data_hora_inicio")
-        data_hora_fim = dados.get("data_hora_fim")
 
         try:
-            
-            data_hora_inicio = datetime.fromisoformat(data_hora_inicio)
-            data_hora_fim = datetime.fromisoformat(data_hora_fim)
-            
-            sala = db.session.get(Sala, sala_id)
-            if not sala:
+            validado = reserva_codec.load(dados)
+
+            if not sala_por_id(validado["sala_id"]):
                 return {"erro": "Sala não encontrada"}, 404
-            
-            responsavel = db.session.get(Responsavel, responsavel_id)
+
+            responsavel = responsavel_por_id(validado["responsavel_id"])
             if not responsavel:
                 return {"erro": "Responsável não encontrado"}, 404
-            
-            reservas_conflict = db.session.query(Reserva).filter(
-                Reserva.sala_id == sala_id,
-                Reserva.data_hora_inicio < data_hora_fim,
-                Reserva.data_hora_fim > data_hora_inicio
-            ).all()
-            
-            if reservas_conflict:
-                return {"erro": "A sala não está disponível para o período solicitado."}, 409
-            
-            validado = schema.load(dados)
+
+            # Reservas de salas diferentes não disputam a trava; na mesma
+            # sala, a checagem e o INSERT acontecem uma requisição por vez.
+            # O 409 sai só daqui: o índice em memória (``disponibilidade``)
+            # pode estar até ``ttl`` segundos atrás de outro processo e
+            # recusaria um período que já foi liberado.
             nova_reserva = Reserva(**validado)
-            db.session.add(nova_reserva)
-            db.session.commit()
-            return marshal(nova_reserva, reserva_fields), 201
+            with travar_salas(nova_reserva.sala_id):
+                if conflita(nova_reserva.sala_id, nova_reserva.data_hora_inicio, nova_reserva.data_hora_fim):
+                    db.session.rollback()
+                    return {"erro": "A sala não está disponível para o período solicitado."}, 409
+                db.session.add(nova_reserva)
+                uso.recalcular([(nova_reserva.sala_id, nova_reserva.data_hora_inicio)])
+                db.session.commit()
+            disponibilidade.adicionar(nova_reserva)
+            quadro.adicionar(
+                nova_reserva.reserva_id, nova_reserva.sala_id, nova_reserva.responsavel_id,
+                nova_reserva.data_hora_inicio, nova_reserva.data_hora_fim, responsavel["responsavel_nome"]
+            )
+            eventos.publicar("reserva.criada", reserva_id=nova_reserva.reserva_id, sala_id=nova_reserva.sala_id)
+            return reserva_codec.dump(nova_reserva), 201
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError as e:
+            db.session.rollback()
+            msg = str(e.orig)
+            if RESERVA_CONFLITO in msg:
+                return {"erro": "A sala não está disponível para o período solicitado."}, 409
+            # O cache pode ter visto a sala/responsável antes de outro
+            # processo removê-los; a FK é a palavra final.
+            if RESERVA_SALA_FK in msg:
+                return {"erro": "Sala não encontrada"}, 404
+            if RESERVA_RESPONSAVEL_FK in msg:
+                return {"erro": "Responsável não encontrado"}, 404
+            log_exception("Erro de integridade ao inserir reserva")
+            abort(500, description="Erro ao inserir reserva no banco.")
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao inserir reserva")
             db.session.rollback()
@@ -86,13 +240,14 @@ class ReservasResource(Resource):
 
 
 class ReservaResource(Resource):
+    @orcamento_consultas(2)
     def get(self, reserva_id):
         logger.info(f"GET BY reserva_id - Reserva {reserva_id}")
         try:
             reserva = db.session.get(Reserva, reserva_id)
             if not reserva:
                 return {"erro": "Reserva não encontrada"}, 404
-            return marshal(reserva, reserva_fields), 200
+            return reserva_codec.dump(reserva), 200
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Reserva")
@@ -102,9 +257,9 @@ class ReservaResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(16)
     def put(self, reserva_id):
         logger.info(f"PUT - Reserva {reserva_id}")
-        schema = ReservaSchema()
         dados = request.get_json()
 
         try:
@@ -112,15 +267,40 @@ class ReservaResource(Resource):
             if not reserva:
                 return {"erro": "Reserva não encontrada"}, 404
 
-            atualizados = schema.load(dados, partial=True)
-            for campo, valor in atualizados.items():
-                setattr(reserva, campo, valor)
+            atualizados = reserva_codec.load(dados, partial=True)
+            sala_anterior, inicio_anterior = reserva.sala_id, reserva.data_hora_inicio
+            with travar_salas(sala_anterior, atualizados.get("sala_id")):
+                for campo, valor in atualizados.items():
+                    setattr(reserva, campo, valor)
 
-            db.session.commit()
-            return marshal(reserva, reserva_fields), 200
+                if CAMPOS_PERIODO & atualizados.keys() and conflita(
+                    reserva.sala_id, reserva.data_hora_inicio, reserva.data_hora_fim, ignorar=reserva.reserva_id
+                ):
+                    db.session.rollback()
+                    return {"erro": "A sala não está disponível para o período solicitado."}, 409
+
+                uso.recalcular([(sala_anterior, inicio_anterior), (reserva.sala_id, reserva.data_hora_inicio)])
+                db.session.commit()
+            disponibilidade.remover(sala_anterior, reserva.reserva_id)
+            disponibilidade.adicionar(reserva)
+            quadro.invalidar()
+            eventos.publicar(
+                "reserva.atualizada", reserva_id=reserva.reserva_id,
+                sala_id=reserva.sala_id, sala_anterior=sala_anterior
+            )
+            return reserva_codec.dump(reserva), 200
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
+        except IntegrityError as e:
+            db.session.rollback()
+            msg = str(e.orig)
+            if RESERVA_CONFLITO in msg:
+                return {"erro": "A sala não está disponível para o período solicitado."}, 409
+            if RESERVA_PERIODO_VALIDO in msg:
+                return {"erro": "Dados inválidos", "detalhes": {"data_hora_fim": ["O campo data_hora_fim deve ser posterior a data_hora_inicio."]}}, 422
+            log_exception("Erro de integridade ao atualizar reserva")
+            abort(500, description="Erro ao atualizar reserva.")
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao atualizar reserva")
             db.session.rollback()
@@ -129,6 +309,7 @@ class ReservaResource(Resource):
             log_exception("Erro inesperado ao atualizar reserva")
             abort(500, description="Erro interno inesperado.")
 
+    @orcamento_consultas(12)
     def delete(self, reserva_id):
         logger.info(f"DELETE - Reserva {reserva_id}")
         try:
@@ -136,8 +317,13 @@ class ReservaResource(Resource):
             if not reserva:
                 return {"erro": "Reserva não encontrada"}, 404
 
+            sala_id = reserva.sala_id
             db.session.delete(reserva)
+            uso.recalcular([(sala_id, reserva.data_hora_inicio)])
             db.session.commit()
+            disponibilidade.remover(sala_id, reserva_id)
+            quadro.remover([reserva_id])
+            eventos.publicar("reserva.removida", reserva_id=reserva_id, sala_id=sala_id)
             return {"mensagem": "Reserva removida com sucesso"}, 200
 
 
@@ -148,3 +334,157 @@ class ReservaResource(Resource):
         except Exception:
             log_exception("Erro inesperado ao remover Reserva")
             abort(500, description="Erro interno inesperado.")
+
+
+class ReservasLoteResource(Resource):
+    @orcamento_consultas(lambda: CONSULTAS_LOTE + CONSULTAS_POR_RESERVA_LOTE * itens_do_corpo())
+    def post(self):
+        logger.info("POST - Lote de reservas")
+        dados = request.get_json()
+
+        modo = request.args.get("modo", "atomico")
+        if modo not in MODOS_LOTE:
+            return {"erro": f"Modo inválido, use um de: {', '.join(MODOS_LOTE)}."}, 400
+        if not isinstance(dados, list) or not dados:
+            return {"erro": "Dados inválidos", "detalhes": "Envie uma lista não vazia de reservas."}, 422
+        if len(dados) > LOTE_MAXIMO:
+            return {"erro": "Dados inválidos", "detalhes": f"O lote aceita no máximo {LOTE_MAXIMO} reservas."}, 422
+
+        try:
+            try:
+                validados = reserva_codec.load_lista(dados)
+                erros = {}
+            except ValidationError as err:
+                validados, erros = err.valid_data, err.messages
+
+            resultados = [None] * len(dados)
+            for indice, detalhes in erros.items():
+                resultados[indice] = {"indice": indice, "status": 422, "erro": "Dados inválidos", "detalhes": detalhes}
+
+            pendentes = [i for i in range(len(dados)) if resultados[i] is None]
+
+            # Existência das FKs: uma consulta IN por tabela.
+            sala_ids = {validados[i]["sala_id"] for i in pendentes}
+            responsavel_ids = {validados[i]["responsavel_id"] for i in pendentes}
+            salas = set(db.session.execute(
+                db.select(Sala.sala_id).where(Sala.sala_id.in_(sala_ids))
+            ).scalars()) if sala_ids else set()
+            responsaveis = dict(db.session.execute(
+                db.select(Responsavel.responsavel_id, Responsavel.responsavel_nome)
+                .where(Responsavel.responsavel_id.in_(responsavel_ids))
+            ).all()) if responsavel_ids else {}
+
+            for i in pendentes:
+                if validados[i]["sala_id"] not in salas:
+                    resultados[i] = {"indice": i, "status": 404, "erro": "Sala não encontrada"}
+                elif validados[i]["responsavel_id"] not in responsaveis:
+                    resultados[i] = {"indice": i, "status": 404, "erro": "Responsável não encontrado"}
+            pendentes = [i for i in pendentes if resultados[i] is None]
+
+            # Da leitura das reservas existentes até o commit as salas do lote
+            # ficam travadas, então nenhuma escrita concorrente cria conflito
+            # entre a checagem e o INSERT.
+            with travar_salas(*{validados[i]["sala_id"] for i in pendentes}):
+                # Conflitos: uma consulta para todas as salas do lote, depois uma
+                # varredura em memória que também pega conflitos dentro do lote.
+                ocupacao = defaultdict(Intervalos)
+                if pendentes:
+                    existentes = db.session.execute(
+                        db.select(Reserva.sala_id, Reserva.data_hora_inicio, Reserva.data_hora_fim, Reserva.reserva_id)
+                        .where(
+                            Reserva.sala_id.in_({validados[i]["sala_id"] for i in pendentes}),
+                            Reserva.data_hora_inicio < max(validados[i]["data_hora_fim"] for i in pendentes),
+                            Reserva.data_hora_fim > min(validados[i]["data_hora_inicio"] for i in pendentes)
+                        )
+                    ).all()
+                    for sala_id, inicio, fim, reserva_id in existentes:
+                        ocupacao[sala_id].adicionar(inicio, fim, ("reserva", reserva_id))
+                    # Recorrências: uma consulta (mais as exceções) e a
+                    # checagem aritmética por item, sem expandir ocorrências.
+                    regras = regras_por_sala(
+                        {validados[i]["sala_id"] for i in pendentes},
+                        min(validados[i]["data_hora_inicio"] for i in pendentes).date(),
+                        max(validados[i]["data_hora_fim"] for i in pendentes).date()
+                    )
+
+                aceitos = []
+                for i in pendentes:
+                    reserva = validados[i]
+                    intervalos = ocupacao[reserva["sala_id"]]
+                    conflitos = intervalos.sobrepostos(reserva["data_hora_inicio"], reserva["data_hora_fim"])
+                    recorrente = conflito_com_regras(
+                        reserva["sala_id"], reserva["data_hora_inicio"], reserva["data_hora_fim"],
+                        regras.get(reserva["sala_id"], ())
+                    )
+                    if recorrente:
+                        resultados[i] = {
+                            "indice": i,
+                            "status": 409,
+                            "erro": "A sala não está disponível para o período solicitado.",
+                            "conflito": {"recorrencia_id": recorrente[0], "data": recorrente[1].isoformat()}
+                        }
+                        continue
+                    if conflitos:
+                        origem, chave = conflitos[0][2]
+                        resultados[i] = {
+                            "indice": i,
+                            "status": 409,
+                            "erro": "A sala não está disponível para o período solicitado.",
+                            "conflito": {"reserva_id": chave} if origem == "reserva" else {"indice": chave}
+                        }
+                        continue
+                    intervalos.adicionar(reserva["data_hora_inicio"], reserva["data_hora_fim"], ("lote", i))
+                    aceitos.append(i)
+
+                rejeitados = len(dados) - len(aceitos)
+                if modo == "atomico" and rejeitados:
+                    for i in aceitos:
+                        resultados[i] = {"indice": i, "status": 424, "erro": "Lote cancelado: há itens rejeitados."}
+                    db.session.rollback()
+                    logger.warning(f"Lote de reservas rejeitado: {rejeitados} de {len(dados)} itens inválidos")
+                    return {"modo": modo, "criadas": 0, "rejeitadas": rejeitados, "resultados": resultados}, 422
+
+                if aceitos:
+                    reserva_ids = db.session.execute(
+                        db.insert(Reserva).returning(Reserva.reserva_id, sort_by_parameter_order=True),
+                        [validados[i] for i in aceitos]
+                    ).scalars().all()
+                    uso.recalcular((validados[i]["sala_id"], validados[i]["data_hora_inicio"]) for i in aceitos)
+                    db.session.commit()
+
+            if aceitos:
+                for i, reserva_id in zip(aceitos, reserva_ids):
+                    reserva = validados[i]
+                    resultados[i] = {"indice": i, "status": 201, "reserva_id": reserva_id}
+                    disponibilidade.adicionar_intervalo(
+                        reserva["sala_id"], reserva["data_hora_inicio"], reserva["data_hora_fim"], reserva_id
+                    )
+                    quadro.adicionar(
+                        reserva_id, reserva["sala_id"], reserva["responsavel_id"],
+                        reserva["data_hora_inicio"], reserva["data_hora_fim"],
+                        responsaveis[reserva["responsavel_id"]]
+                    )
+                # Um evento para o lote todo: milhares de eventos individuais
+                # estourariam a fila dos assinantes.
+                eventos.publicar(
+                    "reserva.lote", reserva_ids=reserva_ids,
+                    sala_ids=sorted({validados[i]["sala_id"] for i in aceitos})
+                )
+
+            logger.info(f"Lote de reservas: {len(aceitos)} criadas, {rejeitados} rejeitadas")
+            status = 201 if not rejeitados else 207
+            return {"modo": modo, "criadas": len(aceitos), "rejeitadas": rejeitados, "resultados": resultados}, status
+
+        except IntegrityError as e:
+            db.session.rollback()
+            if RESERVA_CONFLITO in str(e.orig):
+                return {"erro": "Conflito com reserva criada em paralelo; nenhuma reserva do lote foi criada."}, 409
+            log_exception("Erro de integridade ao inserir lote de reservas")
+            abort(500, description="Erro ao inserir lote de reservas no banco.")
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao inserir lote de reservas")
+            db.session.rollback()
+            abort(500, description="Erro ao inserir lote de reservas no banco.")
+        except Exception:
+            log_exception("Erro inesperado ao inserir lote de reservas")
+            abort(500, description="Erro interno inesperado.")
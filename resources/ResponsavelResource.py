@@ -1,23 +1,80 @@
 from flask import request, abort
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 from marshmallow import ValidationError
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
 from helpers.database import db
 from helpers.logging import logger, log_exception
-from models.Responsavel import Responsavel, ResponsavelSchema, responsavel_fields
+from helpers.condicional import cabecalhos_condicionais, incrementar_versao, resposta_304
+from helpers.cache import entidades, responsavel_por_id
+from helpers.quadro import quadro
+from helpers.eventos import eventos
+from helpers.importacao import (
+    ArquivoInvalido, TAMANHO_LOTE, formato_do_envio, corpo_do_envio, ler_csv, ler_ndjson,
+    tabela_temporaria, descartar, copiar
+)
+from helpers.orcamento import orcamento_consultas
+from models.Responsavel import Responsavel, responsavel_codec, responsavel_importacao_codec
+
+COLUNAS_IMPORTACAO = ("responsavel_nome", "responsavel_siap", "responsavel_cpf", "responsavel_data_nascimento")
+MAXIMO_ERROS_RELATORIO = 1000
+# A importação faz um número fixo de consultas mais uma cópia para a
+# staging a cada TAMANHO_LOTE linhas; uma linha de CSV válida tem pelo
+# menos isto de bytes, o que limita as cópias pelo tamanho do corpo.
+CONSULTAS_IMPORTACAO = 14
+BYTES_MINIMOS_POR_LINHA = 16
+
+
+def _orcamento_importacao():
+    return CONSULTAS_IMPORTACAO + (request.content_length or 0) // (BYTES_MINIMOS_POR_LINHA * TAMANHO_LOTE)
+
+
+def _validar_lote(lote, rejeitados):
+    """Valida os campos de um lote de ``(linha, registro)`` e devolve as
+    tuplas válidas no formato da tabela de staging."""
+    try:
+        validados = responsavel_importacao_codec.load_lista([registro for _, registro in lote])
+        erros = {}
+    except ValidationError as err:
+        validados, erros = err.valid_data, err.messages
+
+    for i, (linha, _) in enumerate(lote):
+        if i in erros:
+            rejeitados.append({"linha": linha, "erro": "Dados inválidos", "detalhes": erros[i]})
+        else:
+            yield (linha, *(validados[i][coluna] for coluna in COLUNAS_IMPORTACAO))
+
+
+def _linhas_validas(formato, texto, rejeitados):
+    ler = ler_csv if formato == "csv" else ler_ndjson
+    lote = []
+    for linha, registro in ler(texto, COLUNAS_IMPORTACAO):
+        if registro is None:
+            rejeitados.append({"linha": linha, "erro": "A linha não é um objeto JSON."})
+            continue
+        lote.append((linha, registro))
+        if len(lote) == TAMANHO_LOTE:
+            yield from _validar_lote(lote, rejeitados)
+            lote = []
+    if lote:
+        yield from _validar_lote(lote, rejeitados)
 
 
 class ResponsaveisResource(Resource):
+    @orcamento_consultas(3)
     def get(self):
         logger.info("GET ALL - Listagem de Responsaveis")
 
         try:
+            headers, nao_modificado, _ = cabecalhos_condicionais("responsavel")
+            if nao_modificado:
+                return resposta_304(headers)
+
             query = db.select(Responsavel).order_by(Responsavel.responsavel_id)
             responsaveis = db.session.execute(query).scalars().all()
 
             logger.info("Responsaveis retornadas com sucesso")
-            return marshal(responsaveis, responsavel_fields), 200
+            return responsavel_codec.dump_lista(responsaveis), 200, headers
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Responsaveis")
@@ -29,17 +86,19 @@ class ResponsaveisResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(6)
     def post(self):
         logger.info("POST - Novo Responsavel")
-        schema = ResponsavelSchema()
         dados = request.get_json()
 
         try:
-            validado = schema.load(dados)
+            validado = responsavel_codec.load(dados)
             novo_responsavel = Responsavel(**validado)
             db.session.add(novo_responsavel)
+            incrementar_versao("responsavel")
             db.session.commit()
-            return marshal(novo_responsavel, responsavel_fields), 201
+            eventos.publicar("responsavel.criado", responsavel_id=novo_responsavel.responsavel_id)
+            return responsavel_codec.dump(novo_responsavel), 201
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
@@ -61,14 +120,115 @@ class ResponsaveisResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+class ResponsaveisImportacaoResource(Resource):
+    @orcamento_consultas(_orcamento_importacao)
+    def post(self):
+        logger.info("POST - Importação de Responsaveis")
+
+        try:
+            formato = formato_do_envio(request)
+            texto = corpo_do_envio(request)
+        except ArquivoInvalido as err:
+            return {"erro": str(err)}, 400
+
+        rejeitados = []
+        try:
+            staging = tabela_temporaria(
+                "responsavel_importacao",
+                db.Column("linha", db.Integer, primary_key=True),
+                db.Column("responsavel_nome", db.String(255)),
+                db.Column("responsavel_siap", db.String(255)),
+                db.Column("responsavel_cpf", db.String(255)),
+                db.Column("responsavel_data_nascimento", db.Date),
+                db.Column("motivo", db.String(64))
+            )
+            copiar(staging, ("linha",) + COLUNAS_IMPORTACAO, _linhas_validas(formato, texto, rejeitados))
+
+            # Duplicados em três passadas: primeiro contra responsavel; depois
+            # row_number() para repetições dentro do próprio arquivo, contando
+            # só as linhas ainda válidas, para que uma primeira ocorrência já
+            # rejeitada não derrube a seguinte (a primeira válida fica).
+            cpf, siap = staging.c.responsavel_cpf, staging.c.responsavel_siap
+            db.session.execute(
+                db.update(staging).values(motivo=db.case(
+                    (db.exists().where(Responsavel.responsavel_cpf == cpf), "CPF já cadastrado."),
+                    (db.exists().where(Responsavel.responsavel_siap == siap), "SIAP já cadastrado."),
+                ))
+            )
+            for coluna, motivo in ((cpf, "CPF repetido no arquivo."), (siap, "SIAP repetido no arquivo.")):
+                ordem = db.select(
+                    staging.c.linha,
+                    db.func.row_number().over(partition_by=coluna, order_by=staging.c.linha).label("ordem")
+                ).where(staging.c.motivo.is_(None), coluna.is_not(None)).subquery()
+                db.session.execute(
+                    db.update(staging)
+                    .values(motivo=motivo)
+                    .where(staging.c.linha == ordem.c.linha, ordem.c.ordem > 1)
+                )
+
+            importadas = db.session.execute(
+                db.insert(Responsavel).from_select(
+                    list(COLUNAS_IMPORTACAO),
+                    db.select(*(staging.c[coluna] for coluna in COLUNAS_IMPORTACAO))
+                    .where(staging.c.motivo.is_(None))
+                    .order_by(staging.c.linha)
+                )
+            ).rowcount
+            rejeitados.extend(
+                {"linha": linha, "erro": motivo}
+                for linha, motivo in db.session.execute(
+                    db.select(staging.c.linha, staging.c.motivo).where(staging.c.motivo.is_not(None))
+                )
+            )
+
+            descartar(staging)
+            if importadas:
+                incrementar_versao("responsavel")
+            db.session.commit()
+            if importadas:
+                eventos.publicar("responsavel.importados", quantidade=importadas)
+
+        except ArquivoInvalido as err:
+            db.session.rollback()
+            return {"erro": str(err)}, 400
+        except UnicodeDecodeError:
+            db.session.rollback()
+            return {"erro": "O arquivo deve estar em UTF-8."}, 400
+        except IntegrityError:
+            db.session.rollback()
+            return {"erro": "Responsaveis cadastrados em paralelo conflitaram com a importação; envie de novo."}, 409
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao importar Responsaveis")
+            db.session.rollback()
+            abort(500, description="Erro ao importar Responsaveis no banco.")
+        except Exception:
+            log_exception("Erro inesperado ao importar Responsaveis")
+            db.session.rollback()
+            abort(500, description="Erro interno inesperado.")
+
+        rejeitados.sort(key=lambda rejeitado: rejeitado["linha"])
+        logger.info(f"Importação de Responsaveis: {importadas} importadas, {len(rejeitados)} rejeitadas")
+        return {
+            "importadas": importadas,
+            "rejeitadas": len(rejeitados),
+            "erros": rejeitados[:MAXIMO_ERROS_RELATORIO],
+            "erros_omitidos": max(len(rejeitados) - MAXIMO_ERROS_RELATORIO, 0)
+        }, 201 if not rejeitados else 207
+
+
 class ResponsavelResource(Resource):
+    @orcamento_consultas(3)
     def get(self, responsavel_id):
         logger.info(f"GET BY responsavel_id - Responsavel {responsavel_id}")
         try:
-            responsavel = db.session.get(Responsavel, responsavel_id)
+            headers, nao_modificado, versao = cabecalhos_condicionais("responsavel", responsavel_id)
+            if nao_modificado:
+                return resposta_304(headers)
+
+            responsavel = responsavel_por_id(responsavel_id, versao)
             if not responsavel:
                 return {"erro": "Responsavel não encontrado"}, 404
-            return marshal(responsavel, responsavel_fields), 200
+            return responsavel, 200, headers
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar responsavel")
@@ -77,9 +237,9 @@ class ResponsavelResource(Resource):
             log_exception("Erro inesperado ao buscar responsavel")
             abort(500, description="Erro interno inesperado.")
 
+    @orcamento_consultas(6)
     def put(self, responsavel_id):
         logger.info(f"PUT - Responsavel {responsavel_id}")
-        schema = ResponsavelSchema()
         dados = request.get_json()
 
         try:
@@ -87,12 +247,16 @@ class ResponsavelResource(Resource):
             if not responsavel:
                 return {"erro": "Responsavel não encontrada"}, 404
 
-            atualizados = schema.load(dados, partial=True)
+            atualizados = responsavel_codec.load(dados, partial=True)
             for campo, valor in atualizados.items():
                 setattr(responsavel, campo, valor)
 
+            incrementar_versao("responsavel")
             db.session.commit()
-            return marshal(responsavel, responsavel_fields), 200
+            entidades.invalidar("responsavel", responsavel_id)
+            quadro.invalidar()
+            eventos.publicar("responsavel.atualizado", responsavel_id=responsavel_id)
+            return responsavel_codec.dump(responsavel), 200
 
         except ValidationError as err:
             return {"erro": "Dados inválidos", "detalhes": err.messages}, 422
@@ -104,6 +268,7 @@ class ResponsavelResource(Resource):
             log_exception("Erro inesperado ao atualizar responsavel")
             abort(500, description="Erro interno inesperado.")
 
+    @orcamento_consultas(6)
     def delete(self, responsavel_id):
         logger.info(f"DELETE - responsavel {responsavel_id}")
         try:
@@ -112,7 +277,11 @@ class ResponsavelResource(Resource):
                 return {"erro": "responsavel não encontrada"}, 404
 
             db.session.delete(responsavel)
+            incrementar_versao("responsavel")
             db.session.commit()
+            entidades.invalidar("responsavel", responsavel_id)
+            quadro.invalidar()
+            eventos.publicar("responsavel.removido", responsavel_id=responsavel_id)
             return {"mensagem": "responsavel removida com sucesso"}, 200
 
         except SQLAlchemyError:
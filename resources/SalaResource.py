@@ -1,22 +1,39 @@
 from flask import request, abort
-from flask_restful import Resource, marshal
+from flask_restful import Resource
 from marshmallow import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from helpers.database import db
+from helpers.datas import data_hora
 from helpers.logging import logger, log_exception
-from models.Sala import Sala, SalaSchema, sala_fields
+from helpers.disponibilidade import disponibilidade, livres
+from helpers.condicional import cabecalhos_condicionais, incrementar_versao, resposta_304
+from helpers.cache import entidades, sala_por_id
+from helpers import uso
+from helpers.quadro import quadro
+from helpers.eventos import eventos
+from helpers.orcamento import orcamento_consultas
+from helpers.recorrencia import regras_vigentes, ocorrencias_na_janela
+from helpers import vagas
+from models.Sala import Sala, sala_codec
+from models.Reserva import Reserva
+from datetime import datetime, timedelta
 
 
 class SalasResource(Resource):
+    @orcamento_consultas(3)
     def get(self):
         logger.info("GET ALL - Listagem de Salas")
 
         try:
+            headers, nao_modificado, _ = cabecalhos_condicionais("sala")
+            if nao_modificado:
+                return resposta_304(headers)
+
             query = db.select(Sala).order_by(Sala.sala_id)
             salas = db.session.execute(query).scalars().all()
 
             logger.info("Salas retornadas com sucesso")
-            return marshal(salas, sala_fields), 200
+            return sala_codec.dump_lista(salas), 200, headers
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Salas")
@@ -28,20 +45,23 @@ class SalasResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(5)
     def post(self):
         logger.info("POST - Nova Sala")
 
-        schema = SalaSchema()
         dados = request.get_json()
 
         try:
-            validado = schema.load(dados)
+            validado = sala_codec.load(dados)
             nova_sala = Sala(**validado)
             db.session.add(nova_sala)
+            incrementar_versao("sala")
             db.session.commit()
+            quadro.invalidar()
+            eventos.publicar("sala.criada", sala_id=nova_sala.sala_id)
 
             logger.info(f"Sala {nova_sala.sala_id} criada com sucesso!")
-            return marshal(nova_sala, sala_fields), 201
+            return sala_codec.dump(nova_sala), 201
 
         except ValidationError as err:
             logger.warning(f"Erro de validação: {err.messages}")
@@ -58,15 +78,20 @@ class SalasResource(Resource):
 
 
 class SalaResource(Resource):
+    @orcamento_consultas(3)
     def get(self, sala_id):
         logger.info(f"GET BY sala_id - Sala ({sala_id})")
 
         try:
-            sala = db.session.get(Sala, sala_id)
+            headers, nao_modificado, versao = cabecalhos_condicionais("sala", sala_id)
+            if nao_modificado:
+                return resposta_304(headers)
+
+            sala = sala_por_id(sala_id, versao)
             if not sala:
                 return {"erro": "Sala não encontrada."}, 404
 
-            return marshal(sala, sala_fields), 200
+            return sala, 200, headers
 
         except SQLAlchemyError:
             log_exception("Erro SQLAlchemy ao buscar Sala")
@@ -78,10 +103,10 @@ class SalaResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(6)
     def put(self, sala_id):
         logger.info(f"PUT - sala_id ({sala_id})")
 
-        schema = SalaSchema()
         dados = request.get_json()
 
         try:
@@ -89,13 +114,17 @@ class SalaResource(Resource):
             if not sala:
                 return {"erro": "Sala não encontrada."}, 404
 
-            atualizados = schema.load(dados, partial=True)
+            atualizados = sala_codec.load(dados, partial=True)
             for campo, valor in atualizados.items():
                 setattr(sala, campo, valor)
 
+            incrementar_versao("sala")
             db.session.commit()
+            entidades.invalidar("sala", sala_id)
+            quadro.invalidar()
+            eventos.publicar("sala.atualizada", sala_id=sala_id)
             logger.info(f"Sala ({sala_id}) atualizada com sucesso")
-            return marshal(sala, sala_fields), 200
+            return sala_codec.dump(sala), 200
 
         except ValidationError as err:
             logger.warning(f"Erro de validação: {err.messages}")
@@ -111,6 +140,7 @@ class SalaResource(Resource):
             abort(500, description="Erro interno inesperado.")
 
 
+    @orcamento_consultas(6)
     def delete(self, sala_id):
         logger.info(f"DELETE - Sala ({sala_id})")
 
@@ -120,7 +150,12 @@ class SalaResource(Resource):
                 return {"erro": "Sala não encontrada."}, 404
 
             db.session.delete(sala)
+            incrementar_versao("sala")
             db.session.commit()
+            entidades.invalidar("sala", sala_id)
+            disponibilidade.invalidar(sala_id)
+            quadro.invalidar()
+            eventos.publicar("sala.removida", sala_id=sala_id)
 
             logger.info(f"Sala ({sala_id}) removida com sucesso")
             return {"mensagem": "Sala removida com sucesso."}, 200
@@ -133,3 +168,166 @@ class SalaResource(Resource):
         except Exception:
             log_exception("Erro inesperado ao remover Sala")
             abort(500, description="Erro interno inesperado.")
+
+
+class SalasLivresResource(Resource):
+    @orcamento_consultas(4)
+    def get(self):
+        logger.info("GET - Salas livres")
+
+        try:
+            if not request.args.get("duracao"):
+                raise KeyError("duracao")
+            tempo = vagas.duracao(request.args["duracao"])
+            passo = vagas.duracao(request.args["passo"]) if request.args.get("passo") else vagas.PASSO_PADRAO
+            de = request.args.get("de")
+            de = data_hora(de) if de else datetime.now().replace(second=0, microsecond=0)
+            ate = request.args.get("ate")
+            ate = data_hora(ate) if ate else de + timedelta(days=1)
+            limite = int(request.args.get("limite", vagas.LIMITE_PADRAO))
+        except (KeyError, ValueError):
+            return {"erro": (
+                "Parâmetros inválidos: duracao obrigatória e passo como 2h, 90m ou 1h30m; "
+                "de/ate em ISO 8601 (ex: 2025-08-17T08:00:00); limite inteiro."
+            )}, 400
+
+        if not de + tempo <= ate <= de + vagas.JANELA_MAXIMA:
+            return {"erro": f"A janela de/ate deve caber a duração e ter no máximo {vagas.JANELA_MAXIMA.days} dias."}, 400
+        if passo < vagas.PASSO_MINIMO:
+            return {"erro": f"O passo mínimo é de {int(vagas.PASSO_MINIMO.total_seconds() // 60)} minutos."}, 400
+        if not 1 <= limite <= vagas.LIMITE_MAXIMO:
+            return {"erro": f"O limite deve estar entre 1 e {vagas.LIMITE_MAXIMO}."}, 400
+
+        try:
+            total, salas = vagas.buscar_vagas(de, ate, tempo, passo, limite)
+            return {
+                "de": de.isoformat(),
+                "ate": ate.isoformat(),
+                "duracao_minutos": int(tempo.total_seconds() // 60),
+                "passo_minutos": int(passo.total_seconds() // 60),
+                "total": total,
+                "salas": salas
+            }, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao buscar salas livres")
+            db.session.rollback()
+            abort(500, description="Erro ao buscar salas livres no banco de dados.")
+
+        except Exception:
+            log_exception("Erro inesperado ao buscar salas livres")
+            abort(500, description="Erro interno inesperado.")
+
+
+def _ocupado(inicio, fim, chave):
+    """Item de ``ocupado``: ``chave`` é o ``reserva_id`` ou, para uma
+    ocorrência de recorrência, ``("recorrencia", recorrencia_id)``."""
+    item = {"reserva_id": chave, "data_hora_inicio": inicio.isoformat(), "data_hora_fim": fim.isoformat()}
+    if isinstance(chave, tuple):
+        item["reserva_id"], item["recorrencia_id"] = None, chave[1]
+    return item
+
+
+class SalaDisponibilidadeResource(Resource):
+    @orcamento_consultas(5)
+    def get(self, sala_id):
+        logger.info(f"GET - Disponibilidade da Sala ({sala_id})")
+
+        try:
+            de = data_hora(request.args["de"]) if request.args.get("de") else None
+            ate = data_hora(request.args["ate"]) if request.args.get("ate") else None
+        except ValueError:
+            return {"erro": "Formato inválido, use ISO 8601 (ex: 2025-08-17T14:00:00)."}, 400
+
+        if de and ate and ate <= de:
+            return {"erro": "O parâmetro ate deve ser posterior a de."}, 400
+
+        try:
+            if not sala_por_id(sala_id):
+                return {"erro": "Sala não encontrada."}, 404
+
+            # Sem ``de``, o "agora" é tomado depois da carga do índice, para a
+            # janela não começar antes do horizonte e cair no banco.
+            de = de or disponibilidade.inicio_padrao(sala_id)
+            ate = ate or de + timedelta(days=1)
+            if ate <= de:
+                return {"erro": "O parâmetro ate deve ser posterior a de."}, 400
+
+            ocupados = disponibilidade.ocupados(sala_id, de, ate)
+            if ocupados is None:
+                # Janela no passado: o índice só guarda reservas futuras.
+                ocupados = db.session.execute(
+                    db.select(Reserva.data_hora_inicio, Reserva.data_hora_fim, Reserva.reserva_id)
+                    .where(
+                        Reserva.sala_id == sala_id,
+                        Reserva.data_hora_inicio < ate,
+                        Reserva.data_hora_fim > de
+                    )
+                    .order_by(Reserva.data_hora_inicio)
+                ).all()
+
+            # Ocorrências de recorrências, expandidas só para esta janela.
+            recorrentes = [
+                (inicio, fim, ("recorrencia", regra.chave))
+                for inicio, fim, regra in ocorrencias_na_janela(
+                    regras_vigentes(de.date(), ate.date(), sala_ids=[sala_id]), de, ate
+                )
+            ]
+            if recorrentes:
+                ocupados = sorted([*ocupados, *recorrentes], key=lambda ocupado: ocupado[:2])
+
+            return {
+                "sala_id": sala_id,
+                "de": de.isoformat(),
+                "ate": ate.isoformat(),
+                "ocupado": [_ocupado(inicio, fim, chave) for inicio, fim, chave in ocupados],
+                "livre": [
+                    {"data_hora_inicio": inicio.isoformat(), "data_hora_fim": fim.isoformat()}
+                    for inicio, fim in livres(ocupados, de, ate)
+                ]
+            }, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao buscar disponibilidade da Sala")
+            db.session.rollback()
+            abort(500, description="Erro ao buscar disponibilidade da Sala no banco de dados.")
+
+        except Exception:
+            log_exception("Erro inesperado ao buscar disponibilidade da Sala")
+            abort(500, description="Erro interno inesperado.")
+
+
+class SalaUsoResource(Resource):
+    @orcamento_consultas(3)
+    def get(self, sala_id):
+        logger.info(f"GET - Uso da Sala ({sala_id})")
+
+        agrupar = request.args.get("agrupar", "dia")
+        if agrupar not in uso.AGRUPAMENTOS:
+            return {"erro": f"Agrupamento inválido, use um de: {', '.join(uso.AGRUPAMENTOS)}."}, 400
+        try:
+            de, ate = uso.intervalo(request.args)
+        except ValueError:
+            return {"erro": "Parâmetros inválidos: de/ate no formato AAAA-MM-DD, com ate posterior a de."}, 400
+
+        try:
+            if not sala_por_id(sala_id):
+                return {"erro": "Sala não encontrada."}, 404
+
+            periodos, total = uso.uso_da_sala(sala_id, de, ate, agrupar)
+            return {
+                "sala_id": sala_id,
+                "de": de.isoformat(),
+                "ate": ate.isoformat(),
+                "agrupar": agrupar,
+                "periodos": periodos,
+                "total": total
+            }, 200
+
+        except SQLAlchemyError:
+            log_exception("Erro SQLAlchemy ao buscar uso da Sala")
+            db.session.rollback()
+            abort(500, description="Erro ao buscar uso da Sala no banco de dados.")
+        except Exception:
+            log_exception("Erro inesperado ao buscar uso da Sala")
+            abort(500, description="Erro interno inesperado.")
@@ -0,0 +1,73 @@
+"""Fixtures comuns: cada teste ganha um app novo (``create_app``) sobre um
+SQLite próprio em ``tmp_path``, com ``TESTING`` (o orçamento de consultas
+falha a requisição em vez de só avisar).
+
+Os testes que dependem do Postgres usam a fixture ``postgres`` e são
+pulados sem ``TEST_DATABASE_URL``.
+"""
+import os
+
+import pytest
+
+from helpers.application import create_app
+from helpers.cache import entidades
+from helpers.database import db, importar_modelos
+from helpers.disponibilidade import disponibilidade
+from helpers.quadro import quadro
+
+RESPONSAVEL = {
+    "responsavel_nome": "Fulano de Tal",
+    "responsavel_siap": "1234567",
+    "responsavel_cpf": "11122233344",
+    "responsavel_data_nascimento": "1990-01-01",
+}
+
+
+def _limpar_caches():
+    # Os caches são globais do processo e guardam ids do banco do teste anterior.
+    entidades.limpar()
+    disponibilidade.invalidar()
+    quadro.invalidar()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'keycontrol.db'}",
+        "TESTING": True,
+        "LOG_HANDLERS": "",
+    })
+    with app.app_context():
+        importar_modelos()
+        db.create_all()
+    _limpar_caches()
+    yield app
+    _limpar_caches()
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def cadastro(cliente):
+    """Duas salas e um responsável: ``{"salas": [id, id], "responsavel_id": id}``."""
+    salas = [
+        cliente.post("/salas", json={"sala_nome": f"Sala {numero}", "chave_nome": f"CH{numero:02}"}).get_json()["sala_id"]
+        for numero in (1, 2)
+    ]
+    responsavel = cliente.post("/responsaveis", json=RESPONSAVEL).get_json()
+    return {"salas": salas, "responsavel_id": responsavel["responsavel_id"]}
+
+
+@pytest.fixture(scope="session")
+def postgres():
+    """URL do Postgres de teste (``TEST_DATABASE_URL``), já migrado com
+    ``flask db upgrade``; pula o teste sem ela."""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL não definida")
+    return url
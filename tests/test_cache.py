@@ -0,0 +1,81 @@
+from helpers import cache
+from helpers.cache import EntityCache, MemoriaBackend
+from helpers.condicional import incrementar_versao
+from helpers.database import db
+from helpers.orcamento import limitar_consultas
+from models.Sala import Sala
+
+
+def _carregador():
+    lidos = []
+
+    def carregar(id):
+        lidos.append(id)
+        return {"id": id, "leitura": len(lidos)} if id > 0 else None
+    return carregar, lidos
+
+
+def test_acerto_falta_e_versao():
+    entidades = EntityCache()
+    carregar, lidos = _carregador()
+
+    assert entidades.obter("sala", 1, carregar, versao=1) == {"id": 1, "leitura": 1}
+    assert entidades.obter("sala", 1, carregar, versao=1) == {"id": 1, "leitura": 1}
+    # Sem versão, qualquer entrada serve.
+    assert entidades.obter("sala", 1, carregar) == {"id": 1, "leitura": 1}
+    # Outra versão da tabela é falta e a entrada é relida.
+    assert entidades.obter("sala", 1, carregar, versao=2) == {"id": 1, "leitura": 2}
+    assert entidades.obter("sala", 1, carregar, versao=2) == {"id": 1, "leitura": 2}
+    assert lidos == [1, 1]
+    assert entidades.estatisticas() == {"sala": {"hits": 3, "misses": 2}}
+
+
+def test_invalidar_e_inexistentes():
+    entidades = EntityCache()
+    carregar, lidos = _carregador()
+
+    entidades.obter("sala", 1, carregar, versao=1)
+    entidades.obter("responsavel", 1, carregar, versao=1)
+    entidades.invalidar("sala", 1)
+    assert entidades.obter("sala", 1, carregar, versao=1) == {"id": 1, "leitura": 3}
+    assert entidades.obter("responsavel", 1, carregar, versao=1) == {"id": 1, "leitura": 2}
+
+    # Quem não existe não fica guardado: a próxima busca vai ao banco de novo.
+    assert entidades.obter("sala", -1, carregar) is None
+    assert entidades.obter("sala", -1, carregar) is None
+    assert lidos == [1, 1, 1, -1, -1]
+
+
+def test_memoria_descarta_o_menos_usado_e_o_expirado(monkeypatch):
+    relogio = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: relogio[0])
+    backend = MemoriaBackend(max_itens=2, ttl=10)
+
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("a") == 1
+    backend.set("c", 3)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == (1, None, 3)
+
+    relogio[0] += 10.5
+    assert backend.get("a") is None
+
+
+def test_get_de_sala_usa_o_cache_ate_a_tabela_mudar(app, cliente, cadastro):
+    sala = cadastro["salas"][0]
+    assert cliente.get(f"/salas/{sala}").status_code == 200
+    antes = cliente.get("/cache").get_json()["sala"]
+    with app.app_context(), limitar_consultas() as registro:
+        assert cliente.get(f"/salas/{sala}").get_json()["sala_nome"] == "Sala 1"
+    depois = cliente.get("/cache").get_json()["sala"]
+    assert depois["hits"] == antes["hits"] + 1 and depois["misses"] == antes["misses"]
+    assert not any("FROM sala" in sql for sql in registro.consultas)
+
+    # Escrita de outro processo: o cache deste não é invalidado, mas a versão
+    # da tabela muda e a entrada antiga deixa de valer.
+    with app.app_context():
+        db.session.execute(db.update(Sala).where(Sala.sala_id == sala).values(sala_nome="Sala renomeada"))
+        incrementar_versao("sala")
+        db.session.commit()
+    assert cliente.get(f"/salas/{sala}").get_json()["sala_nome"] == "Sala renomeada"
+    assert cliente.get("/cache").get_json()["sala"]["misses"] == depois["misses"] + 1
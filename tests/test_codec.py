@@ -0,0 +1,107 @@
+from datetime import date, datetime, time
+
+import pytest
+from flask_restful import fields as flaskFields
+from marshmallow import Schema, ValidationError
+
+from helpers.codec import Codec, DateFormat
+from models.Reserva import Reserva, reserva_codec
+from models.ReservaRecorrente import ExcecaoRecorrencia, ReservaRecorrente, recorrencia_codec
+from models.Responsavel import Responsavel, responsavel_codec
+
+RESERVA = {
+    "sala_id": 3, "responsavel_id": 5,
+    "data_hora_inicio": "2100-01-04T10:00:00", "data_hora_fim": "2100-01-04T11:30:00",
+}
+
+
+def test_reserva_ida_e_volta():
+    validado = reserva_codec.load(RESERVA)
+    assert validado["data_hora_inicio"] == datetime(2100, 1, 4, 10)
+
+    saida = reserva_codec.dump(Reserva(reserva_id=7, **validado))
+    assert saida == {"reserva_id": 7, **RESERVA}
+    assert reserva_codec.load({k: v for k, v in saida.items() if k != "reserva_id"}) == validado
+
+
+def test_responsavel_ida_e_volta_com_data_e_nulos(app):
+    # O schema confere CPF/SIAP no banco.
+    entrada = {
+        "responsavel_nome": "Fulano de Tal", "responsavel_siap": "1234567",
+        "responsavel_cpf": "11122233344", "responsavel_data_nascimento": "1990-01-31",
+    }
+    with app.app_context():
+        validado = responsavel_codec.load(entrada)
+    assert validado["responsavel_data_nascimento"] == date(1990, 1, 31)
+    assert responsavel_codec.dump(Responsavel(responsavel_id=1, **validado)) == {"responsavel_id": 1, **entrada}
+
+    saida = responsavel_codec.dump(Responsavel(responsavel_id=2, responsavel_nome="Sem dados"))
+    assert saida == {
+        "responsavel_id": 2, "responsavel_nome": "Sem dados", "responsavel_siap": None,
+        "responsavel_cpf": None, "responsavel_data_nascimento": None,
+    }
+
+
+def test_recorrencia_ida_e_volta_pelos_campos_proprios():
+    entrada = {
+        "sala_id": 1, "responsavel_id": 2, "dias_semana": [4, 0, 2, 0], "intervalo_semanas": 2,
+        "hora_inicio": "14:00:00", "hora_fim": "15:30:00", "data_inicio": "2100-01-04", "data_fim": "2100-03-01",
+    }
+    validado = recorrencia_codec.load(entrada)
+    assert validado["dias_semana"] == 0b10101
+    assert validado["hora_inicio"] == time(14)
+
+    regra = ReservaRecorrente(
+        recorrencia_id=9, **{k: v for k, v in validado.items() if k != "excecoes"},
+        excecoes=[ExcecaoRecorrencia(data=date(2100, 2, 1)), ExcecaoRecorrencia(data=date(2100, 1, 18))]
+    )
+    saida = recorrencia_codec.dump(regra)
+    assert saida == {
+        **entrada, "recorrencia_id": 9, "dias_semana": [0, 2, 4], "excecoes": ["2100-01-18", "2100-02-01"]
+    }
+    assert recorrencia_codec.load({k: v for k, v in saida.items() if k != "recorrencia_id"})["dias_semana"] == 0b10101
+
+
+def test_load_parcial_so_valida_o_que_veio():
+    assert reserva_codec.load({"sala_id": 4}, partial=True) == {"sala_id": 4}
+    with pytest.raises(ValidationError) as erro:
+        reserva_codec.load({"sala_id": 4})
+    assert set(erro.value.messages) == {"responsavel_id", "data_hora_inicio", "data_hora_fim"}
+
+
+def test_load_lista_erros_por_indice_e_validos_alinhados():
+    itens = [
+        RESERVA,
+        {**RESERVA, "sala_id": "x", "data_hora_fim": "2100-01-04T09:00:00"},
+        {**RESERVA, "data_hora_inicio": "amanhã"},
+        {**RESERVA, "data_hora_inicio": "2100-01-04T12:00:00+00:00", "data_hora_fim": "2100-01-04T13:00:00+00:00"},
+    ]
+    with pytest.raises(ValidationError) as erro:
+        reserva_codec.load_lista(itens)
+
+    assert erro.value.messages == {
+        1: {
+            "sala_id": ["Not a valid integer."],
+            "data_hora_fim": ["O campo data_hora_fim deve ser posterior a data_hora_inicio."],
+        },
+        2: {"data_hora_inicio": ["Formato inválido, use ISO 8601 (ex: 2025-08-17T14:00:00)."]},
+    }
+    # ``valid_data`` segue os índices da entrada: os lotes usam o índice do
+    # erro para achar o item e o dos válidos para inseri-los.
+    validos = erro.value.valid_data
+    assert len(validos) == len(itens)
+    assert validos[0] == reserva_codec.load(RESERVA)
+    assert validos[3]["data_hora_inicio"].tzinfo is None
+    assert reserva_codec.load_lista([RESERVA, RESERVA]) == [validos[0], validos[0]]
+
+
+def test_campo_nao_reconhecido_usa_o_output_do_campo():
+    class Objeto:
+        inteiro, texto, quando, ligado = 1, "a", datetime(2100, 1, 4, 10), 1
+
+    codec = Codec(Schema, {
+        "inteiro": flaskFields.Integer, "texto": flaskFields.String(),
+        "quando": DateFormat, "ligado": flaskFields.Boolean,
+    })
+    assert codec.dump(Objeto()) == {"inteiro": 1, "texto": "a", "quando": "2100-01-04T10:00:00", "ligado": True}
+    assert codec.dump_lista([Objeto(), Objeto()]) == [codec.dump(Objeto())] * 2
@@ -0,0 +1,65 @@
+import random
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import aliased
+
+from helpers.database import db
+from models.Reserva import Reserva
+
+# Grupos de pedidos que se cruzam dois a dois (deslocados de 15 min, com 1 h
+# de duração); grupos seguidos ficam a 2 h e nunca se cruzam.
+CONCORRENTES = 4
+GRUPOS_POR_SALA = 6
+THREADS = 8
+BASE = datetime(2100, 3, 1, 8)
+
+
+def _sobrepostas(sala_ids):
+    outra = aliased(Reserva)
+    return db.session.execute(
+        db.select(Reserva.reserva_id, outra.reserva_id)
+        .join(outra, db.and_(
+            outra.sala_id == Reserva.sala_id,
+            outra.reserva_id > Reserva.reserva_id,
+            outra.data_hora_inicio < Reserva.data_hora_fim,
+            outra.data_hora_fim > Reserva.data_hora_inicio,
+        ))
+        .where(Reserva.sala_id.in_(sala_ids))
+    ).all()
+
+
+def test_post_reservas_em_paralelo_sem_sobreposicao(app, cadastro):
+    pedidos = []
+    for sala_id in cadastro["salas"]:
+        for grupo in range(GRUPOS_POR_SALA):
+            for ordem in range(CONCORRENTES):
+                inicio = BASE + timedelta(hours=2 * grupo, minutes=15 * ordem)
+                pedidos.append(((sala_id, grupo), {
+                    "sala_id": sala_id, "responsavel_id": cadastro["responsavel_id"],
+                    "data_hora_inicio": inicio.isoformat(),
+                    "data_hora_fim": (inicio + timedelta(hours=1)).isoformat(),
+                }))
+    random.Random(42).shuffle(pedidos)
+
+    local = threading.local()
+
+    def enviar(pedido):
+        grupo, corpo = pedido
+        if not hasattr(local, "cliente"):
+            local.cliente = app.test_client()
+        return grupo, local.cliente.post("/reservas", json=corpo).status_code
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        respostas = list(executor.map(enviar, pedidos))
+
+    assert Counter(status for _, status in respostas) == {
+        201: len(cadastro["salas"]) * GRUPOS_POR_SALA,
+        409: len(pedidos) - len(cadastro["salas"]) * GRUPOS_POR_SALA,
+    }
+    vencedores = Counter(grupo for grupo, status in respostas if status == 201)
+    assert set(vencedores.values()) == {1}
+    with app.app_context():
+        assert _sobrepostas(cadastro["salas"]) == []
@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize("rota", ["/salas", "/responsaveis"])
+def test_if_none_match_estrela_em_item_inexistente_e_404(cliente, cadastro, rota):
+    assert cliente.get(f"{rota}/999", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_if_none_match_estrela_em_item_existente_responde_o_item(cliente, cadastro):
+    sala = cadastro["salas"][0]
+    resposta = cliente.get(f"/salas/{sala}", headers={"If-None-Match": "*"})
+    assert resposta.status_code == 200
+    assert resposta.get_json()["sala_id"] == sala
+
+    etag = resposta.headers["ETag"]
+    assert cliente.get(f"/salas/{sala}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_none_match_estrela_na_listagem_e_304(cliente, cadastro):
+    assert cliente.get("/salas", headers={"If-None-Match": "*"}).status_code == 304
@@ -0,0 +1,174 @@
+"""Orçamento de consultas (``helpers.orcamento``) de cada rota de ``ROTAS``.
+
+Com ``TESTING`` o orçamento está no modo ``falhar``: uma requisição que
+passe do declarado lança ``OrcamentoExcedido`` com as consultas agrupadas,
+e o teste quebra com esse relatório. Cada rota tem ao menos um caso, e as
+que têm caminhos mais caros (troca de sala, ocorrência de recorrência,
+lotes) têm um caso para o pior deles.
+"""
+import gzip
+
+import pytest
+
+from helpers.rotas import ROTAS, carregar
+from tests.conftest import RESPONSAVEL
+
+SEGUNDA = "2100-01-04"  # uma segunda-feira
+
+
+def _reservar(cliente, sala, responsavel, inicio, fim):
+    resposta = cliente.post("/reservas", json={
+        "sala_id": sala, "responsavel_id": responsavel, "data_hora_inicio": inicio, "data_hora_fim": fim,
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["reserva_id"]
+
+
+@pytest.fixture
+def dados(cliente, cadastro):
+    s1, s2 = cadastro["salas"]
+    r1 = cadastro["responsavel_id"]
+    dados = {"s1": s1, "s2": s2, "r1": r1}
+    dados["s3"] = cliente.post("/salas", json={"sala_nome": "Sala livre", "chave_nome": "CH03"}).get_json()["sala_id"]
+    dados["r2"] = cliente.post("/responsaveis", json={
+        **RESPONSAVEL, "responsavel_siap": "7654321", "responsavel_cpf": "99988877766"
+    }).get_json()["responsavel_id"]
+
+    passada = _reservar(cliente, s1, r1, "2026-01-05T10:00:00", "2026-01-05T11:00:00")
+    dados["f1"] = cliente.post("/finalizacoes", json={
+        "reserva_id": passada, "data_hora_finalizacao": "2026-01-05T11:10:00"
+    }).get_json()["finalizacao_id"]
+    dados["h1"] = cliente.get("/historicos").get_json()[0]["historico_id"]
+
+    dados["aberta"] = _reservar(cliente, s1, r1, f"{SEGUNDA}T10:00:00", f"{SEGUNDA}T11:00:00")
+    dados["lote"] = [
+        _reservar(cliente, sala, r1, "2100-01-05T10:00:00", "2100-01-05T11:00:00") for sala in (s1, s2)
+    ]
+    dados["rec"] = cliente.post("/recorrencias", json={
+        "sala_id": s2, "responsavel_id": r1, "dias_semana": [0], "intervalo_semanas": 1,
+        "hora_inicio": "14:00:00", "hora_fim": "15:00:00", "data_inicio": SEGUNDA, "data_fim": "2100-03-01",
+    }).get_json()["recorrencia_id"]
+    return dados
+
+
+def _caso(metodo, rota, nome, montar):
+    return pytest.param(metodo, rota, montar, id=f"{metodo} {rota} {nome}".strip())
+
+
+CASOS = [
+    _caso("GET", "/", "", lambda d: ("/",)),
+    _caso("GET", "/pronto", "", lambda d: ("/pronto",)),
+    _caso("GET", "/salas", "", lambda d: ("/salas",)),
+    _caso("POST", "/salas", "", lambda d: ("/salas", {"sala_nome": "Nova", "chave_nome": "CH09"})),
+    _caso("GET", "/salas/livres", "com recorrência", lambda d: (
+        f"/salas/livres?de={SEGUNDA}T08:00:00&ate={SEGUNDA}T18:00:00&duracao=2h",)),
+    _caso("GET", "/salas/<int:sala_id>", "", lambda d: (f"/salas/{d['s1']}",)),
+    _caso("PUT", "/salas/<int:sala_id>", "", lambda d: (f"/salas/{d['s1']}", {"sala_nome": "Renomeada"})),
+    _caso("DELETE", "/salas/<int:sala_id>", "", lambda d: (f"/salas/{d['s3']}",)),
+    _caso("GET", "/salas/<int:sala_id>/disponibilidade", "com recorrência", lambda d: (
+        f"/salas/{d['s2']}/disponibilidade?de={SEGUNDA}T00:00:00&ate=2100-01-11T00:00:00",)),
+    _caso("GET", "/salas/<int:sala_id>/uso", "", lambda d: (f"/salas/{d['s1']}/uso?de=2026-01-01&ate=2026-02-01",)),
+
+    _caso("GET", "/reservas", "", lambda d: ("/reservas",)),
+    _caso("GET", "/reservas", "com recorrentes", lambda d: (
+        f"/reservas?recorrentes=true&de={SEGUNDA}T00:00:00&ate=2100-02-01T00:00:00",)),
+    _caso("POST", "/reservas", "", lambda d: ("/reservas", {
+        "sala_id": d["s2"], "responsavel_id": d["r1"],
+        "data_hora_inicio": f"{SEGUNDA}T08:00:00", "data_hora_fim": f"{SEGUNDA}T09:00:00"})),
+    _caso("POST", "/reservas", "conflito com recorrência", lambda d: ("/reservas", {
+        "sala_id": d["s2"], "responsavel_id": d["r1"],
+        "data_hora_inicio": f"{SEGUNDA}T14:30:00", "data_hora_fim": f"{SEGUNDA}T15:30:00"}, 409)),
+    _caso("GET", "/reservas/<int:reserva_id>", "", lambda d: (f"/reservas/{d['aberta']}",)),
+    _caso("PUT", "/reservas/<int:reserva_id>", "mesma sala", lambda d: (f"/reservas/{d['aberta']}", {
+        "data_hora_inicio": f"{SEGUNDA}T12:00:00", "data_hora_fim": f"{SEGUNDA}T13:00:00"})),
+    _caso("PUT", "/reservas/<int:reserva_id>", "troca de sala e dia", lambda d: (f"/reservas/{d['aberta']}", {
+        "sala_id": d["s2"], "data_hora_inicio": "2100-01-06T12:00:00", "data_hora_fim": "2100-01-06T13:00:00"})),
+    _caso("DELETE", "/reservas/<int:reserva_id>", "", lambda d: (f"/reservas/{d['aberta']}",)),
+    _caso("POST", "/reservas/lote", "três salas", lambda d: ("/reservas/lote", [
+        {"sala_id": sala, "responsavel_id": d["r1"],
+         "data_hora_inicio": "2100-01-07T08:00:00", "data_hora_fim": "2100-01-07T09:00:00"}
+        for sala in (d["s1"], d["s2"], d["s3"])])),
+
+    _caso("GET", "/recorrencias", "", lambda d: ("/recorrencias",)),
+    _caso("POST", "/recorrencias", "", lambda d: ("/recorrencias", {
+        "sala_id": d["s1"], "responsavel_id": d["r1"], "dias_semana": [1, 3], "intervalo_semanas": 2,
+        "hora_inicio": "16:00:00", "hora_fim": "17:00:00", "data_inicio": SEGUNDA, "data_fim": "2100-06-01",
+        "excecoes": ["2100-01-05"]})),
+    _caso("GET", "/recorrencias/<int:recorrencia_id>", "", lambda d: (f"/recorrencias/{d['rec']}",)),
+    _caso("PUT", "/recorrencias/<int:recorrencia_id>", "troca de sala", lambda d: (f"/recorrencias/{d['rec']}", {
+        "sala_id": d["s1"], "data_inicio": "2100-01-11"})),
+    _caso("DELETE", "/recorrencias/<int:recorrencia_id>", "", lambda d: (f"/recorrencias/{d['rec']}",)),
+    _caso("POST", "/recorrencias/<int:recorrencia_id>/excecoes", "", lambda d: (
+        f"/recorrencias/{d['rec']}/excecoes", {"data": "2100-01-11"})),
+    _caso("GET", "/recorrencias/<int:recorrencia_id>/ocorrencias", "", lambda d: (
+        f"/recorrencias/{d['rec']}/ocorrencias?de={SEGUNDA}T00:00:00&ate=2100-02-01T00:00:00",)),
+
+    _caso("GET", "/responsaveis", "", lambda d: ("/responsaveis",)),
+    _caso("POST", "/responsaveis", "", lambda d: ("/responsaveis", {
+        **RESPONSAVEL, "responsavel_siap": "5555555", "responsavel_cpf": "55555555555"})),
+    _caso("GET", "/responsaveis/<int:responsavel_id>", "", lambda d: (f"/responsaveis/{d['r1']}",)),
+    _caso("PUT", "/responsaveis/<int:responsavel_id>", "", lambda d: (
+        f"/responsaveis/{d['r2']}", {"responsavel_nome": "Ciclano"})),
+    _caso("DELETE", "/responsaveis/<int:responsavel_id>", "", lambda d: (f"/responsaveis/{d['r2']}",)),
+    _caso("POST", "/responsaveis/importar", "csv", lambda d: ("/responsaveis/importar", (
+        "responsavel_nome,responsavel_siap,responsavel_cpf,responsavel_data_nascimento\n"
+        "Beltrano,1111111,22233344455,1980-02-03\n"
+        "Fulano de Tal,1234567,11122233344,1990-01-01\n"
+    ), 207)),
+
+    _caso("GET", "/finalizacoes", "", lambda d: ("/finalizacoes",)),
+    _caso("POST", "/finalizacoes", "reserva", lambda d: ("/finalizacoes", {
+        "reserva_id": d["aberta"], "data_hora_finalizacao": f"{SEGUNDA}T11:20:00"})),
+    _caso("POST", "/finalizacoes", "ocorrência de recorrência", lambda d: ("/finalizacoes", {
+        "recorrencia_id": d["rec"], "data_ocorrencia": "2100-01-11",
+        "data_hora_finalizacao": "2100-01-11T15:05:00"})),
+    _caso("GET", "/finalizacoes/<int:finalizar_id>", "", lambda d: (f"/finalizacoes/{d['f1']}",)),
+    _caso("PUT", "/finalizacoes/<int:finalizar_id>", "", lambda d: (
+        f"/finalizacoes/{d['f1']}", {"data_hora_finalizacao": "2026-01-05T11:30:00"})),
+    _caso("DELETE", "/finalizacoes/<int:finalizar_id>", "", lambda d: (f"/finalizacoes/{d['f1']}",)),
+    _caso("POST", "/finalizacoes/lote", "duas salas", lambda d: ("/finalizacoes/lote", [
+        {"reserva_id": reserva, "data_hora_finalizacao": "2100-01-05T11:05:00"} for reserva in d["lote"]])),
+
+    _caso("GET", "/historicos", "", lambda d: ("/historicos",)),
+    _caso("POST", "/historicos", "", lambda d: ("/historicos", {
+        "reserva_id": d["lote"][0], "sala_id": d["s1"], "responsavel_id": d["r1"],
+        "data_hora_inicio": "2100-01-05T10:00:00", "data_hora_fim": "2100-01-05T11:00:00"})),
+    _caso("GET", "/historicos/<int:historico_id>", "", lambda d: (f"/historicos/{d['h1']}",)),
+    _caso("PUT", "/historicos/<int:historico_id>", "troca de sala e dia", lambda d: (f"/historicos/{d['h1']}", {
+        "sala_id": d["s2"], "data_hora_inicio": "2026-01-06T10:00:00", "data_hora_fim": "2026-01-06T11:00:00"})),
+    _caso("DELETE", "/historicos/<int:historico_id>", "", lambda d: (f"/historicos/{d['h1']}",)),
+    _caso("GET", "/historicos/export", "csv gzip", lambda d: ("/historicos/export?formato=csv",)),
+
+    _caso("GET", "/chaves/status", "", lambda d: ("/chaves/status",)),
+    _caso("GET", "/eventos", "", lambda d: ("/eventos",)),
+    _caso("GET", "/relatorios/ocupacao", "", lambda d: ("/relatorios/ocupacao?de=2026-01-01&ate=2026-03-01",)),
+    _caso("GET", "/cache", "", lambda d: ("/cache",)),
+    _caso("GET", "/metrics", "", lambda d: ("/metrics",)),
+]
+
+
+def test_toda_rota_tem_caso_e_orcamento():
+    cobertas = {(caso.values[0], caso.values[1]) for caso in CASOS}
+    for modulo, classe, metodos, rota in ROTAS:
+        recurso = carregar(modulo, classe)
+        for metodo in metodos:
+            assert (metodo, rota) in cobertas, f"{metodo} {rota} sem caso em CASOS"
+            assert hasattr(getattr(recurso, metodo.lower()), "orcamento_consultas"), f"{metodo} {rota} sem orçamento"
+
+
+@pytest.mark.parametrize("metodo, rota, montar", CASOS)
+def test_orcamento_de_consultas(cliente, dados, metodo, rota, montar):
+    caminho, corpo, status, *_ = (*montar(dados), None, None)
+    if isinstance(corpo, str):
+        resposta = cliente.open(caminho, method=metodo, data=corpo, content_type="text/csv")
+    else:
+        resposta = cliente.open(caminho, method=metodo, json=corpo, headers={"Accept-Encoding": "gzip"})
+    try:
+        if status is None:
+            assert resposta.status_code < 400, resposta.get_data(as_text=True)
+        else:
+            assert resposta.status_code == status, resposta.get_data(as_text=True)
+        if resposta.headers.get("Content-Encoding") == "gzip":
+            gzip.decompress(resposta.get_data())
+    finally:
+        resposta.close()
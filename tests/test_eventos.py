@@ -0,0 +1,24 @@
+from helpers.eventos import BarramentoEventos, eventos
+from helpers.servidor import apos_fork
+
+
+def test_replay_so_vale_na_mesma_instancia():
+    primeiro, segundo = BarramentoEventos(), BarramentoEventos()
+    assert primeiro.instancia != segundo.instancia
+
+    primeiro.publicar("reserva.criada", reserva_id=1)
+    primeiro.publicar("reserva.criada", reserva_id=2)
+    _, replay = primeiro.assinar(f"{primeiro.instancia}-1")
+    assert [evento[0] for evento in replay] == [2]
+    # O mesmo id em outro worker não é replay: o cliente tem que sincronizar.
+    _, replay = segundo.assinar(f"{primeiro.instancia}-1")
+    assert replay is None
+
+
+def test_apos_fork_troca_a_instancia(app):
+    eventos.publicar("reserva.criada", reserva_id=1)
+    anterior = eventos.instancia
+    apos_fork(app)
+    assert eventos.instancia != anterior
+    _, replay = eventos.assinar(f"{anterior}-1")
+    assert replay is None
@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+
+from resources import FinalizarResource
+
+
+def _reservar(cliente, cadastro, sala, dia):
+    return cliente.post("/reservas", json={
+        "sala_id": sala, "responsavel_id": cadastro["responsavel_id"],
+        "data_hora_inicio": f"{dia}T10:00:00", "data_hora_fim": f"{dia}T11:00:00",
+    }).get_json()["reserva_id"]
+
+
+def test_segunda_finalizacao_da_mesma_reserva_e_409(cliente, cadastro):
+    reserva = _reservar(cliente, cadastro, cadastro["salas"][0], "2100-01-04")
+    corpo = {"reserva_id": reserva, "data_hora_finalizacao": "2100-01-04T11:00:00"}
+    assert cliente.post("/finalizacoes", json=corpo).status_code == 201
+
+    resposta = cliente.post("/finalizacoes", json=corpo)
+    assert resposta.status_code == 409
+    assert len(cliente.get("/historicos").get_json()) == 1
+
+
+def test_put_para_reserva_ja_finalizada_e_409(cliente, cadastro):
+    primeira, segunda = (_reservar(cliente, cadastro, sala, "2100-01-04") for sala in cadastro["salas"])
+    for reserva in (primeira, segunda):
+        finalizacao = cliente.post("/finalizacoes", json={
+            "reserva_id": reserva, "data_hora_finalizacao": "2100-01-04T11:00:00"
+        }).get_json()["finalizacao_id"]
+
+    assert cliente.put(f"/finalizacoes/{finalizacao}", json={"reserva_id": primeira}).status_code == 409
+
+
+def test_lote_relata_cada_reserva_ja_finalizada(cliente, cadastro):
+    sala = cadastro["salas"][0]
+    reservas = [_reservar(cliente, cadastro, sala, f"2100-01-{dia:02}") for dia in (4, 5, 6)]
+    assert cliente.post("/finalizacoes", json={
+        "reserva_id": reservas[1], "data_hora_finalizacao": "2100-01-05T11:00:00"
+    }).status_code == 201
+
+    resposta = cliente.post("/finalizacoes/lote", json=[
+        {"reserva_id": reserva, "data_hora_finalizacao": "2100-01-06T12:00:00"} for reserva in reservas
+    ])
+    assert resposta.status_code == 207
+    corpo = resposta.get_json()
+    assert (corpo["finalizadas"], corpo["rejeitadas"]) == (2, 1)
+    assert [(item["reserva_id"], item["status"]) for item in corpo["resultados"]] == [
+        (reservas[0], 201), (reservas[1], 409), (reservas[2], 201)
+    ]
+    assert len(cliente.get("/historicos").get_json()) == 3
+
+
+def test_ocorrencia_de_recorrencia_materializa_com_a_sala_travada(cliente, cadastro, monkeypatch):
+    sala = cadastro["salas"][1]
+    recorrencia = cliente.post("/recorrencias", json={
+        "sala_id": sala, "responsavel_id": cadastro["responsavel_id"], "dias_semana": [0], "intervalo_semanas": 1,
+        "hora_inicio": "14:00:00", "hora_fim": "15:00:00", "data_inicio": "2100-01-04", "data_fim": "2100-02-01",
+    }).get_json()["recorrencia_id"]
+
+    travadas = []
+    original = FinalizarResource.travar_salas
+
+    @contextmanager
+    def registrar(*sala_ids):
+        with original(*sala_ids):
+            travadas.append(sala_ids)
+            yield
+
+    monkeypatch.setattr(FinalizarResource, "travar_salas", registrar)
+    corpo = {"recorrencia_id": recorrencia, "data_ocorrencia": "2100-01-11", "data_hora_finalizacao": "2100-01-11T15:00:00"}
+    assert cliente.post("/finalizacoes", json=corpo).status_code == 201
+    assert travadas == [(sala,)]
+    assert cliente.post("/finalizacoes", json=corpo).status_code == 409
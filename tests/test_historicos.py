@@ -0,0 +1,60 @@
+import json
+import zlib
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from helpers.database import db
+from helpers.orcamento import OrcamentoExcedido
+from resources import HistoricoResource
+
+
+def _quebrado(resultado):
+    yield "parcial\n"
+    raise OperationalError("SELECT", {}, Exception("conexão perdida"))
+
+
+def _ler(resposta):
+    pedacos = []
+    with pytest.raises(OperationalError):
+        for pedaco in resposta.response:
+            pedacos.append(pedaco)
+    resposta.close()
+    return b"".join(pedaco if isinstance(pedaco, bytes) else pedaco.encode() for pedaco in pedacos)
+
+
+def test_exportacao_interrompida_termina_com_erro(cliente, monkeypatch):
+    monkeypatch.setattr(HistoricoResource, "_linhas_ndjson", _quebrado)
+    resposta = cliente.get("/historicos/export?formato=ndjson")
+    assert resposta.status_code == 200
+
+    linhas = _ler(resposta).decode().splitlines()
+    assert linhas[0] == "parcial"
+    assert json.loads(linhas[-1]) == {"erro": HistoricoResource.ERRO_EXPORTACAO}
+
+
+def test_exportacao_gzip_interrompida_fica_sem_rodape(cliente, monkeypatch):
+    monkeypatch.setattr(HistoricoResource, "_linhas_csv", _quebrado)
+    resposta = cliente.get("/historicos/export?formato=csv", headers={"Accept-Encoding": "gzip"})
+    assert resposta.headers["Content-Encoding"] == "gzip"
+
+    descompactador = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    texto = descompactador.decompress(_ler(resposta)).decode()
+    assert not descompactador.eof
+    assert texto.startswith("parcial\n") and HistoricoResource.ERRO_EXPORTACAO in texto
+
+
+def test_consultas_feitas_no_stream_contam_no_orcamento(cliente, monkeypatch):
+    def _consultando(resultado):
+        for _ in range(3):
+            db.session.execute(text("SELECT 1"))
+            yield "linha\n"
+
+    monkeypatch.setattr(HistoricoResource, "_linhas_ndjson", _consultando)
+    resposta = cliente.get("/historicos/export?formato=ndjson")
+    assert resposta.status_code == 200
+    with pytest.raises(OrcamentoExcedido, match="GET /historicos/export"):
+        for _ in resposta.response:
+            pass
+    resposta.close()
@@ -0,0 +1,41 @@
+import pytest
+
+from helpers.paginacao import encode_cursor
+
+INICIOS = ["10:00", "09:00", "10:00", "10:00", "09:00", "10:00", "11:00"]
+
+
+@pytest.fixture
+def reservas(cliente, cadastro):
+    """Uma reserva por sala, várias com o mesmo início, criadas fora da ordem
+    de ``data_hora_inicio``; ids em ordem de criação."""
+    ids = []
+    for numero, inicio in enumerate(INICIOS):
+        sala = cliente.post("/salas", json={"sala_nome": f"Sala P{numero}", "chave_nome": f"CP{numero:02}"})
+        resposta = cliente.post("/reservas", json={
+            "sala_id": sala.get_json()["sala_id"], "responsavel_id": cadastro["responsavel_id"],
+            "data_hora_inicio": f"2100-01-04T{inicio}:00", "data_hora_fim": "2100-01-04T12:00:00",
+        })
+        ids.append(resposta.get_json()["reserva_id"])
+    return ids
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3])
+def test_cursor_nao_pula_nem_repete_com_inicios_iguais(cliente, reservas, limite):
+    vistos, url = [], f"/reservas?de=2100-01-04T10:00:00&limit={limite}"
+    while url:
+        corpo = cliente.get(url).get_json()
+        assert len(corpo["dados"]) <= limite
+        vistos += [reserva["reserva_id"] for reserva in corpo["dados"]]
+        url = corpo["next"] and f"/reservas?de=2100-01-04T10:00:00&limit={limite}&after={corpo['next']}"
+
+    esperados = [id_ for id_, inicio in zip(reservas, INICIOS) if inicio >= "10:00"]
+    assert vistos == esperados
+
+
+@pytest.mark.parametrize("valor", [True, False, 1.0, "1", None, [1]])
+def test_cursor_que_nao_e_id_inteiro_e_400(cliente, reservas, valor):
+    for rota in ("/reservas", "/historicos", "/finalizacoes", "/recorrencias"):
+        resposta = cliente.get(f"{rota}?after={encode_cursor(valor)}")
+        assert resposta.status_code == 400, rota
+        assert resposta.get_json() == {"erro": "Cursor inválido."}
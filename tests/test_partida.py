@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roda num interpretador limpo: no processo do pytest os recursos já foram
+# importados por outros testes.
+FILHO = """
+import json, sys
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+# Antes do create_app, para contar também conexões abertas durante ele.
+conexoes = []
+event.listen(Pool, "connect", lambda *_: conexoes.append(1))
+
+from helpers.application import create_app
+app = create_app({"SQLALCHEMY_DATABASE_URI": sys.argv[1], "LOG_HANDLERS": ""})
+
+def estado():
+    return {
+        "recursos": sorted(nome for nome in sys.modules if nome.startswith("resources.")),
+        "conexoes": len(conexoes),
+    }
+
+antes = estado()
+status = app.test_client().get("/salas").status_code
+print(json.dumps({"antes": antes, "depois": estado(), "status": status}))
+"""
+
+
+def test_create_app_nao_importa_recursos_nem_conecta(app):
+    saida = subprocess.run(
+        [sys.executable, "-c", FILHO, app.config["SQLALCHEMY_DATABASE_URI"]],
+        cwd=RAIZ, env={**os.environ, "AQUECER": "0"}, capture_output=True, text=True, check=True
+    )
+    medida = json.loads(saida.stdout.strip().splitlines()[-1])
+
+    assert medida["antes"] == {"recursos": [], "conexoes": 0}
+    assert medida["status"] == 200
+    assert medida["depois"]["recursos"] == ["resources.SalaResource"]
+    assert medida["depois"]["conexoes"] == 1
@@ -0,0 +1,151 @@
+"""Planos de ``/reservas`` e ``/historicos`` no Postgres: cada filtro usa o
+índice da migração a5c27e8d1f40 e ``de``/``ate`` em historico só lê as
+partições do intervalo.
+
+As consultas são as dos recursos (filtro + ``ORDER BY id`` + ``LIMIT``).
+Com ``ORDER BY id LIMIT`` o otimizador prefere percorrer a chave primária e
+filtrar quando o filtro casa com boa parte da tabela, então o teste semeia
+dados e roda ``ANALYZE`` em vez de confiar nas estimativas de tabela vazia, e
+usa filtros tão seletivos quanto os das telas (uma sala, um responsável, um
+dia). Tudo roda numa transação desfeita no fim, partições inclusive.
+"""
+import pytest
+from sqlalchemy import text
+
+from helpers.application import create_app
+from helpers.database import db, importar_modelos
+from models.Reserva import Reserva
+from models.Historico import Historico
+from resources.ReservaResource import filtrar_reservas
+from resources.HistoricoResource import filtrar_historicos
+
+LIMITE = 51
+SALAS = 500
+RESPONSAVEIS = 300
+RESERVAS = 30000
+DE, ATE = "2025-03-10T00:00:00", "2025-03-11T00:00:00"
+
+SEMEAR = [
+    "SELECT historico_criar_particoes(date '2025-01-01', date '2025-08-31')",
+    "CREATE TEMP TABLE plano_salas (sala_id integer, posicao integer) ON COMMIT DROP",
+    """
+    WITH novas AS (
+        INSERT INTO sala (sala_nome, chave_nome)
+        SELECT 'Sala plano ' || n, 'CP' || n FROM generate_series(1, :salas) n
+        RETURNING sala_id
+    )
+    INSERT INTO plano_salas SELECT sala_id, row_number() OVER (ORDER BY sala_id) - 1 FROM novas
+    """,
+    "CREATE TEMP TABLE plano_responsaveis (responsavel_id integer, posicao integer) ON COMMIT DROP",
+    """
+    WITH novos AS (
+        INSERT INTO responsavel (responsavel_nome)
+        SELECT 'Responsável plano ' || n FROM generate_series(1, :responsaveis) n
+        RETURNING responsavel_id
+    )
+    INSERT INTO plano_responsaveis SELECT responsavel_id, row_number() OVER (ORDER BY responsavel_id) - 1 FROM novos
+    """,
+    # Reservas de 30 minutos a cada 10, em rodízio pelas salas: nunca se
+    # sobrepõem na mesma sala e cobrem de janeiro a julho de 2025.
+    """
+    INSERT INTO reserva (sala_id, responsavel_id, data_hora_inicio, data_hora_fim)
+    SELECT s.sala_id, r.responsavel_id,
+           timestamp '2025-01-01' + n * interval '10 minutes',
+           timestamp '2025-01-01' + n * interval '10 minutes' + interval '30 minutes'
+    FROM generate_series(0, :reservas - 1) n
+    JOIN plano_salas s ON s.posicao = n % :salas
+    JOIN plano_responsaveis r ON r.posicao = n % :responsaveis
+    """,
+    """
+    INSERT INTO finalizacao (reserva_id, data_hora_finalizacao)
+    SELECT reserva_id, data_hora_fim FROM reserva JOIN plano_salas USING (sala_id)
+    """,
+    """
+    INSERT INTO historico (reserva_id, sala_id, responsavel_id, data_hora_inicio, data_hora_fim)
+    SELECT reserva_id, sala_id, responsavel_id, data_hora_inicio, data_hora_fim
+    FROM reserva JOIN plano_salas USING (sala_id)
+    """,
+    "ANALYZE sala",
+    "ANALYZE responsavel",
+    "ANALYZE reserva",
+    "ANALYZE finalizacao",
+    "ANALYZE historico",
+]
+
+
+@pytest.fixture(scope="module")
+def conexao(postgres):
+    """Conexão com os dados semeados e ``(sala_id, responsavel_id)`` para os
+    filtros; a transação é desfeita no fim do módulo."""
+    app = create_app({"SQLALCHEMY_DATABASE_URI": postgres, "TESTING": True, "LOG_HANDLERS": ""})
+    with app.app_context():
+        importar_modelos()
+        with db.engine.connect() as conexao:
+            parametros = {"salas": SALAS, "responsaveis": RESPONSAVEIS, "reservas": RESERVAS}
+            for sql in SEMEAR:
+                conexao.execute(text(sql), parametros)
+            conexao.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            ids = conexao.execute(text(
+                "SELECT (SELECT sala_id FROM plano_salas WHERE posicao = 7),"
+                " (SELECT responsavel_id FROM plano_responsaveis WHERE posicao = 7)"
+            )).one()
+            yield conexao, ids
+            conexao.rollback()
+        db.engine.dispose()
+
+
+def _nos(plano):
+    yield plano
+    for filho in plano.get("Plans", ()):
+        yield from _nos(filho)
+
+
+def _explicar(conexao, consulta):
+    sql = str(consulta.compile(dialect=conexao.dialect, compile_kwargs={"literal_binds": True}))
+    return list(_nos(conexao.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()[0]["Plan"]))
+
+
+def _indices(conexao, indice):
+    """``indice`` e os índices que ele tem nas partições."""
+    return {indice} | set(conexao.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+        " WHERE i.inhparent = to_regclass(:indice)"
+    ), {"indice": indice}).scalars())
+
+
+CASOS = [
+    pytest.param(Reserva, lambda ids: {"sala_id": ids[0]}, "ix_reserva_sala_id_data_hora_inicio", id="reservas?sala_id"),
+    pytest.param(Reserva, lambda ids: {"sala_id": ids[0], "de": "2025-01-01T00:00:00", "ate": "2025-08-01T00:00:00"},
+                 "ix_reserva_sala_id_data_hora_inicio", id="reservas?sala_id&de&ate"),
+    pytest.param(Reserva, lambda ids: {"responsavel_id": ids[1]}, "ix_reserva_responsavel_id_data_hora_inicio",
+                 id="reservas?responsavel_id"),
+    pytest.param(Reserva, lambda ids: {"de": DE, "ate": ATE}, "ix_reserva_data_hora_inicio", id="reservas?de&ate"),
+    pytest.param(Reserva, lambda ids: {"ativas": "true"}, "ix_finalizacao_reserva_id", id="reservas?ativas"),
+    pytest.param(Historico, lambda ids: {"sala_id": ids[0]}, "ix_historico_sala_id_data_hora_inicio",
+                 id="historicos?sala_id"),
+    pytest.param(Historico, lambda ids: {"responsavel_id": ids[1]}, "ix_historico_responsavel_id_data_hora_inicio",
+                 id="historicos?responsavel_id"),
+    pytest.param(Historico, lambda ids: {"de": DE, "ate": ATE}, "ix_historico_data_hora_inicio",
+                 id="historicos?de&ate"),
+]
+
+
+@pytest.mark.parametrize("modelo, parametros, indice", CASOS)
+def test_filtro_usa_o_indice(conexao, modelo, parametros, indice):
+    conexao, ids = conexao
+    filtrar = filtrar_reservas if modelo is Reserva else filtrar_historicos
+    id_ = modelo.__mapper__.primary_key[0]
+    nos = _explicar(conexao, filtrar(db.select(modelo), parametros(ids)).order_by(id_).limit(LIMITE))
+
+    esperados = _indices(conexao, indice)
+    assert any(no.get("Index Name") in esperados for no in nos), nos
+    assert not [no for no in nos if no["Node Type"] == "Seq Scan"], nos
+
+
+def test_de_ate_em_historico_le_so_as_particoes_do_intervalo(conexao):
+    conexao, _ = conexao
+    consulta = filtrar_historicos(db.select(Historico), {"de": "2025-03-20T00:00:00", "ate": "2025-04-05T00:00:00"})
+    nos = _explicar(conexao, consulta.order_by(Historico.historico_id).limit(LIMITE))
+
+    lidas = {no["Relation Name"] for no in nos if "Relation Name" in no}
+    assert lidas == {"historico_2025_03", "historico_2025_04"}, nos
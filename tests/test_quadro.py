@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from helpers.orcamento import limitar_consultas
+from helpers.quadro import quadro
+
+
+def _reservar(cliente, cadastro, inicio, sala=0):
+    resposta = cliente.post("/reservas", json={
+        "sala_id": cadastro["salas"][sala], "responsavel_id": cadastro["responsavel_id"],
+        "data_hora_inicio": inicio.isoformat(), "data_hora_fim": (inicio + timedelta(hours=1)).isoformat(),
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["reserva_id"]
+
+
+def _chave(sala):
+    return next(chave for chave in quadro.situacao() if chave["sala_id"] == sala)
+
+
+def test_recarga_le_so_hoje_e_a_proxima_reserva(app, cliente, cadastro):
+    agora = datetime.now().replace(microsecond=0)
+    atual = _reservar(cliente, cadastro, agora - timedelta(minutes=30))
+    futuras = [_reservar(cliente, cadastro, agora + timedelta(days=dias)) for dias in (4, 2, 3)]
+
+    quadro.invalidar()
+    with app.app_context(), limitar_consultas(2):
+        estado = quadro.carregar()
+    assert set(estado.reservas) == {atual, futuras[1]}
+
+    with app.app_context():
+        chave = _chave(cadastro["salas"][0])
+    assert chave["situacao"] == "emprestada"
+    assert (chave["reserva"]["reserva_id"], chave["proxima_reserva"]["reserva_id"]) == (atual, futuras[1])
+
+
+def test_escritas_mantem_a_proxima_reserva(app, cliente, cadastro):
+    sala = cadastro["salas"][0]
+    agora = datetime.now().replace(microsecond=0)
+    depois = _reservar(cliente, cadastro, agora + timedelta(days=3))
+    with app.app_context():
+        quadro.carregar()
+
+    # Uma reserva mais cedo que a próxima conhecida toma o lugar dela; uma
+    # mais tarde não entra.
+    antes = _reservar(cliente, cadastro, agora + timedelta(days=2))
+    _reservar(cliente, cadastro, agora + timedelta(days=5))
+    with app.app_context():
+        assert _chave(sala)["proxima_reserva"]["reserva_id"] == antes
+        assert set(quadro.carregar().reservas) == {antes}
+
+    # Sem a próxima, a seguinte só sai do banco.
+    assert cliente.delete(f"/reservas/{antes}").status_code == 200
+    with app.app_context():
+        assert _chave(sala)["proxima_reserva"]["reserva_id"] == depois
+
+
+def test_remover_sala_ou_responsavel_descarta_o_quadro(app, cliente, cadastro):
+    responsavel = cliente.post("/responsaveis", json={
+        "responsavel_nome": "Beltrano", "responsavel_siap": "7654321",
+        "responsavel_cpf": "55566677788", "responsavel_data_nascimento": "1985-05-05",
+    }).get_json()["responsavel_id"]
+    for rota in (f"/responsaveis/{responsavel}", f"/salas/{cadastro['salas'][1]}"):
+        with app.app_context():
+            quadro.carregar()
+        assert cliente.delete(rota).status_code == 200
+        assert quadro._estado_atual is None, rota
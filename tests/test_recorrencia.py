@@ -0,0 +1,133 @@
+import random
+from datetime import date, datetime, timedelta
+from datetime import time as hora
+
+import pytest
+
+from helpers.recorrencia import Regra, primeiro_conflito
+
+CASOS = 300
+
+
+def _regra(aleatorio, chave):
+    inicio = date(2025, 1, 1) + timedelta(days=aleatorio.randrange(365))
+    fim = inicio + timedelta(days=aleatorio.randrange(400))
+    comeco = aleatorio.randrange(7, 20)
+    excecoes = {inicio + timedelta(days=aleatorio.randrange((fim - inicio).days + 1))
+                for _ in range(aleatorio.randrange(6))}
+    return Regra(
+        chave, 1, 1, aleatorio.randrange(1, 128), aleatorio.randrange(1, 5),
+        hora(comeco, aleatorio.choice((0, 30))), hora(min(comeco + aleatorio.randrange(1, 4), 23), 45),
+        inicio, fim, excecoes
+    )
+
+
+def _expandir(regra):
+    dia = regra.data_inicio
+    while dia <= regra.data_fim:
+        if regra.ocorre_em(dia):
+            yield dia
+        dia += timedelta(days=1)
+
+
+@pytest.fixture
+def pares():
+    aleatorio = random.Random(42)
+    return aleatorio, [(_regra(aleatorio, 1), _regra(aleatorio, 2)) for _ in range(CASOS)]
+
+
+def test_primeiro_conflito_igual_a_expansao(pares):
+    _, pares = pares
+    for a, b in pares:
+        esperado = None
+        if a.hora_inicio < b.hora_fim and b.hora_inicio < a.hora_fim:
+            esperado = min(set(_expandir(a)) & set(_expandir(b)), default=None)
+        assert primeiro_conflito(a, b) == esperado
+
+
+def test_ocorrencias_e_cruza_iguais_a_expansao(pares):
+    aleatorio, pares = pares
+    for regra, _ in pares:
+        dias = sorted(_expandir(regra))
+        de = datetime.combine(regra.data_inicio, hora()) + timedelta(hours=aleatorio.randrange(-100, 3000))
+        ate = de + timedelta(hours=aleatorio.randrange(1, 3000))
+        assert list(regra.ocorrencias(de, ate)) == [
+            regra.periodo(dia) for dia in dias if regra.periodo(dia)[0] < ate and regra.periodo(dia)[1] > de
+        ]
+        fim = de + timedelta(minutes=aleatorio.randrange(10, 5000))
+        assert regra.cruza(de, fim) == min(
+            (dia for dia in dias if regra.periodo(dia)[0] < fim and regra.periodo(dia)[1] > de), default=None
+        )
+
+
+def _recorrencia(cliente, cadastro, **campos):
+    corpo = {
+        "sala_id": cadastro["salas"][0], "responsavel_id": cadastro["responsavel_id"],
+        "dias_semana": [0], "intervalo_semanas": 2, "hora_inicio": "14:00:00", "hora_fim": "15:00:00",
+        "data_inicio": "2100-01-04", "data_fim": "2100-02-15", **campos
+    }
+    return cliente.post("/recorrencias", json=corpo)
+
+
+def _finalizar_ocorrencia(cliente, recorrencia, dia):
+    return cliente.post("/finalizacoes", json={
+        "recorrencia_id": recorrencia, "data_ocorrencia": dia, "data_hora_finalizacao": f"{dia}T15:00:00"
+    })
+
+
+def _dias(cliente, recorrencia):
+    ocorrencias = cliente.get(
+        f"/recorrencias/{recorrencia}/ocorrencias?de=2100-01-01T00:00:00&ate=2100-03-01T00:00:00"
+    ).get_json()["ocorrencias"]
+    return [ocorrencia["data_hora_inicio"][:10] for ocorrencia in ocorrencias]
+
+
+def test_put_desloca_a_fase_sem_reabrir_ocorrencias_finalizadas(cliente, cadastro):
+    recorrencia = _recorrencia(cliente, cadastro).get_json()["recorrencia_id"]
+    assert _finalizar_ocorrencia(cliente, recorrencia, "2100-01-18").status_code == 201
+    assert _dias(cliente, recorrencia) == ["2100-01-04", "2100-02-01", "2100-02-15"]
+
+    # Uma semana depois a regra cai nas segundas ímpares; a exceção de
+    # 18/01 fica sem efeito e a reserva materializada continua lá.
+    resposta = cliente.put(f"/recorrencias/{recorrencia}", json={"data_inicio": "2100-01-11"})
+    assert resposta.status_code == 200
+    assert _dias(cliente, recorrencia) == ["2100-01-11", "2100-01-25", "2100-02-08"]
+    assert cliente.post(f"/recorrencias/{recorrencia}/excecoes", json={"data": "2100-01-18"}).status_code == 409
+
+    # De volta à fase original, 18/01 continua sendo exceção: a regra não
+    # cruza a própria reserva materializada.
+    resposta = cliente.put(f"/recorrencias/{recorrencia}", json={"data_inicio": "2100-01-04"})
+    assert resposta.status_code == 200
+    assert _dias(cliente, recorrencia) == ["2100-01-04", "2100-02-01", "2100-02-15"]
+    assert _finalizar_ocorrencia(cliente, recorrencia, "2100-01-18").status_code == 409
+
+
+def test_put_que_desloca_a_fase_sobre_uma_reserva_e_409(cliente, cadastro):
+    recorrencia = _recorrencia(cliente, cadastro).get_json()["recorrencia_id"]
+    reserva = cliente.post("/reservas", json={
+        "sala_id": cadastro["salas"][0], "responsavel_id": cadastro["responsavel_id"],
+        "data_hora_inicio": "2100-01-25T14:30:00", "data_hora_fim": "2100-01-25T16:00:00",
+    })
+    assert reserva.status_code == 201
+
+    resposta = cliente.put(f"/recorrencias/{recorrencia}", json={"data_inicio": "2100-01-11"})
+    assert resposta.status_code == 409
+    assert resposta.get_json()["conflito"] == {"reserva_id": reserva.get_json()["reserva_id"], "data": "2100-01-25"}
+    assert _dias(cliente, recorrencia) == ["2100-01-04", "2100-01-18", "2100-02-01", "2100-02-15"]
+
+
+def test_regra_nova_conflita_com_ocorrencia_materializada(cliente, cadastro):
+    primeira = _recorrencia(cliente, cadastro).get_json()["recorrencia_id"]
+    reserva = _finalizar_ocorrencia(cliente, primeira, "2100-01-18").get_json()["reserva_id"]
+
+    # 18/01 é exceção da primeira regra, mas a ocorrência virou reserva.
+    resposta = _recorrencia(cliente, cadastro, intervalo_semanas=1, data_inicio="2100-01-18", data_fim="2100-01-18")
+    assert resposta.status_code == 409
+    assert resposta.get_json()["conflito"] == {"reserva_id": reserva, "data": "2100-01-18"}
+
+    # Sem a regra, a reserva materializada continua ocupando a sala.
+    assert cliente.delete(f"/recorrencias/{primeira}").status_code == 200
+    resposta = _recorrencia(cliente, cadastro, intervalo_semanas=1, data_inicio="2100-01-18", data_fim="2100-01-18")
+    assert resposta.status_code == 409
+    resposta = _recorrencia(cliente, cadastro, intervalo_semanas=1, data_inicio="2100-01-11", data_fim="2100-01-11")
+    assert resposta.status_code == 201
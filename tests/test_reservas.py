@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from helpers.database import db
+from helpers.datas import sem_fuso
+from helpers.disponibilidade import disponibilidade
+from models.Reserva import Reserva, RESERVA_CONFLITO
+
+
+def _corpo(cadastro, inicio="2100-01-04T10:00:00", fim="2100-01-04T11:00:00"):
+    return {
+        "sala_id": cadastro["salas"][0], "responsavel_id": cadastro["responsavel_id"],
+        "data_hora_inicio": inicio, "data_hora_fim": fim,
+    }
+
+
+def test_indice_defasado_nao_recusa_periodo_liberado(app, cliente, cadastro):
+    reserva = cliente.post("/reservas", json=_corpo(cadastro)).get_json()["reserva_id"]
+    sala = cadastro["salas"][0]
+    assert cliente.get(f"/salas/{sala}/disponibilidade?de=2100-01-04T08:00:00&ate=2100-01-04T18:00:00").status_code == 200
+
+    # Outro processo remove a reserva: o índice deste só vê isso no TTL.
+    with app.app_context():
+        db.session.execute(db.delete(Reserva).where(Reserva.reserva_id == reserva))
+        db.session.commit()
+        assert disponibilidade.conflita(sala, datetime(2100, 1, 4, 10), datetime(2100, 1, 4, 11))
+
+    assert cliente.post("/reservas", json=_corpo(cadastro)).status_code == 201
+
+
+def test_conflito_continua_409(cliente, cadastro):
+    assert cliente.post("/reservas", json=_corpo(cadastro)).status_code == 201
+    resposta = cliente.post("/reservas", json=_corpo(cadastro, "2100-01-04T10:30:00", "2100-01-04T11:30:00"))
+    assert resposta.status_code == 409
+
+
+def test_lote_com_fuso_com_indice_e_quadro_carregados(cliente, cadastro):
+    sala = cadastro["salas"][0]
+    assert cliente.get(f"/salas/{sala}/disponibilidade?de=2030-01-01T00:00:00").status_code == 200
+    assert cliente.get("/chaves/status").status_code == 200
+
+    lote = [
+        _corpo(cadastro, "2030-01-01T09:00:00+00:00", "2030-01-01T10:00:00+00:00"),
+        _corpo(cadastro, "2030-01-01T12:00:00", "2030-01-01T13:00:00"),
+    ]
+    resposta = cliente.post("/reservas/lote", json=lote)
+    assert resposta.status_code == 201, resposta.get_json()
+
+    inicio = sem_fuso(datetime.fromisoformat("2030-01-01T09:00:00+00:00"))
+    ocupados = cliente.get(
+        f"/salas/{sala}/disponibilidade?de=2030-01-01T00:00:00&ate=2030-01-02T00:00:00"
+    ).get_json()["ocupado"]
+    assert [item["data_hora_inicio"] for item in ocupados] == sorted([inicio.isoformat(), "2030-01-01T12:00:00"])
+
+
+def test_disponibilidade_com_fuso(cliente, cadastro):
+    sala = cadastro["salas"][0]
+    for de in ("2030-01-01T08:00:00Z", "2030-01-01T08:00:00+00:00"):
+        resposta = cliente.get(f"/salas/{sala}/disponibilidade", query_string={"de": de})
+        assert resposta.status_code == 200, resposta.get_json()
+        assert resposta.get_json()["de"] == sem_fuso(datetime.fromisoformat(de)).isoformat()
+
+
+def test_disponibilidade_sem_de_responde_pelo_indice_recem_carregado(cliente, cadastro, monkeypatch):
+    sala = cadastro["salas"][0]
+    respostas = []
+    original = disponibilidade.ocupados
+
+    def registrar(*args):
+        respostas.append(original(*args))
+        return respostas[-1]
+
+    monkeypatch.setattr(disponibilidade, "ocupados", registrar)
+    disponibilidade.invalidar()
+    assert cliente.get(f"/salas/{sala}/disponibilidade").status_code == 200
+    assert respostas == [[]]
+
+
+def test_restricao_de_exclusao_so_no_postgres():
+    assert RESERVA_CONFLITO in str(CreateTable(Reserva.__table__).compile(dialect=postgresql.dialect()))
+    assert RESERVA_CONFLITO not in str(CreateTable(Reserva.__table__).compile(dialect=sqlite.dialect()))
+
+
+def _lote(cliente, cadastro, periodos, modo="atomico"):
+    return cliente.post(f"/reservas/lote?modo={modo}", json=[
+        _corpo(cadastro, f"2100-01-04T{inicio}:00", f"2100-01-04T{fim}:00") for inicio, fim in periodos
+    ])
+
+
+def test_lote_atomico_rejeita_tudo_se_um_item_falha(cliente, cadastro):
+    existente = cliente.post("/reservas", json=_corpo(cadastro, "2100-01-04T14:00:00", "2100-01-04T15:00:00"))
+    existente = existente.get_json()["reserva_id"]
+
+    resposta = _lote(cliente, cadastro, [("08:00", "09:00"), ("08:30", "09:30"), ("14:30", "15:30"), ("16:00", "17:00")])
+    assert resposta.status_code == 422
+    corpo = resposta.get_json()
+    assert (corpo["criadas"], corpo["rejeitadas"]) == (0, 2)
+    assert [(item["indice"], item["status"], item.get("conflito")) for item in corpo["resultados"]] == [
+        (0, 424, None), (1, 409, {"indice": 0}), (2, 409, {"reserva_id": existente}), (3, 424, None)
+    ]
+    assert [reserva["reserva_id"] for reserva in cliente.get("/reservas").get_json()] == [existente]
+
+
+def test_lote_parcial_cria_os_validos(cliente, cadastro):
+    existente = cliente.post("/reservas", json=_corpo(cadastro, "2100-01-04T14:00:00", "2100-01-04T15:00:00"))
+    existente = existente.get_json()["reserva_id"]
+    itens = [
+        _corpo(cadastro, "2100-01-04T08:00:00", "2100-01-04T09:00:00"),
+        _corpo(cadastro, "2100-01-04T08:30:00", "2100-01-04T09:30:00"),
+        _corpo(cadastro, "2100-01-04T14:30:00", "2100-01-04T15:30:00"),
+        {**_corpo(cadastro), "data_hora_fim": "ontem"},
+        {**_corpo(cadastro, "2100-01-04T18:00:00", "2100-01-04T19:00:00"), "sala_id": 999},
+        _corpo(cadastro, "2100-01-04T16:00:00", "2100-01-04T17:00:00"),
+    ]
+    resposta = cliente.post("/reservas/lote?modo=parcial", json=itens)
+    assert resposta.status_code == 207
+    corpo = resposta.get_json()
+    assert (corpo["criadas"], corpo["rejeitadas"]) == (2, 4)
+    assert [(item["indice"], item["status"]) for item in corpo["resultados"]] == [
+        (0, 201), (1, 409), (2, 409), (3, 422), (4, 404), (5, 201)
+    ]
+    criadas = [corpo["resultados"][i]["reserva_id"] for i in (0, 5)]
+    assert sorted(reserva["reserva_id"] for reserva in cliente.get("/reservas").get_json()) == sorted([existente, *criadas])
+
+
+def test_lote_mantem_indice_e_quadro_em_dia(cliente, cadastro):
+    sala = cadastro["salas"][0]
+    janela = f"/salas/{sala}/disponibilidade?de=2100-01-04T00:00:00&ate=2100-01-05T00:00:00"
+    assert cliente.get(janela).get_json()["ocupado"] == []
+    agora = datetime.now().replace(microsecond=0)
+    assert cliente.get("/chaves/status").status_code == 200
+
+    resposta = cliente.post("/reservas/lote", json=[
+        _corpo(cadastro, "2100-01-04T08:00:00", "2100-01-04T09:00:00"),
+        _corpo(cadastro, (agora - timedelta(minutes=10)).isoformat(), (agora + timedelta(minutes=50)).isoformat()),
+    ])
+    assert resposta.status_code == 201
+    futura, atual = (item["reserva_id"] for item in resposta.get_json()["resultados"])
+
+    # O índice carregado antes do lote já vê a reserva criada por ele.
+    assert [item["reserva_id"] for item in cliente.get(janela).get_json()["ocupado"]] == [futura]
+    assert cliente.post("/reservas", json=_corpo(cadastro, "2100-01-04T08:30:00", "2100-01-04T09:30:00")).status_code == 409
+
+    chave = next(chave for chave in cliente.get("/chaves/status").get_json()["chaves"] if chave["sala_id"] == sala)
+    assert chave["situacao"] == "emprestada"
+    assert chave["reserva"]["reserva_id"] == atual
+    assert chave["proxima_reserva"]["reserva_id"] == futura
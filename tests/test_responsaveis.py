@@ -0,0 +1,84 @@
+from sqlalchemy import event
+
+from helpers.database import db
+
+CABECALHO = "responsavel_nome,responsavel_siap,responsavel_cpf,responsavel_data_nascimento\n"
+
+
+def _importar(cliente, *linhas):
+    return cliente.post(
+        "/responsaveis/importar", data=CABECALHO + "".join(f"{linha}\n" for linha in linhas),
+        content_type="text/csv"
+    )
+
+
+def _cpfs(cliente):
+    return sorted(responsavel["responsavel_cpf"] for responsavel in cliente.get("/responsaveis").get_json())
+
+
+def test_importacao_sem_erros_e_201(cliente):
+    resposta = _importar(cliente, "Beltrano,1111111,22233344455,1980-02-03", "Sicrano,2222222,33344455566,1985-04-05")
+    assert resposta.status_code == 201
+    assert resposta.get_json() == {"importadas": 2, "rejeitadas": 0, "erros": [], "erros_omitidos": 0}
+    assert _cpfs(cliente) == ["22233344455", "33344455566"]
+
+
+def test_importacao_com_rejeitadas_e_207(cliente, cadastro):
+    resposta = _importar(
+        cliente,
+        "Beltrano,1111111,22233344455,1980-02-03",
+        "Fulano de Tal,7654321,11122233344,1990-01-01",
+        "Sicrano,2222222,33344455566,data-ruim",
+    )
+    assert resposta.status_code == 207
+    corpo = resposta.get_json()
+    assert (corpo["importadas"], corpo["rejeitadas"]) == (1, 2)
+    assert [(erro["linha"], erro["erro"]) for erro in corpo["erros"]] == [
+        (3, "CPF já cadastrado."), (4, "Dados inválidos")
+    ]
+
+
+def test_repeticao_no_arquivo_fica_com_a_primeira_linha_valida(cliente, cadastro):
+    resposta = _importar(
+        cliente,
+        # A primeira ocorrência do CPF cai pelo SIAP já cadastrado; a
+        # segunda é a primeira válida e entra.
+        "Fulano Dois,1234567,55566677788,1980-02-03",
+        "Fulano Tres,3333333,55566677788,1980-02-03",
+        "Fulano Quatro,4444444,55566677788,1980-02-03",
+        # A linha 5 repete o CPF da 3 e sai; o SIAP dela não conta contra
+        # a linha 6.
+        "Fulano Cinco,8888888,55566677788,1980-02-03",
+        "Fulano Seis,8888888,88899900011,1980-02-03",
+        "Fulano Sete,8888888,88899900022,1980-02-03",
+    )
+    assert resposta.status_code == 207
+    corpo = resposta.get_json()
+    assert corpo["importadas"] == 2
+    assert [(erro["linha"], erro["erro"]) for erro in corpo["erros"]] == [
+        (2, "SIAP já cadastrado."), (4, "CPF repetido no arquivo."), (5, "CPF repetido no arquivo."),
+        (7, "SIAP repetido no arquivo."),
+    ]
+    assert _cpfs(cliente) == ["11122233344", "55566677788", "88899900011"]
+
+
+def test_cadastro_em_paralelo_durante_a_importacao_e_409(app, cliente):
+    inserido = []
+
+    def cadastrar_antes(conexao, cursor, sql, parametros, contexto, executemany):
+        # Outro processo cadastra o mesmo CPF entre a checagem e o INSERT.
+        if not inserido and sql.startswith("INSERT INTO responsavel ("):
+            inserido.append(True)
+            cursor.execute("INSERT INTO responsavel (responsavel_nome, responsavel_cpf) VALUES ('Outro', '22233344455')")
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", cadastrar_antes)
+    try:
+        resposta = _importar(cliente, "Beltrano,1111111,22233344455,1980-02-03")
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "before_cursor_execute", cadastrar_antes)
+
+    assert inserido
+    assert resposta.status_code == 409
+    assert _cpfs(cliente) == []
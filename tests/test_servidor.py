@@ -0,0 +1,61 @@
+import socket
+import threading
+import time
+import urllib.request
+
+from helpers.servidor import ServidorWorker
+
+THREADS = 2
+
+
+class _Contador(ServidorWorker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aceitas = 0
+
+    def process_request(self, request, client_address):
+        self.aceitas += 1
+        super().process_request(request, client_address)
+
+
+def test_worker_so_aceita_com_thread_livre():
+    liberar = threading.Event()
+    atendendo = threading.Semaphore(0)
+
+    def app(environ, start_response):
+        atendendo.release()
+        liberar.wait(5)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"ok"]
+
+    soquete = socket.create_server(("127.0.0.1", 0))
+    servidor = _Contador(app, soquete, threads=THREADS)
+    laco = threading.Thread(target=servidor.serve_forever, kwargs={"poll_interval": 0.05})
+    laco.start()
+    url = f"http://127.0.0.1:{soquete.getsockname()[1]}/"
+
+    respostas = []
+    clientes = [
+        threading.Thread(target=lambda: respostas.append(urllib.request.urlopen(url, timeout=10).status))
+        for _ in range(THREADS + 2)
+    ]
+    try:
+        for cliente in clientes:
+            cliente.start()
+        for _ in range(THREADS):
+            assert atendendo.acquire(timeout=5)
+        time.sleep(0.3)
+        # As conexões excedentes ficam no backlog do socket, não numa fila do worker.
+        assert servidor.aceitas == THREADS
+    finally:
+        liberar.set()
+        for cliente in clientes:
+            cliente.join(10)
+        servidor.shutdown()
+        laco.join(5)
+        servidor.drenar()
+        soquete.close()
+
+    assert respostas == [200] * (THREADS + 2)
+    assert servidor.aceitas == THREADS + 2
+    assert not laco.is_alive()
@@ -0,0 +1,59 @@
+from datetime import date, datetime, timedelta
+
+from helpers import uso
+from helpers.database import db
+from helpers.orcamento import limitar_consultas
+from models.UsoSala import UsoSala
+
+
+def _reservar(cliente, cadastro, sala, inicio, horas=1):
+    inicio = datetime.fromisoformat(inicio)
+    resposta = cliente.post("/reservas", json={
+        "sala_id": sala, "responsavel_id": cadastro["responsavel_id"],
+        "data_hora_inicio": inicio.isoformat(), "data_hora_fim": (inicio + timedelta(hours=horas)).isoformat(),
+    })
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()["reserva_id"]
+
+
+def _linhas():
+    """Linhas de ``uso_sala`` sem as zeradas: o recálculo completo apaga as
+    que ficaram vazias e o incremental as mantém com zero, o que dá no
+    mesmo para os relatórios."""
+    linhas = (
+        (linha.sala_id, linha.granularidade, str(linha.inicio), *(getattr(linha, metrica) for metrica in uso.METRICAS))
+        for linha in db.session.execute(db.select(UsoSala)).scalars()
+    )
+    return sorted(linha for linha in linhas if any(linha[3:]))
+
+
+def test_atualizacao_incremental_igual_ao_recalculo_completo(app, cliente, cadastro):
+    primeira, segunda = cadastro["salas"]
+    a = _reservar(cliente, cadastro, primeira, "2026-01-30T10:00:00", 2)
+    b = _reservar(cliente, cadastro, primeira, "2026-01-30T14:00:00")
+    c = _reservar(cliente, cadastro, primeira, "2026-02-02T08:00:00")
+    _reservar(cliente, cadastro, segunda, "2026-02-02T08:00:00")
+
+    assert cliente.post("/finalizacoes", json={
+        "reserva_id": a, "data_hora_finalizacao": "2026-01-30T11:30:00"
+    }).status_code == 201
+    assert cliente.put(f"/reservas/{c}", json={
+        "sala_id": segunda, "data_hora_inicio": "2026-02-03T09:00:00", "data_hora_fim": "2026-02-03T10:00:00"
+    }).status_code == 200
+    assert cliente.delete(f"/reservas/{b}").status_code == 200
+
+    with app.app_context():
+        incremental = _linhas()
+        uso.recalcular_periodo(date(2026, 1, 1), date(2026, 3, 1))
+        assert _linhas() == incremental
+        # O mês de janeiro da primeira sala ficou só com a reserva ``a``.
+        assert (primeira, "mes", "2026-01-01", 1, 7200, 1, 5400, 0, 0, 0) in incremental
+
+
+def test_recalcular_tem_custo_constante(app, cadastro):
+    primeira, segunda = cadastro["salas"]
+    chaves = [(primeira, date(2026, 1, dia)) for dia in range(1, 20)] + [(segunda, date(2026, 2, 1))]
+    with app.app_context():
+        with limitar_consultas(6):
+            uso.recalcular(chaves)
+        db.session.commit()
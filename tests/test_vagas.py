@@ -0,0 +1,84 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers.vagas import duracao, inicios_livres, ocupar
+
+
+@pytest.mark.parametrize("texto, minutos", [
+    ("2h", 120), ("90m", 90), ("90min", 90), ("1h30m", 90), ("90", 90), (" 1H ", 60),
+])
+def test_duracao(texto, minutos):
+    assert duracao(texto) == timedelta(minutes=minutos)
+
+
+@pytest.mark.parametrize("texto", ["", "0", "0h0m", "h", "1d", "-5", "1h30"])
+def test_duracao_invalida(texto):
+    with pytest.raises(ValueError):
+        duracao(texto)
+
+
+def test_ocupar_conta_fatia_parcial_como_ocupada():
+    de, passo = datetime(2100, 1, 4, 8), timedelta(minutes=30)
+    bits = ocupar(0, datetime(2100, 1, 4, 8, 45), datetime(2100, 1, 4, 9, 40), de, passo, 8)
+    assert bits == 0b1110
+    # Fora da grade não liga nada.
+    assert ocupar(0, datetime(2100, 1, 4, 6), datetime(2100, 1, 4, 7), de, passo, 8) == 0
+
+
+def test_inicios_livres_igual_a_forca_bruta():
+    aleatorio = random.Random(42)
+    for _ in range(500):
+        fatias = aleatorio.randrange(1, 80)
+        ocupado = aleatorio.getrandbits(fatias) & aleatorio.getrandbits(fatias)
+        tamanho = aleatorio.randrange(1, 12)
+        esperado = sum(
+            1 << i for i in range(fatias - tamanho + 1)
+            if not any(ocupado >> j & 1 for j in range(i, i + tamanho))
+        )
+        assert inicios_livres(ocupado, fatias, tamanho) == esperado
+
+
+def _sala(cliente, nome):
+    return cliente.post("/salas", json={"sala_nome": nome, "chave_nome": f"CH {nome}"}).get_json()["sala_id"]
+
+
+def test_salas_livres_ordena_pelo_primeiro_inicio_e_pelos_inicios(cliente, cadastro):
+    responsavel = cadastro["responsavel_id"]
+    reservada_cedo, recorrente = cadastro["salas"]
+    livre, reservada_tarde = _sala(cliente, "Sala livre"), _sala(cliente, "Sala tarde")
+
+    for sala, inicio, fim in ((reservada_cedo, "08:00", "09:15"), (reservada_tarde, "10:00", "11:00")):
+        assert cliente.post("/reservas", json={
+            "sala_id": sala, "responsavel_id": responsavel,
+            "data_hora_inicio": f"2100-01-04T{inicio}:00", "data_hora_fim": f"2100-01-04T{fim}:00",
+        }).status_code == 201
+    # Segunda-feira, 08:00 às 08:30: bloqueia só a primeira fatia.
+    assert cliente.post("/recorrencias", json={
+        "sala_id": recorrente, "responsavel_id": responsavel, "dias_semana": [0], "intervalo_semanas": 1,
+        "hora_inicio": "08:00:00", "hora_fim": "08:30:00", "data_inicio": "2100-01-04", "data_fim": "2100-02-01",
+    }).status_code == 201
+
+    resposta = cliente.get("/salas/livres", query_string={
+        "de": "2100-01-04T08:00:00", "ate": "2100-01-04T12:00:00", "duracao": "1h", "passo": "30m",
+    })
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert corpo["total"] == 4
+    assert [(sala["sala_id"], sala["inicios"][0][11:16], sala["total_inicios"]) for sala in corpo["salas"]] == [
+        (livre, "08:00", 7), (reservada_tarde, "08:00", 4), (recorrente, "08:30", 6), (reservada_cedo, "09:30", 4),
+    ]
+
+    limitada = cliente.get("/salas/livres", query_string={
+        "de": "2100-01-04T08:00:00", "ate": "2100-01-04T12:00:00", "duracao": "1h", "passo": "30m", "limite": 1,
+    }).get_json()
+    assert (limitada["total"], [sala["sala_id"] for sala in limitada["salas"]]) == (4, [livre])
+
+
+def test_salas_livres_com_fuso(cliente, cadastro):
+    resposta = cliente.get("/salas/livres", query_string={
+        "de": "2030-01-01T08:00:00+00:00", "ate": "2030-01-01T12:00:00+00:00", "duracao": "1h",
+    })
+    assert resposta.status_code == 200, resposta.get_json()
+    assert resposta.get_json()["total"] == 2